@@ -1,12 +1,12 @@
 """Solo Workspace admin configuration."""
 from django.contrib import admin
-from apps.solo.models import SoloSession, SoloExport, ShareToken, ShareAccessLog
+from apps.solo.models import SoloSession, SoloExport, ShareToken, ShareAccessLog, SoloOpLog, SoloPage
 
 
 @admin.register(SoloSession)
 class SoloSessionAdmin(admin.ModelAdmin):
-    list_display = ['id', 'name', 'user', 'page_count', 'updated_at']
-    list_filter = ['created_at', 'updated_at']
+    list_display = ['id', 'name', 'user', 'page_count', 'storage_mode', 'updated_at']
+    list_filter = ['storage_mode', 'created_at', 'updated_at']
     search_fields = ['name', 'user__email']
     readonly_fields = ['id', 'created_at', 'updated_at']
     raw_id_fields = ['user']
@@ -35,3 +35,17 @@ class ShareAccessLogAdmin(admin.ModelAdmin):
     list_filter = ['accessed_at']
     readonly_fields = ['id', 'share_token', 'ip_address', 'user_agent', 'accessed_at']
     raw_id_fields = ['share_token']
+
+
+@admin.register(SoloOpLog)
+class SoloOpLogAdmin(admin.ModelAdmin):
+    list_display = ['id', 'session', 'rev', 'created_at']
+    readonly_fields = ['id', 'session', 'rev', 'ops', 'created_at']
+    raw_id_fields = ['session']
+
+
+@admin.register(SoloPage)
+class SoloPageAdmin(admin.ModelAdmin):
+    list_display = ['id', 'session', 'page_id', 'position', 'rev', 'updated_at']
+    readonly_fields = ['id', 'session', 'page_id', 'position', 'data', 'rev', 'digest', 'updated_at']
+    raw_id_fields = ['session']
@@ -20,7 +20,18 @@ class SoloSessionListSerializer(serializers.ModelSerializer):
 
 
 class SoloSessionDetailSerializer(serializers.ModelSerializer):
-    """Detail view serializer (full state)."""
+    """Detail view serializer (full state).
+
+    Pass ``context={'fields': [...]}`` to serialize only those fields.
+    """
+    state = serializers.SerializerMethodField()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        only = self.context.get('fields')
+        if only is not None:
+            for name in set(self.fields) - set(only):
+                self.fields.pop(name)
     
     class Meta:
         model = SoloSession
@@ -37,6 +48,11 @@ class SoloSessionDetailSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'rev', 'state_digest', 'created_at', 'updated_at']
 
+    def get_state(self, obj):
+        """Materialized state plus any pending op-log tail."""
+        from apps.solo.services.state import SoloStateService
+        return SoloStateService.current_state(obj)
+
 
 class SoloSessionCreateSerializer(serializers.ModelSerializer):
     """Create/update serializer."""
@@ -52,7 +68,7 @@ class SoloSessionCreateSerializer(serializers.ModelSerializer):
 
 class SoloExportSerializer(serializers.ModelSerializer):
     """Export serializer with status for polling."""
-    session_id = serializers.UUIDField(source='session.id', read_only=True)
+    session_id = serializers.UUIDField(read_only=True)
     signed_url = serializers.SerializerMethodField()
     is_expired = serializers.BooleanField(read_only=True)
     
@@ -125,3 +141,5 @@ class SoloDiffSaveSerializer(serializers.Serializer):
     rev = serializers.IntegerField(min_value=0)
     ops = DiffOperationSerializer(many=True)
     client_ts = serializers.DateTimeField(required=False)
+    # Apply on top of a newer server rev when the ops do not conflict.
+    rebase = serializers.BooleanField(required=False, default=False)
@@ -0,0 +1,108 @@
+"""
+Fast-path validation for the diff-save wire format.
+
+``SoloDiffSaveSerializer`` builds and runs a ``DiffOperationSerializer`` per
+op, which dominates the cost of a diff save. ``validate_diff_payload`` checks
+the same rules in a single pass over the parsed JSON and returns the same
+``validated_data`` shape. It only accepts payloads it can vouch for: any
+payload that is invalid, or that DRF would coerce (numeric strings, padded
+strings, ...), returns ``None`` and the caller runs the serializer, so error
+messages and status codes stay exactly those of DRF.
+"""
+import re
+from typing import Any, Dict, Optional
+
+from rest_framework import serializers
+
+_OP_TYPES = frozenset({'add', 'update', 'remove'})
+_KINDS = frozenset({'stroke', 'asset', 'meta'})
+# Characters DRF's CharField rejects (null) or cannot round-trip (lone surrogates).
+_UNSAFE_CHARS = re.compile('[\x00\ud800-\udfff]')
+
+_client_ts_field = serializers.DateTimeField()
+
+
+def _is_clean_str(value: Any, allow_blank: bool) -> bool:
+    """True if DRF's CharField would return ``value`` unchanged."""
+    if type(value) is not str:
+        return False
+    if not value:
+        return allow_blank
+    return (
+        not value[0].isspace()
+        and not value[-1].isspace()
+        and _UNSAFE_CHARS.search(value) is None
+    )
+
+
+def _validate_op(raw: Any) -> Optional[Dict[str, Any]]:
+    if type(raw) is not dict:
+        return None
+    op_type = raw.get('op')
+    kind = raw.get('kind')
+    if type(op_type) is not str or op_type not in _OP_TYPES:
+        return None
+    if type(kind) is not str or kind not in _KINDS:
+        return None
+
+    # Unknown keys are dropped, as DRF does.
+    op = {'op': op_type, 'kind': kind}
+    if 'id' in raw:
+        if not _is_clean_str(raw['id'], allow_blank=False):
+            return None
+        op['id'] = raw['id']
+    elif op_type != 'add':
+        return None
+    if 'page_id' in raw:
+        if not _is_clean_str(raw['page_id'], allow_blank=True):
+            return None
+        op['page_id'] = raw['page_id']
+    # JSONField(allow_null=False): an explicit null is an error.
+    if 'value' in raw:
+        if raw['value'] is None:
+            return None
+        op['value'] = raw['value']
+    elif op_type == 'add':
+        return None
+    if 'patch' in raw:
+        if raw['patch'] is None:
+            return None
+        op['patch'] = raw['patch']
+    elif op_type == 'update' and 'value' not in raw:
+        return None
+
+    if kind == 'meta' and op_type != 'remove':
+        if not isinstance(op.get('patch') or op.get('value'), dict):
+            return None
+    return op
+
+
+def validate_diff_payload(data: Any) -> Optional[Dict[str, Any]]:
+    """Validate a parsed diff-save body; ``None`` means "use the serializer"."""
+    if type(data) is not dict:
+        return None
+    rev = data.get('rev')
+    if type(rev) is not int or rev < 0:
+        return None
+    raw_ops = data.get('ops')
+    if type(raw_ops) is not list:
+        return None
+
+    ops = []
+    for raw in raw_ops:
+        op = _validate_op(raw)
+        if op is None:
+            return None
+        ops.append(op)
+
+    validated = {'rev': rev, 'ops': ops}
+    if 'client_ts' in data:
+        try:
+            validated['client_ts'] = _client_ts_field.run_validation(data['client_ts'])
+        except serializers.ValidationError:
+            return None
+    rebase = data.get('rebase', False)
+    if type(rebase) is not bool:
+        return None
+    validated['rebase'] = rebase
+    return validated
@@ -2,26 +2,31 @@
 Solo Workspace API views.
 """
 import re
+import copy
+import base64
+import hashlib
 import json
-import gzip
-import io
+import time
 import uuid
-from datetime import timedelta
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional
 
-from rest_framework import status
+from rest_framework import serializers, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.throttling import AnonRateThrottle
 from rest_framework.exceptions import ValidationError
 from django.conf import settings
-from django.core.exceptions import RequestDataTooBig
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import Q
 from django.core.cache import cache
 
-from apps.solo.models import SoloSession, SoloExport
+from apps.solo import codec, response_body
+from apps.solo.models import SoloSession, SoloExport, SoloOpLog
 from apps.solo.api.serializers import (
     SoloSessionListSerializer,
     SoloSessionDetailSerializer,
@@ -29,17 +34,46 @@ from apps.solo.api.serializers import (
     SoloExportSerializer,
     SoloDiffSaveSerializer,
 )
-from apps.solo.services import SoloService, SoloDiffService, SoloDiffError
+from apps.solo.services import (
+    SoloService,
+    SoloDiffService,
+    SoloDiffError,
+    SoloStateDigest,
+    SoloOpLogService,
+    SoloPageStore,
+    SoloStateService,
+    SoloRebaseService,
+    SoloRebaseConflict,
+    SoloWriteBuffer,
+    SoloWriteBufferBusy,
+    SoloHotStateCache,
+    SoloDiffGroupCommit,
+    SoloStateBytes,
+    SoloHeartbeats,
+    SoloUploadStore,
+    SoloUploadError,
+)
+from apps.solo.services.pages import STORAGE_BLOB
 from apps.solo.services.sharing import SharingService
 from apps.solo.services.thumbnail import ThumbnailService
 from apps.solo.services.storage import SoloStorageService
 from apps.diagnostics.services import LogService
 from apps.solo.throttling import SoloSaveStreamThrottle, SoloBeaconThrottle, SoloDiffThrottle
 from apps.solo.api.mixins import BackoffThrottleMixin, QuotaLimitMixin
+from apps.solo.api.validators import validate_diff_payload
 from apps.solo.limits import DIFF_MAX_BYTES, STREAM_MAX_BYTES, BEACON_MAX_BYTES
+from apps.solo.request_body import (
+    accept_encoding,
+    decode_body,
+    supported_encodings,
+    BODY_TOO_LARGE,
+    BODY_UNSUPPORTED_ENCODING,
+    BODY_INVALID_ENCODING,
+)
 
 
 _REV_HEADER_PATTERN = re.compile(r'rev:(\d+)', re.IGNORECASE)
+_CONTENT_RANGE_PATTERN = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
 
 
 def _request_id(request):
@@ -61,10 +95,120 @@ def _payload_too_large_response(request, limit, encoding):
 
 
 def _unsupported_media_type_response():
-    return Response(
-        {'error': 'unsupported_media_type'},
+    response = Response(
+        {'error': 'unsupported_media_type', 'accepted_encodings': supported_encodings()},
         status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
     )
+    response['Accept-Encoding'] = accept_encoding()
+    return response
+
+
+def _write_buffer_busy_response():
+    response = Response(
+        {'error': 'busy'},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+    response['Retry-After'] = '1'
+    return response
+
+
+def _session_etag(session, variant=None):
+    """Validator of a session's detail/public representation.
+
+    ``rev`` and the digest cover the state; ``updated_at`` covers metadata
+    edits and raw PATCH overwrites, which keep the rev. ``variant`` names
+    anything else the body depends on (e.g. a projection); its hash is
+    appended so different variants never share a validator.
+    """
+    stamp = int(session.updated_at.timestamp() * 1_000_000) if session.updated_at else 0
+    etag = f'rev:{session.rev}:{session.state_digest[:16]}:{stamp:x}'
+    if variant:
+        etag += ':' + hashlib.sha256(variant.encode('utf-8')).hexdigest()[:12]
+    return f'W/"{etag}"'
+
+
+def _projection_variant(fields, page_ids):
+    """ETag variant of a ``?fields=``/``?pages=`` projection; ``None`` for the full body."""
+    if fields is None and page_ids is None:
+        return None
+    return 'fields={};pages={}'.format(
+        ','.join(sorted(set(fields))) if fields is not None else '*',
+        ','.join(sorted(set(page_ids))) if page_ids is not None else '*',
+    )
+
+
+def _if_none_match(request, etag):
+    """Whether ``If-None-Match`` matches ``etag`` (weak comparison)."""
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(candidate.strip().removeprefix('W/') == opaque for candidate in header.split(','))
+
+
+def _not_modified_response(etag):
+    response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    response['ETag'] = etag
+    return response
+
+
+def _json_with_state(data, state_json):
+    """JSON of ``data`` plus ``"state"``, spliced in from already encoded bytes."""
+    body = codec.dumps(data)
+    separator = b',' if len(body) > 2 else b''
+    return body[:-1] + separator + b'"state":' + state_json + b'}'
+
+
+def _json_response_with_state(data, state_json):
+    return HttpResponse(_json_with_state(data, state_json), content_type='application/json')
+
+
+def _csv_query_param(request, name):
+    """Comma-separated query parameter as a list, ``None`` if absent."""
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def _encode_list_cursor(session):
+    raw = f'{session.updated_at.isoformat()}|{session.id}'
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_list_cursor(cursor):
+    """``(updated_at, id)`` of the last session of the previous page."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        updated_at, session_id = raw.split('|')
+        return datetime.fromisoformat(updated_at), uuid.UUID(session_id)
+    except ValueError as exc:
+        raise ValidationError({'cursor': 'invalid'}) from exc
+
+
+def _invalid_ops_response(exc):
+    return Response(
+        {'detail': 'invalid_ops', 'message': str(exc)},
+        status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    )
+
+
+class _DiffSaveResult(NamedTuple):
+    session: Any
+    prev_rev: int
+    write_ts: Any
+    base_rev: int
+    intervening: Optional[List[Any]]
+    # Time the session row stayed locked (the UPDATE and op-log insert in
+    # the optimistic path, the whole apply/digest/save in the locked one).
+    lock_hold_ms: float
+    attempts: int
+    write_path: str
+    # New full state of a blob session (cached by SoloHotStateCache).
+    state: Optional[Dict[str, Any]] = None
+    state_cache_hit: Optional[bool] = None
 
 
 def _parse_if_match_rev(value):
@@ -92,28 +236,63 @@ def _rev_mismatch_response(server_rev):
     )
 
 
+def _rebase_conflict_response(server_rev, conflicts):
+    return Response(
+        {
+            'error': 'rebase_conflict',
+            'server_rev': server_rev,
+            'conflicts': [list(key) for key in conflicts],
+        },
+        status=status.HTTP_409_CONFLICT,
+    )
+
+
 def _read_body_with_limit(request, max_bytes):
-    body = request.body or b''
-    encoding = (request.headers.get('Content-Encoding') or '').strip().lower()
-    if not encoding or encoding == 'identity':
-        if len(body) > max_bytes:
-            return None, _payload_too_large_response(request, max_bytes, 'raw')
-        return body, None
-    if encoding != 'gzip':
+    decoded = decode_body(request, max_bytes)
+    if decoded.error == BODY_TOO_LARGE:
+        return None, _payload_too_large_response(request, max_bytes, decoded.encoding)
+    if decoded.error == BODY_UNSUPPORTED_ENCODING:
         return None, _unsupported_media_type_response()
-
-    try:
-        gz = gzip.GzipFile(fileobj=io.BytesIO(body))
-        decompressed = gz.read(max_bytes + 1)
-    except OSError:
+    if decoded.error == BODY_INVALID_ENCODING:
         return None, Response(
-            {'detail': 'invalid_gzip'},
+            {'detail': f'invalid_{decoded.encoding}'},
             status=status.HTTP_400_BAD_REQUEST,
         )
+    return decoded.data, None
+
+
+def _upload_payload(upload, missing):
+    return {
+        'upload_id': upload['upload_id'],
+        'size': upload['size'],
+        'chunk_size': upload['chunk_size'],
+        'chunks': upload['chunks'],
+        'missing': missing,
+    }
 
-    if len(decompressed) > max_bytes:
-        return None, _payload_too_large_response(request, max_bytes, 'gzip')
-    return decompressed, None
+
+def _upload_not_found_response():
+    return Response(
+        {'error': 'upload_not_found'},
+        status=status.HTTP_404_NOT_FOUND,
+    )
+
+
+_UPLOAD_ERROR_STATUS = {
+    'too_large': status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    'invalid_range': status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+    'upload_incomplete': status.HTTP_409_CONFLICT,
+    'digest_mismatch': status.HTTP_422_UNPROCESSABLE_ENTITY,
+    'too_many_uploads': status.HTTP_429_TOO_MANY_REQUESTS,
+    'upload_busy': status.HTTP_429_TOO_MANY_REQUESTS,
+}
+
+
+def _upload_error_response(exc):
+    return Response(
+        {'error': exc.code, **exc.detail},
+        status=_UPLOAD_ERROR_STATUS.get(exc.code, status.HTTP_400_BAD_REQUEST),
+    )
 
 
 class SoloSessionListView(APIView):
@@ -123,14 +302,44 @@ class SoloSessionListView(APIView):
     """
     permission_classes = [IsAuthenticated]
     
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 200
+
     def get(self, request):
-        """List user's solo sessions."""
-        sessions = SoloSession.objects.filter(user=request.user)
-        serializer = SoloSessionListSerializer(sessions, many=True)
+        """List user's solo sessions, newest first, one keyset page at a time."""
+        limit = self._page_size(request)
+        sessions = (
+            SoloSession.objects.without_state()
+            .filter(user=request.user)
+            .order_by('-updated_at', '-id')
+        )
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            updated_at, session_id = _decode_list_cursor(cursor)
+            sessions = sessions.filter(
+                Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lt=session_id)
+            )
+        page = list(sessions[:limit + 1])
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = _encode_list_cursor(page[-1])
+        serializer = SoloSessionListSerializer(page, many=True)
         return Response({
-            'count': sessions.count(),
+            'count': SoloService.session_count(request.user.id),
+            'next': next_cursor,
             'results': serializer.data
         })
+
+    def _page_size(self, request):
+        value = request.query_params.get('limit')
+        if value is None:
+            return self.DEFAULT_PAGE_SIZE
+        try:
+            limit = int(value)
+        except ValueError as exc:
+            raise ValidationError({'limit': 'must be integer'}) from exc
+        return min(max(1, limit), self.MAX_PAGE_SIZE)
     
     def post(self, request):
         """Create new solo session."""
@@ -159,13 +368,77 @@ class SoloSessionDetailView(APIView):
         return get_object_or_404(SoloSession, pk=pk, user=user)
     
     def get(self, request, pk):
-        """Get session details with full state."""
-        session = self.get_object(pk, request.user)
-        serializer = SoloSessionDetailSerializer(session)
-        return Response(serializer.data)
+        """Get session details with full state (304 if the client has them)."""
+        fields = _csv_query_param(request, 'fields')
+        if fields is not None:
+            unknown = sorted(set(fields) - set(SoloSessionDetailSerializer.Meta.fields))
+            if unknown:
+                raise ValidationError({'fields': f"unknown: {', '.join(unknown)}"})
+        page_ids = _csv_query_param(request, 'pages')
+        with_state = fields is None or 'state' in fields
+        # Only the full JSON representation is compressed and cached.
+        compress = (
+            fields is None and page_ids is None
+            and response_body.enabled() and request.accepted_renderer.format == 'json'
+        )
+        encoding = response_body.negotiate(request) if compress else None
+        variant = _projection_variant(fields, page_ids)
+
+        if request.headers.get('If-None-Match') or encoding:
+            # Validate against the narrow row before loading the state.
+            head = get_object_or_404(
+                SoloSession.objects.only('rev', 'state_digest', 'updated_at'), pk=pk, user=request.user,
+            )
+            SoloWriteBuffer.overlay(head)
+            etag = _session_etag(head, variant)
+            if _if_none_match(request, etag):
+                return _not_modified_response(etag)
+            if encoding:
+                cached = response_body.cached_response('detail', pk, etag, encoding)
+                if cached is not None:
+                    return cached
+
+        if not with_state:
+            queryset = SoloSession.objects.without_state()
+        elif page_ids is None:
+            queryset = SoloSession.objects.with_state_bytes()
+        else:
+            queryset = SoloSession.objects
+        session = get_object_or_404(queryset, pk=pk, user=request.user)
+        SoloWriteBuffer.overlay(session)
+        state_json = None
+        if with_state and page_ids is None and request.accepted_renderer.format == 'json':
+            state_json = SoloStateBytes.raw(session)
+        if page_ids is not None or state_json is not None:
+            # The state is added below.
+            fields = [name for name in (fields or SoloSessionDetailSerializer.Meta.fields) if name != 'state']
+        data = SoloSessionDetailSerializer(session, context={'fields': fields}).data
+        if compress:
+            body = _json_with_state(data, state_json) if state_json is not None else codec.dumps(data)
+            return response_body.compressed_response('detail', pk, _session_etag(session), encoding, body)
+        if state_json is not None:
+            response = _json_response_with_state(data, state_json)
+        else:
+            if page_ids is not None and with_state:
+                # Metadata plus only the requested pages.
+                data['state'], data['page_ids'] = SoloStateService.select_pages(session, page_ids)
+            response = Response(data)
+        response['ETag'] = _session_etag(session, variant)
+        return response
     
     def patch(self, request, pk):
         """Update session (autosave)."""
+        if not SoloWriteBuffer.enabled():
+            return self._patch(request, pk)
+        try:
+            with SoloWriteBuffer.open(pk) as staged:
+                # Buffered saves land first and cannot overtake this write.
+                staged.flush()
+                return self._patch(request, pk)
+        except SoloWriteBufferBusy:
+            return _write_buffer_busy_response()
+
+    def _patch(self, request, pk):
         session = self.get_object(pk, request.user)
         serializer = SoloSessionCreateSerializer(
             session,
@@ -174,17 +447,64 @@ class SoloSessionDetailView(APIView):
             context={'request': request}
         )
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        if 'state' in serializer.validated_data:
+            # Raw state overwrite: the stored digest tree and op-log tail no longer apply.
+            with transaction.atomic():
+                if SoloPageStore.is_paged(session):
+                    state = serializer.validated_data.pop('state')
+                    tree = SoloPageStore.write_full_state(session, state, session.rev)
+                    if tree is not None:
+                        serializer.validated_data['state'] = session.state
+                        session.state_digest = tree['root']
+                    else:
+                        serializer.validated_data['state'] = state
+                state_bytes = {}
+                if not SoloPageStore.is_paged(session):
+                    state_bytes = SoloStateBytes.values(serializer.validated_data['state'], session.rev)
+                # Same rev, new state: stored bytes must not survive.
+                serializer.save(state_tree={}, state_rev=session.rev, **(state_bytes or SoloStateBytes.CLEARED))
+        else:
+            serializer.save()
         
         return Response(SoloSessionDetailSerializer(session).data)
     
     def delete(self, request, pk):
         """Delete session."""
-        session = self.get_object(pk, request.user)
+        session = get_object_or_404(SoloSession.objects.without_state(), pk=pk, user=request.user)
         session.delete()
+        SoloWriteBuffer.discard(pk)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class SoloSessionPageView(APIView):
+    """
+    GET /api/v1/solo/sessions/{id}/pages/{page_id}/
+
+    One page of a session, for lazy loading. The ETag is the page digest.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk, page_id):
+        session = get_object_or_404(
+            SoloSession.objects.only('rev', 'state_rev', 'state_digest', 'state_tree', 'storage_mode'),
+            pk=pk, user=request.user,
+        )
+        SoloWriteBuffer.overlay(session)
+        digest = SoloStateService.stored_page_digest(session, page_id)
+        if digest is not None and _if_none_match(request, f'W/"page:{digest}"'):
+            return _not_modified_response(f'W/"page:{digest}"')
+
+        page = SoloStateService.page(session, page_id)
+        if page is None:
+            return Response({'error': 'not_found'}, status=status.HTTP_404_NOT_FOUND)
+        etag = f'W/"page:{digest or SoloStateDigest.page_digest(page)}"'
+        if _if_none_match(request, etag):
+            return _not_modified_response(etag)
+        response = Response({'id': page_id, 'rev': session.rev, 'page': page})
+        response['ETag'] = etag
+        return response
+
+
 class SoloSessionExportView(APIView):
     """
     POST /api/v1/solo/sessions/{id}/export/
@@ -199,7 +519,10 @@ class SoloSessionExportView(APIView):
     MAX_EXPORT_SIZE = 10 * 1024 * 1024  # 10 MB state limit
     
     def post(self, request, pk):
-        session = get_object_or_404(SoloSession, pk=pk, user=request.user)
+        SoloWriteBuffer.flush(pk)
+        # The size check reads the state_bytes_* columns; the state itself is
+        # only loaded if they are stale, the bytes only by a JSON export.
+        session = get_object_or_404(SoloSession.objects.without_state(), pk=pk, user=request.user)
         
         format_type = request.data.get('format', 'png')
         if format_type not in ['png', 'pdf', 'json']:
@@ -209,8 +532,9 @@ class SoloSessionExportView(APIView):
             )
         
         # Check state size limit
-        import json
-        state_size = len(json.dumps(session.state or {}))
+        state_size = SoloStateBytes.size(session)
+        if state_size is None:
+            state_size = len(codec.dumps(SoloStateService.current_state(session)))
         if state_size > self.MAX_EXPORT_SIZE:
             return Response(
                 {
@@ -252,6 +576,7 @@ class SoloSessionDuplicateView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request, pk):
+        SoloWriteBuffer.flush(pk)
         session = get_object_or_404(SoloSession, pk=pk, user=request.user)
         
         new_session = SoloService.duplicate_session(session)
@@ -272,7 +597,7 @@ class SessionShareView(APIView):
     
     def get(self, request, pk):
         """Get current share status."""
-        session = get_object_or_404(SoloSession, pk=pk, user=request.user)
+        session = get_object_or_404(SoloSession.objects.without_state(), pk=pk, user=request.user)
         
         try:
             share_token = session.share_token
@@ -291,7 +616,7 @@ class SessionShareView(APIView):
     
     def post(self, request, pk):
         """Create share token."""
-        session = get_object_or_404(SoloSession, pk=pk, user=request.user)
+        session = get_object_or_404(SoloSession.objects.without_state(), pk=pk, user=request.user)
         
         expires_in_days = request.data.get('expires_in_days', 7)
         max_views = request.data.get('max_views')
@@ -314,7 +639,7 @@ class SessionShareView(APIView):
     
     def delete(self, request, pk):
         """Revoke share token."""
-        session = get_object_or_404(SoloSession, pk=pk, user=request.user)
+        session = get_object_or_404(SoloSession.objects.without_state(), pk=pk, user=request.user)
         SharingService.revoke_share(session)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -337,25 +662,51 @@ class PublicSessionView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
         
+        # Joined with the share, state columns deferred: enough for the ETag.
+        session = share.session
+        SoloWriteBuffer.overlay(session)
+        owner = session.user.get_full_name() or session.user.email
+        # Share and owner fields of the body are not covered by the session rev.
+        etag = _session_etag(session, f'{owner}|{share.allow_download}|{session.thumbnail_url or ""}')
+        if _if_none_match(request, etag):
+            return _not_modified_response(etag)
+
         # Record access
         ip = request.META.get('REMOTE_ADDR')
         user_agent = request.META.get('HTTP_USER_AGENT', '')
         share.record_access(ip_address=ip, user_agent=user_agent)
-        
-        # Return session data (read-only)
-        session = share.session
+
+        compress = response_body.enabled() and request.accepted_renderer.format == 'json'
+        encoding = response_body.negotiate(request) if compress else None
+        if encoding:
+            cached = response_body.cached_response('public', token, etag, encoding)
+            if cached is not None:
+                return cached
         data = {
             'id': str(session.id),
             'name': session.name,
-            'state': session.state,
             'page_count': session.page_count,
-            'owner': session.user.get_full_name() or session.user.email,
+            'owner': owner,
             'allow_download': share.allow_download,
             'created_at': session.created_at,
             'thumbnail_url': session.thumbnail_url,
         }
         
-        return Response(data)
+        state_json = SoloStateBytes.raw(session) if request.accepted_renderer.format == 'json' else None
+        if state_json is not None or compress:
+            data['created_at'] = serializers.DateTimeField().to_representation(session.created_at)
+        if compress:
+            if state_json is None:
+                state_json = codec.dumps(SoloStateService.current_state(session))
+            body = _json_with_state(data, state_json)
+            return response_body.compressed_response('public', token, etag, encoding, body)
+        if state_json is not None:
+            response = _json_response_with_state(data, state_json)
+        else:
+            data['state'] = SoloStateService.current_state(session)
+            response = Response(data)
+        response['ETag'] = etag
+        return response
 
 
 class ThumbnailRegenerateView(APIView):
@@ -367,6 +718,7 @@ class ThumbnailRegenerateView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request, pk):
+        SoloWriteBuffer.flush(pk)
         session = get_object_or_404(SoloSession, pk=pk, user=request.user)
         
         url = ThumbnailService.generate_and_upload(session)
@@ -411,7 +763,7 @@ class SessionExportsListView(APIView):
     
     def get(self, request, pk):
         """List exports for a session."""
-        session = get_object_or_404(SoloSession, pk=pk, user=request.user)
+        session = get_object_or_404(SoloSession.objects.without_state(), pk=pk, user=request.user)
         exports = SoloExport.objects.filter(session=session, user=request.user)
         serializer = SoloExportSerializer(exports, many=True)
         return Response({
@@ -432,6 +784,7 @@ class SoloSessionDiffSaveView(BackoffThrottleMixin, QuotaLimitMixin, APIView):
     REV_HEADER_PATTERN = re.compile(r'rev:(\d+)', re.IGNORECASE)
     MAX_DIFF_BYTES = DIFF_MAX_BYTES
     MAX_OPS_PER_SAVE = 100
+    DEFAULT_CAS_ATTEMPTS = 3
 
     def patch(self, request, pk):
         limit_error = self._check_payload_limit(request)
@@ -442,14 +795,18 @@ class SoloSessionDiffSaveView(BackoffThrottleMixin, QuotaLimitMixin, APIView):
         if body_error:
             return body_error
         try:
-            parsed = json.loads(body_bytes.decode('utf-8')) if body_bytes else {}
+            parsed = codec.loads(body_bytes.decode('utf-8')) if body_bytes else {}
         except (json.JSONDecodeError, UnicodeDecodeError):
             parsed = request.data
 
-        serializer = SoloDiffSaveSerializer(data=parsed)
-        serializer.is_valid(raise_exception=True)
-        ops = serializer.validated_data['ops']
-        client_ts = serializer.validated_data.get('client_ts')
+        validated = validate_diff_payload(parsed)
+        if validated is None:
+            # Slow path: the serializer produces the exact DRF error messages.
+            serializer = SoloDiffSaveSerializer(data=parsed)
+            serializer.is_valid(raise_exception=True)
+            validated = serializer.validated_data
+        ops = validated['ops']
+        client_ts = validated.get('client_ts')
 
         if not ops:
             raise ValidationError({'ops': 'At least one operation is required'})
@@ -459,58 +816,315 @@ class SoloSessionDiffSaveView(BackoffThrottleMixin, QuotaLimitMixin, APIView):
         if ops_error:
             return ops_error
 
-        with transaction.atomic():
-            session = self._get_session_for_update(pk, request.user)
+        normalized_ops = SoloDiffService.normalize_ops(ops)
 
-            if_match = request.headers.get('If-Match')
-            if if_match:
-                try:
-                    if_match_rev = _parse_if_match_rev(if_match)
-                except Exception:
-                    return _precondition_failed_response()
-                if session.rev != if_match_rev:
-                    return _precondition_failed_response()
-            else:
-                x_rev = request.headers.get('X-Rev') or request.headers.get('X-Revision')
-                if not x_rev:
-                    return _rev_mismatch_response(session.rev)
-                try:
-                    x_rev_int = int(x_rev)
-                except (TypeError, ValueError):
-                    return _rev_mismatch_response(session.rev)
-                if session.rev != x_rev_int:
-                    return _rev_mismatch_response(session.rev)
+        result = None
+        if SoloWriteBuffer.enabled():
+            try:
+                result = self._save_buffered(request, pk, validated, normalized_ops)
+            except SoloWriteBufferBusy:
+                return _write_buffer_busy_response()
+        if result is None and SoloDiffGroupCommit.enabled():
+            # Keyed by user too: only the owner's saves may share a commit.
+            result = SoloDiffGroupCommit.run(
+                f'{request.user.pk}:{pk}', (request, validated, normalized_ops),
+                lambda jobs: self._commit_group(pk, jobs),
+            )
+        if result is None and self.optimistic():
+            result = self._save_optimistic(request, pk, validated, normalized_ops)
+        if result is None:
+            # Disabled, or a paged session (its page rows need the lock).
+            result = self._save_locked(request, pk, validated, normalized_ops)
+        if isinstance(result, Response):
+            return result
+
+        session = result.session
+        if result.state is not None:
+            SoloHotStateCache.put(session, result.state, growth=len(body_bytes or b''))
+        response_data = {
+            'server_ts': result.write_ts.isoformat(),
+            'next_rev': session.rev,
+            'digest': session.state_digest,
+        }
+        if result.intervening is not None:
+            response_data['rebased_from'] = result.base_rev
+            response_data['intervening'] = result.intervening
+        response = Response(response_data, status=status.HTTP_200_OK)
+        response['ETag'] = f'W/"rev:{session.rev}"'
+        self._log_diff_event(request, session, len(ops), len(normalized_ops), client_ts, result)
+        return response
+
+    @staticmethod
+    def optimistic() -> bool:
+        return bool(getattr(settings, 'SOLO_DIFF_OPTIMISTIC', True))
+
+    @classmethod
+    def cas_attempts(cls) -> int:
+        return max(1, int(getattr(settings, 'SOLO_DIFF_CAS_ATTEMPTS', cls.DEFAULT_CAS_ATTEMPTS)))
 
+    def _check_rev(self, request, session, validated, ops):
+        """Return ``(error_response, base_rev, intervening)`` for ``session``."""
+        stale_response = None
+        if_match = request.headers.get('If-Match')
+        if if_match:
+            try:
+                base_rev = _parse_if_match_rev(if_match)
+            except Exception:
+                return _precondition_failed_response(), None, None
+            if session.rev != base_rev:
+                stale_response = _precondition_failed_response()
+        else:
+            x_rev = request.headers.get('X-Rev') or request.headers.get('X-Revision')
+            if not x_rev:
+                return _rev_mismatch_response(session.rev), None, None
             try:
-                new_state = SoloDiffService.apply_diff(session.state, ops)
+                base_rev = int(x_rev)
+            except (TypeError, ValueError):
+                return _rev_mismatch_response(session.rev), None, None
+            if session.rev != base_rev:
+                stale_response = _rev_mismatch_response(session.rev)
+
+        if stale_response is None:
+            return None, base_rev, None
+        if not validated.get('rebase'):
+            return stale_response, base_rev, None
+        try:
+            intervening = SoloRebaseService.rebase(session, base_rev, ops)
+        except SoloRebaseConflict as exc:
+            return _rebase_conflict_response(session.rev, exc.conflicts), base_rev, None
+        if intervening is None:
+            return stale_response, base_rev, None
+        return None, base_rev, intervening
+
+    @staticmethod
+    def _blob_values(session, ops, next_rev, materialize=False, state_bytes=True):
+        """Apply ``ops`` to a blob session; returns ``(values, new_state)``.
+
+        ``values`` are the columns to write; ``state`` is left out of them
+        when the op log defers it, unless ``materialize``. ``state_bytes=False``
+        leaves out the encoded state for callers that only write a later rev.
+        """
+        base_state = SoloOpLogService.current_state(session)
+        new_state = SoloDiffService.apply_diff(base_state, ops)
+        prev_tree = session.state_tree
+        if not SoloStateDigest.is_valid_for(prev_tree, session.rev, session.state_digest):
+            prev_tree = None
+        digest, tree = SoloDiffService.digest_state(
+            new_state, next_rev, prev_state=base_state, prev_tree=prev_tree,
+        )
+        values = {
+            'rev': next_rev,
+            'state_digest': digest,
+            'state_tree': SoloStateDigest.to_storage(tree) if tree else {},
+            'page_count': max(1, len(new_state.get('pages') or [])),
+        }
+        if materialize or not SoloOpLogService.defer_state():
+            values['state'] = new_state
+            values['state_rev'] = next_rev
+            if state_bytes:
+                values.update(SoloStateBytes.values(new_state, next_rev))
+        return values, new_state
+
+    def _save_buffered(self, request, pk, validated, ops):
+        """Stage the save in the write-behind buffer; ``None`` for paged sessions."""
+        queryset = SoloSession.objects.filter(pk=pk, user=request.user)
+        with SoloWriteBuffer.open(pk) as staged:
+            if staged.entry is not None:
+                # The buffered state replaces the stored one.
+                queryset = queryset.defer('state', 'state_tree')
+            session = get_object_or_404(queryset)
+            if SoloPageStore.is_paged(session):
+                return None
+            db_rev = session.rev
+            staged.overlay(session)
+
+            if staged.entry is not None and validated.get('rebase'):
+                if self._check_rev(request, session, {}, ops)[0] is not None:
+                    # A rebase reads the op log: persist the buffered revs and
+                    # save directly, still holding the buffer lock.
+                    staged.flush()
+                    return self._save_locked(request, pk, validated, ops)
+
+            error, base_rev, intervening = self._check_rev(request, session, validated, ops)
+            if error is not None:
+                return error
+            prev_rev = session.rev
+            try:
+                values, _ = self._blob_values(session, ops, prev_rev + 1, materialize=True, state_bytes=False)
             except SoloDiffError as exc:
-                return Response(
-                    {'detail': 'invalid_ops', 'message': str(exc)},
-                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                return _invalid_ops_response(exc)
+            write_ts = timezone.now()
+            staged.stage(session, db_rev, values, write_ts, [dict(op) for op in ops])
+        return _DiffSaveResult(session, prev_rev, write_ts, base_rev, intervening, 0.0, 1, 'buffered')
+
+    def _commit_group(self, pk, jobs):
+        """Apply a group of saves in arrival order and commit them as one write.
+
+        Each ``(request, validated, ops)`` job must continue the rev chain;
+        stale or rebasing jobs get ``None`` and save on their own afterwards.
+        Returns one ``_DiffSaveResult``/``Response``/``None`` per job.
+        """
+        owner = jobs[0][0].user
+        queryset = SoloSession.objects.filter(pk=pk, user=owner)
+        try:
+            session, cache_hit = SoloHotStateCache.load(queryset, pk)
+        except Http404:
+            # Not the caller's session: the solo save answers 404.
+            return [None] * len(jobs)
+        if SoloPageStore.is_paged(session):
+            return [None] * len(jobs)
+
+        db_rev = session.rev
+        results = []
+        applied = []
+        for request, validated, ops in jobs:
+            if request.user.pk != owner.pk:
+                # Not this user's session: saves alone (and gets its 404).
+                results.append(None)
+                continue
+            error, base_rev, _ = self._check_rev(request, session, {}, ops)
+            if error is not None:
+                # 409/412 only once the group is committed; rebases use the op log.
+                results.append(None if validated.get('rebase') else error)
+                continue
+            try:
+                values, new_state = self._blob_values(
+                    session, ops, session.rev + 1, materialize=True, state_bytes=False,
                 )
+            except SoloDiffError as exc:
+                results.append(_invalid_ops_response(exc))
+                continue
+            prev_rev = session.rev
+            for field, value in values.items():
+                setattr(session, field, value)
+            session._solo_current_state = (session.rev, new_state)
+            results.append(None)
+            applied.append((len(results) - 1, prev_rev, base_rev, values, new_state, ops))
+        if not applied:
+            return results
+        # Only the head state is written, so only it is encoded.
+        head_values, head_state = applied[-1][3], applied[-1][4]
+        if 'state' in head_values:
+            head_values.update(SoloStateBytes.values(head_state, head_values['rev']))
+
+        write_ts = timezone.now()
+        started = time.monotonic()
+        with transaction.atomic():
+            updated = queryset.filter(rev=db_rev, storage_mode=STORAGE_BLOB).update(
+                last_write_at=write_ts, updated_at=write_ts, **applied[-1][3],
+            )
+            if updated:
+                session.last_write_at = write_ts
+                session.updated_at = write_ts
+                SoloOpLog.objects.bulk_create([
+                    SoloOpLog(session_id=session.pk, rev=item_values['rev'], ops=[dict(op) for op in item_ops])
+                    for _, _, _, item_values, _, item_ops in applied
+                ])
+                SoloOpLogService.after_append(session)
+        if not updated:
+            # Lost to a save from another process: everyone retries alone.
+            return [None] * len(jobs)
+        lock_hold_ms = (time.monotonic() - started) * 1000
+
+        last = applied[-1][0]
+        for index, prev_rev, base_rev, item_values, new_state, _ in applied:
+            member = copy.copy(session)
+            member.rev = item_values['rev']
+            member.state_digest = item_values['state_digest']
+            results[index] = _DiffSaveResult(
+                member, prev_rev, write_ts, base_rev, None, lock_hold_ms, 1, 'group',
+                # Only the head state is current.
+                new_state if index == last else None, cache_hit,
+            )
+        return results
+
+    def _save_optimistic(self, request, pk, validated, ops):
+        """Apply and digest without a lock, then compare-and-swap on rev.
+
+        Returns a ``_DiffSaveResult``, an error ``Response``, or ``None`` for
+        paged sessions.
+        """
+        queryset = SoloSession.objects.filter(pk=pk, user=request.user)
+        for attempt in range(1, self.cas_attempts() + 1):
+            session, cache_hit = SoloHotStateCache.load(queryset, pk)
+            if SoloPageStore.is_paged(session):
+                return None
+            error, base_rev, intervening = self._check_rev(request, session, validated, ops)
+            if error is not None:
+                return error
 
-            digest = SoloDiffService.compute_digest(new_state)
-            new_page_count = max(1, len(new_state.get('pages') or []))
+            prev_rev = session.rev
+            try:
+                values, new_state = self._blob_values(session, ops, prev_rev + 1)
+            except SoloDiffError as exc:
+                return _invalid_ops_response(exc)
             write_ts = timezone.now()
+
+            started = time.monotonic()
+            with transaction.atomic():
+                updated = queryset.filter(rev=prev_rev, storage_mode=STORAGE_BLOB).update(
+                    last_write_at=write_ts, updated_at=write_ts, **values,
+                )
+                if updated:
+                    for field, value in values.items():
+                        setattr(session, field, value)
+                    session.last_write_at = write_ts
+                    session.updated_at = write_ts
+                    SoloOpLogService.append(session, session.rev, [dict(op) for op in ops])
+                    SoloOpLogService.after_append(session)
+            if updated:
+                return _DiffSaveResult(
+                    session, prev_rev, write_ts, base_rev, intervening,
+                    (time.monotonic() - started) * 1000, attempt, 'optimistic', new_state, cache_hit,
+                )
+            # Another save won the race; re-read (the client is now stale
+            # unless it asked for a rebase).
+
+        session = get_object_or_404(queryset.only('rev'))
+        if request.headers.get('If-Match'):
+            return _precondition_failed_response()
+        return _rev_mismatch_response(session.rev)
+
+    def _save_locked(self, request, pk, validated, ops):
+        """Apply and digest while holding the session row lock."""
+        with transaction.atomic():
+            session, cache_hit = self._get_session_for_update(pk, request.user)
+            locked_at = time.monotonic()
+            error, base_rev, intervening = self._check_rev(request, session, validated, ops)
+            if error is not None:
+                return error
+
             prev_rev = session.rev
             next_rev = prev_rev + 1
+            new_state = None
+            try:
+                if SoloPageStore.is_paged(session):
+                    # Only the pages referenced by the ops are loaded and written.
+                    digest, new_page_count = SoloPageStore.apply_diff(session, ops, next_rev)
+                    values = {
+                        'rev': next_rev,
+                        'state_digest': digest,
+                        'state_tree': {},
+                        'page_count': new_page_count,
+                        'state': session.state,
+                        'state_rev': next_rev,
+                    }
+                else:
+                    values, new_state = self._blob_values(session, ops, next_rev)
+            except SoloDiffError as exc:
+                return _invalid_ops_response(exc)
+            write_ts = timezone.now()
 
-            session.state = new_state
-            session.rev = next_rev
-            session.state_digest = digest
-            session.page_count = new_page_count
+            for field, value in values.items():
+                setattr(session, field, value)
             session.last_write_at = write_ts
-            session.save(update_fields=['state', 'rev', 'state_digest', 'page_count', 'last_write_at', 'updated_at'])
-
-        response_data = {
-            'server_ts': write_ts.isoformat(),
-            'next_rev': next_rev,
-            'digest': digest,
-        }
-        response = Response(response_data, status=status.HTTP_200_OK)
-        response['ETag'] = f'W/"rev:{next_rev}"'
-        self._log_diff_event(request, session, prev_rev, next_rev, len(ops), digest, client_ts, write_ts)
-        return response
+            session.save(update_fields=list(values) + ['last_write_at', 'updated_at'])
+            SoloOpLogService.append(session, next_rev, [dict(op) for op in ops])
+            SoloOpLogService.after_append(session)
+        return _DiffSaveResult(
+            session, prev_rev, write_ts, base_rev, intervening,
+            (time.monotonic() - locked_at) * 1000, 1, 'locked', new_state, cache_hit,
+        )
 
     @classmethod
     def _parse_if_match_header(cls, value):
@@ -543,8 +1157,9 @@ class SoloSessionDiffSaveView(BackoffThrottleMixin, QuotaLimitMixin, APIView):
         return body_rev
 
     def _get_session_for_update(self, pk, user):
+        """Locked session row; returns ``(session, hot_state_cache_hit)``."""
         queryset = SoloSession.objects.select_for_update().filter(pk=pk, user=user)
-        return get_object_or_404(queryset)
+        return SoloHotStateCache.load(queryset, pk)
 
     @staticmethod
     def _rev_mismatch_response(expected_rev, client_rev):
@@ -557,7 +1172,7 @@ class SoloSessionDiffSaveView(BackoffThrottleMixin, QuotaLimitMixin, APIView):
             status=status.HTTP_409_CONFLICT,
         )
 
-    def _log_diff_event(self, request, session, prev_rev, next_rev, ops_count, digest, client_ts, write_ts):
+    def _log_diff_event(self, request, session, ops_count, normalized_ops_count, client_ts, result):
         try:
             LogService.log_backend_event(
                 level='INFO',
@@ -566,12 +1181,17 @@ class SoloSessionDiffSaveView(BackoffThrottleMixin, QuotaLimitMixin, APIView):
                 user_id=request.user.id,
                 extra={
                     'session_id': str(session.id),
-                    'prev_rev': prev_rev,
-                    'next_rev': next_rev,
+                    'prev_rev': result.prev_rev,
+                    'next_rev': session.rev,
                     'ops_count': ops_count,
-                    'digest': digest,
+                    'normalized_ops_count': normalized_ops_count,
+                    'digest': session.state_digest,
                     'client_ts': client_ts.isoformat() if client_ts else None,
-                    'server_ts': write_ts.isoformat(),
+                    'server_ts': result.write_ts.isoformat(),
+                    'write_path': result.write_path,
+                    'lock_hold_ms': round(result.lock_hold_ms, 3),
+                    'cas_attempts': result.attempts,
+                    'state_cache_hit': result.state_cache_hit,
                 },
             )
         except Exception:
@@ -590,25 +1210,9 @@ class SoloSessionDiffSaveView(BackoffThrottleMixin, QuotaLimitMixin, APIView):
             except (TypeError, ValueError):
                 pass
 
-        try:
-            body = request.body
-        except RequestDataTooBig:
-            return self._payload_too_large_response()
-        if body and len(body) > limit:
-            return _payload_too_large_response(request, limit, 'raw')
-        encoding = (request.headers.get('Content-Encoding') or '').strip().lower()
-        if encoding == 'gzip':
-            _, err = _read_body_with_limit(request, limit)
-            if err:
-                return err
-        return None
-
-    @staticmethod
-    def _payload_too_large_response():
-        return Response(
-            {'detail': 'payload_too_large'},
-            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-        )
+        # Reads at most limit + 1 bytes of the body (see request_body).
+        _, err = _read_body_with_limit(request, limit)
+        return err
 
 
 # ============================================================ v0.29 Beacon/Stream Save
@@ -637,7 +1241,7 @@ class SoloSessionStreamSaveView(BackoffThrottleMixin, APIView):
             if body_error:
                 return body_error
             try:
-                parsed = json.loads(body_bytes.decode('utf-8')) if body_bytes else {}
+                parsed = codec.loads(body_bytes.decode('utf-8')) if body_bytes else {}
             except (json.JSONDecodeError, UnicodeDecodeError):
                 parsed = request.data
 
@@ -646,9 +1250,11 @@ class SoloSessionStreamSaveView(BackoffThrottleMixin, APIView):
             idempotency_key = parsed.get('idempotency_key') if isinstance(parsed, dict) else None
         else:
             # Raw body as state JSON
+            body, body_error = _read_body_with_limit(request, self.MAX_STREAM_BYTES)
+            if body_error:
+                return body_error
             try:
-                body = request.body
-                state_data = json.loads(body) if body else None
+                state_data = codec.loads(body) if body else None
                 client_ts = None
                 idempotency_key = None
             except (json.JSONDecodeError, ValueError):
@@ -665,74 +1271,200 @@ class SoloSessionStreamSaveView(BackoffThrottleMixin, APIView):
 
         # Idempotency (best-effort) for keepalive fetch.
         # Keyed by user+session+idempotency_key.
+        idem_cache_key = None
         if idempotency_key:
             idem_cache_key = f"solo:stream:idem:{request.user.id}:{pk}:{idempotency_key}"
-            cached = cache.get(idem_cache_key)
-            if cached:
-                return Response(cached, status=status.HTTP_202_ACCEPTED)
+            replayed = self._replayed_response(idem_cache_key)
+            if replayed is not None:
+                return replayed
 
-        session = get_object_or_404(SoloSession, pk=pk, user=request.user)
+        return self._save_state(request, pk, state_data, idem_cache_key)
 
+    def _save_state(self, request, pk, state_data, idem_cache_key=None):
+        """Save ``state_data`` as the session's new state under the If-Match/X-Rev checks."""
         if_match = request.headers.get('If-Match')
         if if_match:
             try:
-                if_match_rev = _parse_if_match_rev(if_match)
+                expected_rev = _parse_if_match_rev(if_match)
             except Exception:
                 return _precondition_failed_response()
         else:
-            if_match_rev = None
+            expected_rev = None
 
-        if if_match_rev is None:
+        session_qs = SoloSession.objects.filter(pk=pk, user=request.user)
+        if expected_rev is None:
             x_rev = request.headers.get('X-Rev') or request.headers.get('X-Revision')
-            if not x_rev:
-                return _rev_mismatch_response(session.rev)
             try:
-                x_rev_int = int(x_rev)
+                expected_rev = int(x_rev)
             except (TypeError, ValueError):
+                session = get_object_or_404(session_qs.only('rev'))
                 return _rev_mismatch_response(session.rev)
-            if session.rev != x_rev_int:
-                return _rev_mismatch_response(session.rev)
-        else:
-            if session.rev != if_match_rev:
+
+        def stale_response(server_rev):
+            if if_match:
                 return _precondition_failed_response()
+            return _rev_mismatch_response(server_rev)
+
+        # Digest and page count are computed before the DB is touched; the
+        # save itself is one conditional UPDATE (no row lock, no state read)
+        # or a write-behind buffer entry.
+        next_rev = expected_rev + 1
+        new_digest, new_tree = SoloDiffService.digest_state(state_data, next_rev)
+        page_count = max(1, len(state_data.get('pages') or []))
+        write_ts = timezone.now()
+
+        saved = None
+        if SoloWriteBuffer.enabled():
+            try:
+                saved = self._save_buffered(
+                    request, pk, expected_rev, state_data, new_digest, new_tree, page_count, write_ts,
+                )
+            except SoloWriteBufferBusy:
+                return _write_buffer_busy_response()
+        if saved is None:
+            saved = self._save_direct(
+                request, pk, expected_rev, state_data, new_digest, new_tree, page_count, write_ts,
+            )
+        session, response_payload = saved
+        if session is None:
+            return stale_response(response_payload)
+
+        no_change = response_payload.get('detail') == 'no_change'
+        code = status.HTTP_204_NO_CONTENT if no_change else status.HTTP_202_ACCEPTED
+        try:
+            if idem_cache_key and response_payload:
+                cache.set(idem_cache_key, (code, response_payload), timeout=60)
+        except Exception:
+            pass
+
+        # Best-effort: persist versioned snapshot async (do not block response).
+        try:
+            from apps.solo.tasks import upload_state_versioned_task
+            if response_payload.get('detail') == 'accepted':
+                upload_state_versioned_task.delay(str(request.user.id), str(session.id), int(session.rev))
+        except Exception:
+            pass
+
+        self._log_stream_save(request, session)
+        if no_change:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        return Response(response_payload, status=status.HTTP_202_ACCEPTED)
+
+    @staticmethod
+    def _replayed_response(idem_cache_key):
+        """The cached answer of an earlier save with this key, with its status."""
+        cached = cache.get(idem_cache_key)
+        if not cached:
+            return None
+        code, payload = cached
+        if code == status.HTTP_204_NO_CONTENT:
+            return Response(status=code)
+        return Response(payload, status=code)
+
+    def _save_direct(self, request, pk, expected_rev, state_data, new_digest, new_tree, page_count, write_ts):
+        """Single conditional UPDATE; returns ``(session, payload)`` or ``(None, server_rev)``."""
+        next_rev = expected_rev + 1
+        session_qs = SoloSession.objects.filter(pk=pk, user=request.user)
+        updated = session_qs.filter(
+            rev=expected_rev, storage_mode=STORAGE_BLOB,
+        ).exclude(state_digest=new_digest).update(
+            state=state_data,
+            rev=next_rev,
+            state_rev=next_rev,
+            state_digest=new_digest,
+            state_tree=SoloStateDigest.to_storage(new_tree) if new_tree else {},
+            page_count=page_count,
+            last_write_at=write_ts,
+            updated_at=write_ts,
+            **SoloStateBytes.values(state_data, next_rev),
+        )
+        if updated:
+            session = SoloSession(
+                pk=pk, user=request.user, rev=next_rev, state_rev=next_rev, state_digest=new_digest,
+                page_count=page_count, storage_mode=STORAGE_BLOB, last_write_at=write_ts,
+            )
+            SoloPageStore.maybe_schedule_convert(session)
+            return session, {'detail': 'accepted', 'rev': next_rev, 'digest': new_digest}
+
+        # Zero rows: stale rev, unchanged state, paged storage or no session.
+        session = get_object_or_404(session_qs.only('rev', 'storage_mode', 'state_digest', 'page_count'))
+        if session.rev != expected_rev:
+            return None, session.rev
+        if not SoloPageStore.is_paged(session) and session.state_digest == new_digest:
+            session_qs.filter(rev=expected_rev).update(last_write_at=write_ts, updated_at=write_ts)
+            return session, {'detail': 'no_change', 'rev': session.rev, 'digest': session.state_digest}
+        return self._save_locked(request, pk, expected_rev, state_data)
 
-        response_payload = None
+    @staticmethod
+    def _save_buffered(request, pk, expected_rev, state_data, new_digest, new_tree, page_count, write_ts):
+        """Stage the save in the write-behind buffer; ``None`` for paged sessions."""
+        queryset = SoloSession.objects.filter(pk=pk, user=request.user)
+        with SoloWriteBuffer.open(pk) as staged:
+            session = get_object_or_404(queryset.only('rev', 'storage_mode', 'state_digest', 'page_count'))
+            if SoloPageStore.is_paged(session):
+                return None
+            db_rev = session.rev
+            staged.overlay(session)
+            if session.rev != expected_rev:
+                return None, session.rev
+            if session.state_digest == new_digest:
+                return session, {'detail': 'no_change', 'rev': session.rev, 'digest': session.state_digest}
+            values = {
+                'rev': expected_rev + 1,
+                'state': state_data,
+                'state_digest': new_digest,
+                'state_tree': SoloStateDigest.to_storage(new_tree) if new_tree else {},
+                'page_count': page_count,
+            }
+            staged.stage(session, db_rev, values, write_ts)
+        return session, {'detail': 'accepted', 'rev': session.rev, 'digest': new_digest}
+
+    @staticmethod
+    def _save_locked(request, pk, expected_rev, state_data):
+        """Locked save for paged sessions (page rows are rewritten too).
+
+        Returns ``(session, response_payload)``, or ``(None, server_rev)`` if
+        the rev moved in the meantime.
+        """
         with transaction.atomic():
             session = SoloSession.objects.select_for_update().get(pk=pk, user=request.user)
+            if session.rev != expected_rev:
+                return None, session.rev
 
-            new_digest = SoloDiffService.compute_digest(state_data)
+            paged = SoloPageStore.is_paged(session)
+            if paged:
+                new_tree = SoloStateDigest.build(state_data, rev=session.rev + 1)
+                new_digest = new_tree['root']
+            else:
+                new_digest, new_tree = SoloDiffService.digest_state(state_data, session.rev + 1)
             if session.state_digest and session.state_digest == new_digest:
                 # No change: avoid extra work.
                 session.last_write_at = timezone.now()
                 session.save(update_fields=['last_write_at', 'updated_at'])
-                response_payload = {'detail': 'no_change', 'rev': session.rev, 'digest': session.state_digest}
+                return session, {'detail': 'no_change', 'rev': session.rev, 'digest': session.state_digest}
+
+            session.rev += 1
+            session.state_rev = session.rev
+            if paged:
+                if SoloPageStore.write_full_state(session, state_data, session.rev) is None:
+                    new_digest, new_tree = SoloDiffService.digest_state(state_data, session.rev)
+                else:
+                    new_tree = None
             else:
                 session.state = state_data
-                session.rev += 1
-                session.state_digest = new_digest
-                session.page_count = max(1, len(state_data.get('pages') or []))
-                session.last_write_at = timezone.now()
-                session.save(update_fields=['state', 'rev', 'state_digest', 'page_count', 'last_write_at', 'updated_at'])
-                response_payload = {'detail': 'accepted', 'rev': session.rev, 'digest': session.state_digest}
-
-            try:
-                if idempotency_key and response_payload:
-                    cache.set(idem_cache_key, response_payload, timeout=60)
-            except Exception:
-                pass
-
-            # Best-effort: persist versioned snapshot async (do not block response).
-            try:
-                from apps.solo.tasks import upload_state_versioned_task
-                if response_payload and response_payload.get('detail') == 'accepted':
-                    upload_state_versioned_task.delay(str(request.user.id), str(session.id), int(session.rev))
-            except Exception:
-                pass
-
-            self._log_stream_save(request, session)
-            if response_payload and response_payload.get('detail') == 'no_change':
-                return Response(status=status.HTTP_204_NO_CONTENT)
-            return Response(response_payload or {}, status=status.HTTP_202_ACCEPTED)
+            session.state_digest = new_digest
+            session.state_tree = SoloStateDigest.to_storage(new_tree) if new_tree else {}
+            session.page_count = max(1, len(state_data.get('pages') or []))
+            session.last_write_at = timezone.now()
+            state_bytes = {} if SoloPageStore.is_paged(session) else SoloStateBytes.values(state_data, session.rev)
+            for field, value in state_bytes.items():
+                setattr(session, field, value)
+            session.save(update_fields=[
+                'state', 'state_rev', 'rev', 'state_digest', 'state_tree', 'page_count',
+                'storage_mode', 'last_write_at', 'updated_at', *state_bytes,
+            ])
+        SoloPageStore.maybe_schedule_convert(session)
+        return session, {'detail': 'accepted', 'rev': session.rev, 'digest': session.state_digest}
 
     def _check_payload_limit(self, request):
         limit = self.MAX_STREAM_BYTES
@@ -743,15 +1475,9 @@ class SoloSessionStreamSaveView(BackoffThrottleMixin, APIView):
                     return _payload_too_large_response(request, limit, 'raw')
             except (TypeError, ValueError):
                 pass
-        body = request.body
-        if body and len(body) > limit:
-            return _payload_too_large_response(request, limit, 'raw')
-        encoding = (request.headers.get('Content-Encoding') or '').strip().lower()
-        if encoding == 'gzip':
-            _, err = _read_body_with_limit(request, limit)
-            if err:
-                return err
-        return None
+        # Reads at most limit + 1 bytes of the body (see request_body).
+        _, err = _read_body_with_limit(request, limit)
+        return err
 
     def _log_stream_save(self, request, session):
         try:
@@ -770,13 +1496,143 @@ class SoloSessionStreamSaveView(BackoffThrottleMixin, APIView):
             pass
 
 
+class SoloSessionUploadView(APIView):
+    """
+    POST /api/v1/solo/sessions/{id}/uploads/
+
+    Open a resumable upload of a full state for sessions too large, or
+    connections too flaky, for one save-stream request (see SoloUploadStore).
+    Body: {"size": bytes, "sha256": hex digest of the body, "chunk_size": optional}.
+    Returns 201 with the upload id and chunk layout.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [SoloSaveStreamThrottle]
+
+    def post(self, request, pk):
+        get_object_or_404(SoloSession.objects.only('id'), pk=pk, user=request.user)
+        data = request.data if isinstance(request.data, dict) else {}
+        try:
+            upload = SoloUploadStore.create(
+                request.user.id, pk, data.get('size'), data.get('sha256'), data.get('chunk_size'),
+            )
+        except SoloUploadError as exc:
+            return _upload_error_response(exc)
+        return Response(
+            _upload_payload(upload, list(range(upload['chunks']))),
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class SoloSessionUploadDetailView(APIView):
+    """
+    GET    /api/v1/solo/sessions/{id}/uploads/{upload_id}/  - chunks still missing
+    DELETE /api/v1/solo/sessions/{id}/uploads/{upload_id}/  - abandon the upload
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk, upload_id):
+        upload = SoloUploadStore.get(upload_id, request.user.id, pk)
+        if upload is None:
+            return _upload_not_found_response()
+        return Response(_upload_payload(upload, SoloUploadStore.missing(upload)))
+
+    def delete(self, request, pk, upload_id):
+        upload = SoloUploadStore.get(upload_id, request.user.id, pk)
+        if upload is not None:
+            SoloUploadStore.discard(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class SoloSessionUploadChunkView(APIView):
+    """
+    PUT /api/v1/solo/sessions/{id}/uploads/{upload_id}/chunks/{index}/
+
+    Raw chunk bytes (Content-Encoding as for save-stream). An optional
+    Content-Range must match the chunk's offsets. Re-sending a chunk
+    replaces it. Returns 204 No Content.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def put(self, request, pk, upload_id, index):
+        upload = SoloUploadStore.get(upload_id, request.user.id, pk)
+        if upload is None:
+            return _upload_not_found_response()
+
+        content_range = request.headers.get('Content-Range')
+        if content_range:
+            start, end = SoloUploadStore.chunk_range(upload, index)
+            match = _CONTENT_RANGE_PATTERN.match(content_range.strip())
+            if not match or tuple(map(int, match.groups())) != (start, end - 1, upload['size']):
+                return _upload_error_response(
+                    SoloUploadError('invalid_range', start=start, end=end - 1, size=upload['size']),
+                )
+
+        body, body_error = _read_body_with_limit(request, upload['chunk_size'])
+        if body_error:
+            return body_error
+        try:
+            SoloUploadStore.put_chunk(upload, index, body or b'')
+        except SoloUploadError as exc:
+            return _upload_error_response(exc)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class SoloSessionUploadCommitView(SoloSessionStreamSaveView):
+    """
+    POST /api/v1/solo/sessions/{id}/uploads/{upload_id}/commit/
+
+    Assemble the chunks, check them against the announced SHA-256 and save
+    the body (state JSON) like save-stream, with the same If-Match/X-Rev
+    rules and responses. The upload is kept after a 409/412 so it can be
+    committed again, and dropped once saved or found corrupt.
+    """
+
+    def post(self, request, pk, upload_id):
+        # A retried commit of a saved upload gets the same answer.
+        idem_cache_key = f"solo:upload:result:{request.user.id}:{pk}:{upload_id}"
+        replayed = self._replayed_response(idem_cache_key)
+        if replayed is not None:
+            return replayed
+
+        upload = SoloUploadStore.get(upload_id, request.user.id, pk)
+        if upload is None:
+            return _upload_not_found_response()
+        try:
+            body = SoloUploadStore.assemble(upload)
+        except SoloUploadError as exc:
+            if exc.code == 'digest_mismatch':
+                SoloUploadStore.discard(upload)
+            return _upload_error_response(exc)
+
+        try:
+            state_data = codec.loads(body)
+        except ValueError:
+            SoloUploadStore.discard(upload)
+            return Response(
+                {'detail': 'invalid_json'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not state_data or not isinstance(state_data, dict):
+            SoloUploadStore.discard(upload)
+            return Response(
+                {'detail': 'state_required'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        response = self._save_state(request, pk, state_data, idem_cache_key)
+        if response.status_code in (status.HTTP_202_ACCEPTED, status.HTTP_204_NO_CONTENT):
+            SoloUploadStore.discard(upload)
+        return response
+
+
 class SoloSessionBeaconSaveView(BackoffThrottleMixin, APIView):
     """
     POST /api/v1/solo/sessions/{id}/beacon
 
     Keepalive-friendly endpoint for navigator.sendBeacon().
     Max 64KB, text/plain or application/json.
-    Returns 204 No Content immediately.
+    Returns 204 No Content immediately; the heartbeat is coalesced in the
+    cache (see SoloHeartbeats).
     """
     permission_classes = [IsAuthenticated]
     throttle_classes = [SoloBeaconThrottle]
@@ -787,50 +1643,27 @@ class SoloSessionBeaconSaveView(BackoffThrottleMixin, APIView):
         if limit_error:
             return limit_error
 
-        session = get_object_or_404(SoloSession, pk=pk, user=request.user)
-
-        # Parse beacon payload
-        content_type = request.content_type or ''
-        body_bytes, body_error = _read_body_with_limit(request, self.MAX_BEACON_BYTES)
+        body, body_error = _read_body_with_limit(request, self.MAX_BEACON_BYTES)
         if body_error:
             return body_error
-        body = body_bytes
 
         if not body:
             return Response(status=status.HTTP_204_NO_CONTENT)
 
+        # application/json or text/plain; either way the body must be JSON.
         try:
-            if 'application/json' in content_type:
-                data = json.loads(body.decode('utf-8')) if body else {}
-            else:
-                # text/plain - try JSON parse
-                data = json.loads(body.decode('utf-8'))
+            codec.loads(body.decode('utf-8'))
         except (json.JSONDecodeError, ValueError, UnicodeDecodeError):
             return Response(
                 {'detail': 'invalid_payload'},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        client_ts = data.get('client_ts') if isinstance(data, dict) else None
-
-        # Fast log - do not fail request.
-        try:
-            LogService.log_backend_event(
-                level='INFO',
-                service='solo',
-                message='beacon_received',
-                user_id=request.user.id,
-                extra={
-                    'session_id': str(session.id),
-                    'size': len(body) if body else 0,
-                    'client_ts': client_ts,
-                },
-            )
-        except Exception:
-            pass
-
-        session.last_write_at = timezone.now()
-        session.save(update_fields=['last_write_at', 'updated_at'])
+        # No database access here: the heartbeat is written by
+        # solo.flush_heartbeats, which only matches sessions of this user.
+        SoloHeartbeats.record(pk, request.user.id)
+        # The tab is going away: persist its buffered saves soon.
+        SoloWriteBuffer.flush_soon(pk)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     def _check_payload_limit(self, request):
@@ -842,22 +1675,17 @@ class SoloSessionBeaconSaveView(BackoffThrottleMixin, APIView):
                     return _payload_too_large_response(request, limit, 'raw')
             except (TypeError, ValueError):
                 pass
-        body = request.body
-        if body and len(body) > limit:
-            return _payload_too_large_response(request, limit, 'raw')
-        encoding = (request.headers.get('Content-Encoding') or '').strip().lower()
-        if encoding == 'gzip':
-            _, err = _read_body_with_limit(request, limit)
-            if err:
-                return err
-        return None
+        # Reads at most limit + 1 bytes of the body (see request_body).
+        _, err = _read_body_with_limit(request, limit)
+        return err
 
 
 class SoloSessionSnapshotCreateView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, pk):
-        session = get_object_or_404(SoloSession, pk=pk, user=request.user)
+        SoloWriteBuffer.flush(pk)
+        session = get_object_or_404(SoloSession.objects.with_state_bytes(), pk=pk, user=request.user)
 
         idempotency_key = request.headers.get('Idempotency-Key')
         if idempotency_key:
@@ -869,7 +1697,7 @@ class SoloSessionSnapshotCreateView(APIView):
         rev = int(session.rev)
         path = f"solo/{request.user.id}/{session.id}/{rev}.json"
 
-        payload = json.dumps(session.state or {}, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        payload = SoloStateBytes.state_json(session)
 
         storage = SoloStorageService()
         existing_head = storage.head(path)
@@ -924,10 +1752,21 @@ class SoloSessionSnapshotCreateView(APIView):
 
 class SoloSessionSnapshotLatestView(APIView):
     permission_classes = [IsAuthenticated]
+    # Signed URLs expire at the end of the window after the current one, so a
+    # URL confirmed by a 304 is still valid for at least this long.
+    URL_WINDOW_SECONDS = 900
 
     def get(self, request, pk):
-        session = get_object_or_404(SoloSession, pk=pk, user=request.user)
+        SoloWriteBuffer.flush(pk)
+        session = get_object_or_404(SoloSession.objects.without_state(), pk=pk, user=request.user)
         rev = int(session.rev)
+        now = int(time.time())
+        expires_at = (now // self.URL_WINDOW_SECONDS + 2) * self.URL_WINDOW_SECONDS
+        # The body's URL expires, so the ETag names its expiry too.
+        etag = f'W/"snapshot:{rev}:{expires_at}"'
+        if _if_none_match(request, etag):
+            # The client already has this rev's snapshot: skip the storage lookup.
+            return _not_modified_response(etag)
         path = f"solo/{request.user.id}/{session.id}/{rev}.json"
         storage = SoloStorageService()
 
@@ -935,5 +1774,7 @@ class SoloSessionSnapshotLatestView(APIView):
         if head is None:
             return Response({'error': 'not_found'}, status=status.HTTP_404_NOT_FOUND)
 
-        url = storage.get_signed_url(path, expires_in=900)
-        return Response({'rev': rev, 'url': url}, status=status.HTTP_200_OK)
+        url = storage.get_signed_url(path, expires_in=expires_at - now)
+        response = Response({'rev': rev, 'url': url}, status=status.HTTP_200_OK)
+        response['ETag'] = etag
+        return response
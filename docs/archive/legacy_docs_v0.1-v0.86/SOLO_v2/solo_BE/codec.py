@@ -0,0 +1,124 @@
+"""
+JSON codec for the Solo hot paths (request bodies, digests, exports).
+
+Uses ``orjson`` when it is installed and the stdlib ``json`` module
+otherwise; ``SOLO_JSON_BACKEND`` (``'auto'``, ``'orjson'``, ``'json'``)
+forces one. Every function returns exactly what the stdlib call it replaces
+would return: the fast backend's result is only used when it provably
+matches, otherwise the call is redone with ``json``. The cases that fall
+back are:
+
+- ``loads``: input orjson rejects (NaN/Infinity, invalid UTF-8, ...) or
+  integers of 19+ digits (orjson turns those beyond 64 bits into floats).
+- ``dumps``/``canonical``: values orjson cannot encode (non-str keys, ints
+  beyond 64 bits, lone surrogates, deep nesting), floats below 1e-4 or
+  from 1e16 up (formatted differently), ``null`` in the output (orjson
+  also writes NaN/Infinity as ``null``) and, for ``canonical``, non-ASCII
+  output (``json`` escapes it).
+
+Only JSON-native values (dict, list, str, int, float, bool, None) are
+supported.
+"""
+import json
+from typing import Any, Union
+
+from django.conf import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+BACKEND_AUTO = 'auto'
+BACKEND_ORJSON = 'orjson'
+BACKEND_JSON = 'json'
+
+# orjson output is checked with plain substring searches (a regex scan
+# costs about as much as the encoding itself). Digits are first mapped to
+# '0' so "digit followed by e" is a single literal.
+_DIGITS_TO_ZERO = bytes.maketrans(b'123456789', b'000000000')
+_LONG_INT = b'0' * 19
+_NUMBER_CHARS = frozenset(b'0123456789.-+')
+# Bytes that can precede a value in orjson output (compact or indented).
+_VALUE_PREFIX = frozenset(b':,[ \n')
+
+
+def backend() -> str:
+    """Name of the backend in use."""
+    name = getattr(settings, 'SOLO_JSON_BACKEND', BACKEND_AUTO)
+    if name == BACKEND_JSON or orjson is None:
+        return BACKEND_JSON
+    return BACKEND_ORJSON
+
+
+def _no_default(value):
+    raise TypeError(f'Type is not JSON serializable: {type(value).__name__}')
+
+
+def _in_number(out: bytes, haystack: bytes, needle: bytes) -> bool:
+    """True if an occurrence of ``needle`` in ``haystack`` lies in a number token of ``out``."""
+    i = haystack.find(needle)
+    while i != -1:
+        start = i
+        while start and out[start - 1] in _NUMBER_CHARS:
+            start -= 1
+        if not start or out[start - 1] in _VALUE_PREFIX:
+            return True
+        i = haystack.find(needle, i + 1)
+    return False
+
+
+def _orjson_dumps(value: Any, option: int):
+    """orjson output, or ``None`` if it may differ from the stdlib output."""
+    try:
+        out = orjson.dumps(
+            value,
+            default=_no_default,
+            option=option | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS,
+        )
+    except TypeError:
+        return None
+    if b'null' in out:
+        return None
+    # Exponent notation ('1e16', '2.5e-7') and small decimals ('0.00001').
+    if _in_number(out, out.translate(_DIGITS_TO_ZERO), b'0e') or _in_number(out, out, b'0.0000'):
+        return None
+    return out
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Same as ``json.loads``."""
+    if backend() == BACKEND_ORJSON:
+        try:
+            raw = data.encode('utf-8') if isinstance(data, str) else data
+        except UnicodeEncodeError:
+            raw = None
+        if raw is not None and _LONG_INT not in raw.translate(_DIGITS_TO_ZERO):
+            try:
+                return orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                pass
+    return json.loads(data)
+
+
+def dumps(value: Any, indent: bool = False) -> bytes:
+    """UTF-8 JSON, same as ``json.dumps(value, ensure_ascii=False, ...)``.
+
+    Compact separators by default, two-space indentation with ``indent``.
+    """
+    if backend() == BACKEND_ORJSON:
+        out = _orjson_dumps(value, orjson.OPT_INDENT_2 if indent else 0)
+        if out is not None:
+            return out
+    if indent:
+        return json.dumps(value, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def canonical(value: Any) -> bytes:
+    """Canonical form hashed by the state digests (sorted keys, ASCII, compact)."""
+    if backend() == BACKEND_ORJSON:
+        out = _orjson_dumps(value, orjson.OPT_SORT_KEYS)
+        if out is not None and out.isascii() and b'\x7f' not in out:
+            return out
+    return json.dumps(value, sort_keys=True, separators=(',', ':')).encode('utf-8')
@@ -9,3 +9,7 @@ SOLO_ENDPOINT_LIMITS = {
     ('POST', '/api/v1/solo/sessions/', '/save-stream/'): STREAM_MAX_BYTES,
     ('POST', '/api/v1/solo/sessions/', '/beacon/'): BEACON_MAX_BYTES,
 }
+
+# Resumable save-stream uploads: total state size and largest chunk.
+UPLOAD_MAX_BYTES = 32 * 1024 * 1024
+UPLOAD_CHUNK_MAX_BYTES = 1024 * 1024
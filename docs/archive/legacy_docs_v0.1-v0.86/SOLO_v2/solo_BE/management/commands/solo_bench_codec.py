@@ -0,0 +1,100 @@
+"""
+Benchmark the Solo JSON codec backends.
+
+    python manage.py solo_bench_codec --pages 20 --strokes 500
+    python manage.py solo_bench_codec --session <uuid>
+"""
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from apps.solo import codec
+
+
+def build_state(pages: int, strokes: int, seed: int = 0) -> dict:
+    """Synthetic session shaped like what the canvas client saves."""
+    rng = random.Random(seed)
+    state = {'activePageId': 'page-0', 'meta': {'zoom': 1.0, 'title': 'Benchmark'}, 'pages': []}
+    for p in range(pages):
+        state['pages'].append({
+            'id': f'page-{p}',
+            'background': '#ffffff',
+            'strokes': [
+                {
+                    'id': f'stroke-{p}-{s}',
+                    'tool': rng.choice(['pen', 'marker', 'highlighter']),
+                    'color': f'#{rng.randrange(0x1000000):06x}',
+                    'width': rng.choice([1, 2, 4, 8]),
+                    'opacity': round(rng.uniform(0.2, 1.0), 2),
+                    'points': [
+                        [round(rng.uniform(0, 1920), 2), round(rng.uniform(0, 1080), 2), round(rng.random(), 3)]
+                        for _ in range(rng.randint(10, 60))
+                    ],
+                }
+                for s in range(strokes)
+            ],
+            'assets': [
+                {'id': f'asset-{p}-{a}', 'type': 'image', 'x': 10 * a, 'y': 20 * a, 'w': 320, 'h': 240,
+                 'url': f'https://cdn.example.com/solo/{p}/{a}.png'}
+                for a in range(3)
+            ],
+        })
+    return state
+
+
+def _best_of(func, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+class Command(BaseCommand):
+    help = 'Compare the json and orjson backends of apps.solo.codec'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=10)
+        parser.add_argument('--strokes', type=int, default=300, help='Strokes per page')
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--session', help='Benchmark the state of an existing session instead')
+
+    def handle(self, *args, **options):
+        if options['session']:
+            from apps.solo.models import SoloSession
+            from apps.solo.services import SoloStateService
+
+            try:
+                session = SoloSession.objects.get(pk=options['session'])
+            except SoloSession.DoesNotExist:
+                raise CommandError(f"Session {options['session']} not found")
+            state = SoloStateService.current_state(session)
+        else:
+            state = build_state(options['pages'], options['strokes'])
+
+        body = codec.dumps(state)
+        self.stdout.write(f'State size: {len(body) / 1024:.1f} KiB')
+        if codec.orjson is None:
+            self.stdout.write(self.style.WARNING('orjson is not installed; only the json backend is measured'))
+
+        results = {}
+        for name in (codec.BACKEND_JSON, codec.BACKEND_ORJSON):
+            if name == codec.BACKEND_ORJSON and codec.orjson is None:
+                continue
+            with override_settings(SOLO_JSON_BACKEND=name):
+                results[name] = {
+                    'loads': _best_of(lambda: codec.loads(body), options['repeat']),
+                    'dumps': _best_of(lambda: codec.dumps(state), options['repeat']),
+                    'canonical': _best_of(lambda: codec.canonical(state), options['repeat']),
+                }
+
+        self.stdout.write(f"{'op':<10} " + ' '.join(f'{name:>10}' for name in results) + '   speedup')
+        for op in ('loads', 'dumps', 'canonical'):
+            timings = [results[name][op] for name in results]
+            line = f'{op:<10} ' + ' '.join(f'{ms:>8.2f}ms' for ms in timings)
+            if len(timings) == 2 and timings[1]:
+                line += f'   {timings[0] / timings[1]:>6.1f}x'
+            self.stdout.write(line)
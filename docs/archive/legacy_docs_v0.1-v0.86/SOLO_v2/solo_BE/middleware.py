@@ -1,14 +1,21 @@
 """
 Middleware for Solo Workspace.
 """
-import gzip
 import logging
 import uuid
-import io
 
 from rest_framework.response import Response
 from rest_framework import status
 
+from apps.solo.request_body import (
+    accept_encoding,
+    content_encoding,
+    decode_body,
+    supported_encodings,
+    BODY_TOO_LARGE,
+    BODY_UNSUPPORTED_ENCODING,
+)
+
 logger = logging.getLogger('solo.audit')
 
 
@@ -61,6 +68,10 @@ class BodySizeLimitMiddleware:
             from apps.solo.limits import BEACON_MAX_BYTES
             return BEACON_MAX_BYTES
 
+        if request.method == 'PUT' and '/uploads/' in request.path and '/chunks/' in request.path:
+            from apps.solo.limits import UPLOAD_CHUNK_MAX_BYTES
+            return UPLOAD_CHUNK_MAX_BYTES
+
         return None
 
     def __call__(self, request):
@@ -68,13 +79,15 @@ class BodySizeLimitMiddleware:
         if limit is None:
             return self.get_response(request)
 
-        encoding = (request.headers.get('Content-Encoding') or '').strip().lower()
-        if encoding == 'br':
-            return Response(
-                {'error': 'unsupported_media_type'},
-                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
-            )
+        response = self._check(request, limit)
+        if response is None:
+            response = self.get_response(request)
+        # Advertise the accepted request codings (RFC 7694).
+        response['Accept-Encoding'] = accept_encoding()
+        return response
 
+    def _check(self, request, limit):
+        encoding = content_encoding(request)
         content_length = request.META.get('CONTENT_LENGTH')
         if content_length:
             try:
@@ -84,7 +97,7 @@ class BodySizeLimitMiddleware:
                             'detail': 'payload_too_large',
                             'error': 'payload_too_large',
                             'limit': limit,
-                            'encoding': 'gzip' if encoding == 'gzip' else 'raw',
+                            'encoding': 'raw' if encoding in ('', 'identity') else encoding,
                             'endpoint': request.path,
                             'request_id': self._get_request_id(request),
                         },
@@ -93,45 +106,25 @@ class BodySizeLimitMiddleware:
             except (TypeError, ValueError):
                 pass
 
-        body = request.body or b''
-        if not encoding or encoding == 'identity':
-            if len(body) > limit:
-                return Response(
-                    {
-                        'detail': 'payload_too_large',
-                        'error': 'payload_too_large',
-                        'limit': limit,
-                        'encoding': 'raw',
-                        'endpoint': request.path,
-                        'request_id': self._get_request_id(request),
-                    },
-                    status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                )
-            return self.get_response(request)
-
-        if encoding != 'gzip':
+        # Decoded once here; the views reuse the cached result.
+        decoded = decode_body(request, limit)
+        if decoded.error == BODY_UNSUPPORTED_ENCODING:
             return Response(
-                {'error': 'unsupported_media_type'},
+                {'error': 'unsupported_media_type', 'accepted_encodings': supported_encodings()},
                 status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
             )
-
-        try:
-            gz = gzip.GzipFile(fileobj=io.BytesIO(body))
-            decompressed = gz.read(limit + 1)
-        except OSError:
-            return self.get_response(request)
-
-        if len(decompressed) > limit:
+        if decoded.error == BODY_TOO_LARGE:
             return Response(
                 {
                     'detail': 'payload_too_large',
                     'error': 'payload_too_large',
                     'limit': limit,
-                    'encoding': 'gzip',
+                    'encoding': decoded.encoding,
                     'endpoint': request.path,
                     'request_id': self._get_request_id(request),
                 },
                 status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
             )
 
-        return self.get_response(request)
+        # Invalid compressed data is left to the view (400 invalid_<coding>).
+        return None
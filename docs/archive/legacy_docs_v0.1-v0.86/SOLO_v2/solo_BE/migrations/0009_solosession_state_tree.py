@@ -0,0 +1,18 @@
+# Generated manually - per-page state digest tree
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solo', '0008_remove_solosession_solo_session_user_updated_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solosession',
+            name='state_tree',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
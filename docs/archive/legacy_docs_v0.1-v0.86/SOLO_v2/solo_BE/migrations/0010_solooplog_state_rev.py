@@ -0,0 +1,41 @@
+# Generated manually - append-only op log
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def materialize_at_current_rev(apps, schema_editor):
+    SoloSession = apps.get_model('solo', 'SoloSession')
+    SoloSession.objects.update(state_rev=F('rev'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solo', '0009_solosession_state_tree'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solosession',
+            name='state_rev',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(materialize_at_current_rev, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='SoloOpLog',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('rev', models.PositiveIntegerField()),
+                ('ops', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='op_log', to='solo.solosession')),
+            ],
+            options={
+                'db_table': 'solo_op_log',
+                'ordering': ['session', 'rev'],
+                'constraints': [models.UniqueConstraint(fields=('session', 'rev'), name='solo_op_log_session_rev_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated manually - per-page normalized storage
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solo', '0010_solooplog_state_rev'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solosession',
+            name='storage_mode',
+            field=models.CharField(choices=[('blob', 'Single state blob'), ('paged', 'Per-page rows')], default='blob', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='SoloPage',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('page_id', models.CharField(max_length=255)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('data', models.JSONField(default=dict)),
+                ('rev', models.PositiveIntegerField(default=0)),
+                ('digest', models.CharField(blank=True, default='', max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='page_rows', to='solo.solosession')),
+            ],
+            options={
+                'db_table': 'solo_page',
+                'ordering': ['session', 'position'],
+                'indexes': [models.Index(fields=['session', 'position'], name='solo_page_session_pos_idx')],
+                'constraints': [models.UniqueConstraint(fields=('session', 'page_id'), name='solo_page_session_page_uniq')],
+            },
+        ),
+    ]
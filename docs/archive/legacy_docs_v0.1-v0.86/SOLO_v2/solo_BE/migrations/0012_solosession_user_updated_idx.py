@@ -0,0 +1,17 @@
+# Generated manually - keyset pagination of the session list
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solo', '0011_solopage_storage_mode'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='solosession',
+            index=models.Index(fields=['user', '-updated_at', '-id'], name='solo_session_user_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated manually - serialized state bytes
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solo', '0012_solosession_user_updated_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solosession',
+            name='state_bytes',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='solosession',
+            name='state_bytes_encoding',
+            field=models.CharField(blank=True, default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='solosession',
+            name='state_bytes_size',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='solosession',
+            name='state_bytes_rev',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -7,10 +7,38 @@ from django.conf import settings
 from django.utils import timezone
 
 
+class SoloSessionQuerySet(models.QuerySet):
+    # Columns holding the canvas; everything else is small metadata.
+    STATE_FIELDS = ('state', 'state_tree', 'state_bytes')
+
+    def without_state(self):
+        """Defer the state columns, for endpoints that only need metadata."""
+        return self.defer(*self.STATE_FIELDS)
+
+    def with_state_bytes(self):
+        """Load the stored state bytes (see ``SoloStateBytes``) instead of ``state``.
+
+        ``state`` is then loaded on access, i.e. only when the bytes are stale.
+        """
+        from apps.solo.services.statebytes import SoloStateBytes
+
+        if not SoloStateBytes.enabled():
+            return self
+        return self.defer(None).defer('state', 'state_tree')
+
+
+class SoloSessionManager(models.Manager.from_queryset(SoloSessionQuerySet)):
+    def get_queryset(self):
+        # Only the readers that serve them load the stored state bytes.
+        return super().get_queryset().defer('state_bytes')
+
+
 class SoloSession(models.Model):
     """
     A saved solo practice session.
     """
+    objects = SoloSessionManager()
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -19,14 +47,29 @@ class SoloSession(models.Model):
     )
     name = models.CharField(max_length=255, default='Untitled')
     
-    # JSON state of all pages
+    STORAGE_CHOICES = [
+        ('blob', 'Single state blob'),
+        ('paged', 'Per-page rows'),
+    ]
+    storage_mode = models.CharField(max_length=10, choices=STORAGE_CHOICES, default='blob')
+    
+    # JSON state of all pages ('paged' storage: state without pages, see SoloPage)
     state = models.JSONField(default=dict)
     
     # Metadata
     page_count = models.PositiveIntegerField(default=1)
     thumbnail_url = models.URLField(blank=True, null=True)
     rev = models.PositiveIntegerField(default=0)
+    # Rev that `state` is materialized at; SoloOpLog rows above it are the tail
+    state_rev = models.PositiveIntegerField(default=0)
     state_digest = models.CharField(max_length=64, blank=True, default='')
+    # Per-page digest tree (SOLO_DIGEST_MODE='tree'), see SoloStateDigest
+    state_tree = models.JSONField(default=dict, blank=True)
+    # JSON encoding of the state at state_bytes_rev, see SoloStateBytes
+    state_bytes = models.BinaryField(blank=True, null=True)
+    state_bytes_encoding = models.CharField(max_length=10, blank=True, default='')
+    state_bytes_size = models.PositiveIntegerField(default=0)
+    state_bytes_rev = models.PositiveIntegerField(blank=True, null=True)
     last_write_at = models.DateTimeField(blank=True, null=True)
     
     # Timestamps
@@ -36,11 +79,71 @@ class SoloSession(models.Model):
     class Meta:
         db_table = 'solo_session'
         ordering = ['-updated_at']
+        indexes = [
+            # Keyset pagination of the session list.
+            models.Index(fields=['user', '-updated_at', '-id'], name='solo_session_user_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.user.email})"
 
 
+class SoloPage(models.Model):
+    """
+    One page of a session in paged storage mode.
+    """
+    id = models.BigAutoField(primary_key=True)
+    session = models.ForeignKey(
+        SoloSession,
+        on_delete=models.CASCADE,
+        related_name='page_rows'
+    )
+    page_id = models.CharField(max_length=255)
+    position = models.PositiveIntegerField(default=0)
+    data = models.JSONField(default=dict)
+    rev = models.PositiveIntegerField(default=0)
+    digest = models.CharField(max_length=64, blank=True, default='')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'solo_page'
+        ordering = ['session', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'page_id'], name='solo_page_session_page_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['session', 'position'], name='solo_page_session_pos_idx'),
+        ]
+
+    def __str__(self):
+        return f"Page {self.page_id} of {self.session_id} (rev={self.rev})"
+
+
+class SoloOpLog(models.Model):
+    """
+    Append-only log of validated diff ops, one row per accepted rev.
+    """
+    id = models.BigAutoField(primary_key=True)
+    session = models.ForeignKey(
+        SoloSession,
+        on_delete=models.CASCADE,
+        related_name='op_log'
+    )
+    rev = models.PositiveIntegerField()
+    ops = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'solo_op_log'
+        ordering = ['session', 'rev']
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'rev'], name='solo_op_log_session_rev_uniq'),
+        ]
+
+    def __str__(self):
+        return f"OpLog {self.session_id} rev={self.rev} ({len(self.ops or [])} ops)"
+
+
 class SoloExport(models.Model):
     """
     Exported PNG/PDF from a solo session.
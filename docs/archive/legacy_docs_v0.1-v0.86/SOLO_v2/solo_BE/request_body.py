@@ -0,0 +1,253 @@
+"""
+Bounded, decode-once access to compressed request bodies.
+
+``BodySizeLimitMiddleware``, the views' payload checks and the views'
+parsers all need the decoded body. ``decode_body`` decompresses it at most
+once per request, incrementally and never past ``limit + 1`` bytes, and
+caches the outcome (bytes or error) on the underlying ``HttpRequest`` so
+the DRF ``Request`` wrapper and the middleware share it.
+
+The raw body is read from the input stream in chunks rather than through
+``request.body``, so a body without ``Content-Length`` (chunked
+``save-stream`` uploads) is abandoned after ``limit + 1`` bytes. Accepted
+bodies are handed back to Django as ``request.body``/``request.read()``
+without another copy.
+
+``gzip`` is always accepted; ``zstd`` and ``br`` are accepted when the
+optional ``zstandard`` / ``brotli`` (or ``brotlicffi``) packages are
+installed. ``accept_encoding()`` lists what this server decodes, for the
+``Accept-Encoding`` response header.
+"""
+import io
+import zlib
+from typing import NamedTuple, Optional
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+BODY_TOO_LARGE = 'too_large'
+BODY_UNSUPPORTED_ENCODING = 'unsupported_encoding'
+BODY_INVALID_ENCODING = 'invalid_encoding'
+
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+_CACHE_ATTR = '_solo_decoded_body'
+# Input slice fed per step to decoders without an output limit; small, since
+# a single slice of a crafted stream can still expand a great deal.
+_BROTLI_INPUT_CHUNK = 256
+_ZSTD_READ_SIZE = 64 * 1024
+_RAW_READ_SIZE = 64 * 1024
+
+
+class DecodedBody(NamedTuple):
+    data: Optional[bytes]
+    error: Optional[str] = None
+    # 'raw' or the content coding, as reported in 413 responses.
+    encoding: str = 'raw'
+
+
+def content_encoding(request) -> str:
+    return (request.headers.get('Content-Encoding') or '').strip().lower()
+
+
+def supported_encodings() -> list:
+    """Content codings ``decode_body`` can decode, preferred first."""
+    encodings = []
+    if zstandard is not None:
+        encodings.append('zstd')
+    if brotli is not None:
+        encodings.append('br')
+    encodings.append('gzip')
+    return encodings
+
+
+def accept_encoding() -> str:
+    return ', '.join(supported_encodings() + ['identity'])
+
+
+class _Collector:
+    """Collects decoded chunks and reports when ``limit`` is exceeded."""
+
+    __slots__ = ('chunks', 'total', 'limit')
+
+    def __init__(self, limit: int):
+        self.chunks = []
+        self.total = 0
+        self.limit = limit
+
+    @property
+    def room(self) -> int:
+        """Bytes that may still be produced before the limit is known to be exceeded."""
+        return self.limit + 1 - self.total
+
+    def add(self, chunk: bytes) -> bool:
+        """Store ``chunk``; False once the limit is exceeded."""
+        self.total += len(chunk)
+        if self.total > self.limit:
+            return False
+        self.chunks.append(chunk)
+        return True
+
+    def result(self, encoding: str) -> DecodedBody:
+        return DecodedBody(b''.join(self.chunks), encoding=encoding)
+
+
+def _raw_stream(http_request):
+    """Readable for the raw body, or ``None`` once Django has consumed it."""
+    if getattr(http_request, '_read_started', False):
+        return None
+    environ = getattr(http_request, 'environ', None) or {}
+    if not http_request.META.get('CONTENT_LENGTH') and environ.get('wsgi.input_terminated'):
+        # Chunked upload: Django's own stream is capped at the (missing)
+        # Content-Length, the server-dechunked input is not.
+        return environ['wsgi.input']
+    return http_request
+
+
+def _read_raw(http_request, limit: int) -> Optional[bytes]:
+    """The raw body, or ``None`` if it is longer than ``limit`` bytes."""
+    if hasattr(http_request, '_body'):
+        body = http_request._body or b''
+        return body if len(body) <= limit else None
+    stream = _raw_stream(http_request)
+    if stream is None:
+        # Read through request.read() elsewhere; let Django raise as it would.
+        body = http_request.body or b''
+        return body if len(body) <= limit else None
+
+    chunks = []
+    total = 0
+    while True:
+        chunk = stream.read(min(_RAW_READ_SIZE, limit + 1 - total))
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > limit:
+            # Stop reading; the rest of the upload is never buffered.
+            http_request._read_started = True
+            return None
+        chunks.append(chunk)
+    body = chunks[0] if len(chunks) == 1 else b''.join(chunks)
+    # Same state Django leaves after evaluating request.body.
+    http_request._body = body
+    http_request._stream = io.BytesIO(body)
+    return body
+
+
+def _gunzip(data: bytes, limit: int) -> DecodedBody:
+    """Decompress all gzip members of ``data``, stopping after ``limit + 1`` bytes."""
+    out = _Collector(limit)
+    pending = data
+    while pending:
+        decompressor = zlib.decompressobj(_GZIP_WBITS)
+        try:
+            chunk = decompressor.decompress(pending, out.room)
+        except zlib.error:
+            return DecodedBody(None, BODY_INVALID_ENCODING, 'gzip')
+        if not out.add(chunk):
+            return DecodedBody(None, BODY_TOO_LARGE, 'gzip')
+        if not decompressor.eof:
+            # Input ended inside a member (max_length was not reached).
+            return DecodedBody(None, BODY_INVALID_ENCODING, 'gzip')
+        # Like GzipFile: further members may follow, zero padding is skipped.
+        pending = decompressor.unused_data.lstrip(b'\x00')
+    return out.result('gzip')
+
+
+def _unzstd(data: bytes, limit: int) -> DecodedBody:
+    """Decompress all zstd frames of ``data``, reading at most ``limit + 1`` bytes."""
+    out = _Collector(limit)
+    try:
+        reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data), read_across_frames=True)
+        with reader:
+            while True:
+                chunk = reader.read(min(_ZSTD_READ_SIZE, out.room))
+                if not chunk:
+                    break
+                if not out.add(chunk):
+                    return DecodedBody(None, BODY_TOO_LARGE, 'zstd')
+    except zstandard.ZstdError:
+        return DecodedBody(None, BODY_INVALID_ENCODING, 'zstd')
+    return out.result('zstd')
+
+
+def _unbrotli(data: bytes, limit: int) -> DecodedBody:
+    """Decompress a brotli stream, stopping after ``limit + 1`` bytes."""
+    out = _Collector(limit)
+    decompressor = brotli.Decompressor()
+    try:
+        try:
+            # brotli >= 1.1 can cap the output of each call.
+            chunk = decompressor.process(data, output_buffer_limit=out.room)
+        except TypeError:
+            return _unbrotli_chunked(decompressor, data, out)
+        while True:
+            if not out.add(chunk):
+                return DecodedBody(None, BODY_TOO_LARGE, 'br')
+            if decompressor.is_finished() or decompressor.can_accept_more_data():
+                break
+            chunk = decompressor.process(b'', output_buffer_limit=out.room)
+    except brotli.error:
+        return DecodedBody(None, BODY_INVALID_ENCODING, 'br')
+    if not decompressor.is_finished():
+        return DecodedBody(None, BODY_INVALID_ENCODING, 'br')
+    return out.result('br')
+
+
+def _unbrotli_chunked(decompressor, data: bytes, out: _Collector) -> DecodedBody:
+    """Older brotli bindings cannot cap the output of a call.
+
+    Feed small input slices instead and check the running output total
+    after every ``process()`` call, stopping at the first one that takes it
+    over the limit.
+    """
+    for start in range(0, len(data), _BROTLI_INPUT_CHUNK):
+        chunk = decompressor.process(data[start:start + _BROTLI_INPUT_CHUNK])
+        if not out.add(chunk):
+            return DecodedBody(None, BODY_TOO_LARGE, 'br')
+    if not decompressor.is_finished():
+        return DecodedBody(None, BODY_INVALID_ENCODING, 'br')
+    return out.result('br')
+
+
+# Content coding -> name of its decoder in this module, looked up per request.
+_DECODERS = {'gzip': '_gunzip'}
+if zstandard is not None:
+    _DECODERS['zstd'] = '_unzstd'
+if brotli is not None:
+    _DECODERS['br'] = '_unbrotli'
+
+
+def decode_body(request, limit: int) -> DecodedBody:
+    """Return the decoded body of ``request`` (an HttpRequest or DRF Request)."""
+    http_request = getattr(request, '_request', request)
+    cached = getattr(http_request, _CACHE_ATTR, None)
+    if cached is not None and cached[0] == limit:
+        return cached[1]
+
+    encoding = content_encoding(http_request)
+    if encoding and encoding != 'identity' and encoding not in _DECODERS:
+        result = DecodedBody(None, BODY_UNSUPPORTED_ENCODING)
+    else:
+        # Compressed bodies larger than the decoded limit are refused as well,
+        # like an oversized Content-Length.
+        body = _read_raw(http_request, limit)
+        label = 'raw' if not encoding or encoding == 'identity' else encoding
+        if body is None:
+            result = DecodedBody(None, BODY_TOO_LARGE, label)
+        elif label == 'raw':
+            result = DecodedBody(body)
+        else:
+            result = globals()[_DECODERS[encoding]](body, limit)
+
+    setattr(http_request, _CACHE_ATTR, (limit, result))
+    return result
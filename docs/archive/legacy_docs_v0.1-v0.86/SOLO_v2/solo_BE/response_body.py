@@ -0,0 +1,124 @@
+"""
+Negotiated, cached compressed bodies for large Solo responses.
+
+With ``SOLO_COMPRESS_RESPONSES`` enabled, session detail and public GET
+pick a content coding from ``Accept-Encoding`` (``zstd`` and ``br`` when
+the optional ``zstandard`` / ``brotli`` packages are installed, ``gzip``
+always). A body of at least ``SOLO_COMPRESS_MIN_BYTES`` is compressed once
+per representation and coding and kept in the Django cache under the
+response's ETag, so later requests for the same rev are served from the
+cache without loading the state or compressing again. Compressed responses
+carry ``Content-Encoding`` and ``Vary: Accept-Encoding``; a proxy or
+``GZipMiddleware`` in front leaves them alone.
+"""
+import gzip
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+DEFAULT_MIN_BYTES = 4096
+DEFAULT_CACHE_SECONDS = 60 * 60
+
+
+def _compress_gzip(data: bytes) -> bytes:
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def _compress_zstd(data: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=6).compress(data)
+
+
+def _compress_br(data: bytes) -> bytes:
+    return brotli.compress(data, quality=5)
+
+
+# Server preference, best ratio first.
+_COMPRESSORS = {}
+if zstandard is not None:
+    _COMPRESSORS['zstd'] = _compress_zstd
+if brotli is not None:
+    _COMPRESSORS['br'] = _compress_br
+_COMPRESSORS['gzip'] = _compress_gzip
+
+
+def enabled() -> bool:
+    return bool(getattr(settings, 'SOLO_COMPRESS_RESPONSES', False))
+
+
+def min_bytes() -> int:
+    return max(0, int(getattr(settings, 'SOLO_COMPRESS_MIN_BYTES', DEFAULT_MIN_BYTES)))
+
+
+def cache_seconds() -> int:
+    return max(1, int(getattr(settings, 'SOLO_COMPRESS_CACHE_SECONDS', DEFAULT_CACHE_SECONDS)))
+
+
+def negotiate(request) -> Optional[str]:
+    """Best coding the client accepts, or ``None`` for identity."""
+    header = request.headers.get('Accept-Encoding') or ''
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+    wildcard = accepted.get('*', 0.0)
+    best, best_quality = None, 0.0
+    for coding in _COMPRESSORS:
+        quality = accepted.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def cache_key(kind: str, key, etag: str, encoding: str) -> str:
+    return f'solo:body:{kind}:{key}:{etag.removeprefix("W/").strip(chr(34))}:{encoding}'
+
+
+def cached_response(kind: str, key, etag: str, encoding: str) -> Optional[HttpResponse]:
+    body = cache.get(cache_key(kind, key, etag, encoding))
+    if body is None:
+        return None
+    return _response(body, encoding, etag)
+
+
+def compressed_response(kind: str, key, etag: str, encoding: Optional[str], body: bytes) -> HttpResponse:
+    """Response for the JSON ``body``, compressed and cached when worth it."""
+    if encoding is None or len(body) < min_bytes():
+        return _response(body, None, etag)
+    compressed = _COMPRESSORS[encoding](body)
+    cache.set(cache_key(kind, key, etag, encoding), compressed, timeout=cache_seconds())
+    return _response(compressed, encoding, etag)
+
+
+def _response(body: bytes, encoding: Optional[str], etag: str) -> HttpResponse:
+    response = HttpResponse(body, content_type='application/json')
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -10,6 +10,17 @@ from apps.solo.services.sharing import SharingService
 from apps.solo.services.thumbnail import ThumbnailService
 from apps.solo.services.cdn import CdnService
 from apps.solo.services.solo import SoloService, SoloDiffService, SoloDiffError
+from apps.solo.services.digest import SoloStateDigest
+from apps.solo.services.oplog import SoloOpLogService
+from apps.solo.services.pages import SoloPageStore
+from apps.solo.services.state import SoloStateService
+from apps.solo.services.rebase import SoloRebaseService, SoloRebaseConflict
+from apps.solo.services.buffer import SoloWriteBuffer, SoloWriteBufferBusy
+from apps.solo.services.hotstate import SoloHotStateCache
+from apps.solo.services.groupcommit import SoloDiffGroupCommit
+from apps.solo.services.statebytes import SoloStateBytes
+from apps.solo.services.heartbeat import SoloHeartbeats
+from apps.solo.services.uploads import SoloUploadStore, SoloUploadError
 
 
 __all__ = [
@@ -24,4 +35,18 @@ __all__ = [
     'SoloService',
     'SoloDiffService',
     'SoloDiffError',
+    'SoloStateDigest',
+    'SoloOpLogService',
+    'SoloPageStore',
+    'SoloStateService',
+    'SoloRebaseService',
+    'SoloRebaseConflict',
+    'SoloWriteBuffer',
+    'SoloWriteBufferBusy',
+    'SoloHotStateCache',
+    'SoloDiffGroupCommit',
+    'SoloStateBytes',
+    'SoloHeartbeats',
+    'SoloUploadStore',
+    'SoloUploadError',
 ]
@@ -0,0 +1,215 @@
+"""
+Write-behind buffer for Solo autosaves.
+
+With ``SOLO_WRITE_BEHIND`` enabled, accepted diff and stream saves of blob
+sessions are staged in the Django cache instead of the ``SoloSession`` row:
+one entry per session holding the latest state, rev, digest and the op
+batches not yet in ``SoloOpLog``. The client gets its new rev immediately;
+``solo.flush_write_buffer`` persists the entry (one UPDATE plus the op-log
+rows) ``SOLO_WRITE_BEHIND_FLUSH_SECONDS`` after it was created. Beacons
+queue the flush right away (``flush_soon``).
+
+Entries are guarded by a per-session cache lock. Readers either overlay
+the entry on the loaded session (``overlay``, detail reads) or persist it
+first (``flush``). Writers that bypass the buffer hold the lock while they
+write (``open`` then ``Staged.flush``). The cache must be shared by all
+workers and must not evict entries (e.g. Redis without an eviction policy
+on these keys); an evicted entry loses the buffered saves.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from apps.solo.services.pages import SoloPageStore, STORAGE_BLOB
+from apps.solo.services.statebytes import SoloStateBytes
+
+logger = logging.getLogger('solo.buffer')
+
+_FIELDS = ('rev', 'state', 'state_digest', 'state_tree', 'page_count', 'last_write_at')
+
+
+class SoloWriteBufferBusy(Exception):
+    """Raised when a session's buffer lock could not be acquired in time."""
+
+
+class Staged:
+    """A session's buffer entry, read while holding its lock (see ``SoloWriteBuffer.open``)."""
+
+    def __init__(self, session_id, entry: Optional[Dict[str, Any]]):
+        self.session_id = session_id
+        self.entry = entry
+        self.created = False
+
+    def overlay(self, session) -> bool:
+        """Apply the entry to ``session`` (loaded from the DB); False if there is none."""
+        if self.entry is not None and self.entry['db_rev'] != session.rev:
+            # The row moved without going through the buffer; the entry is stale.
+            logger.error(
+                'Dropping write buffer for session %s: db rev %s, buffered on %s',
+                self.session_id, session.rev, self.entry['db_rev'],
+            )
+            cache.delete(SoloWriteBuffer.key(self.session_id))
+            self.entry = None
+        return SoloWriteBuffer.apply(session, self.entry)
+
+    def stage(self, session, db_rev: int, values: Dict[str, Any], write_ts, ops=None) -> None:
+        """Buffer ``values`` (incl. the full ``state``) as the session's new head."""
+        entry = self.entry
+        if entry is None:
+            entry = {'db_rev': db_rev, 'oplog': []}
+            self.created = True
+        for field in _FIELDS[:-1]:
+            entry[field] = values[field]
+        entry['last_write_at'] = write_ts
+        if ops is not None:
+            entry['oplog'].append([values['rev'], ops])
+        cache.set(SoloWriteBuffer.key(self.session_id), entry, timeout=None)
+        self.entry = entry
+        SoloWriteBuffer.apply(session, entry)
+
+    def flush(self) -> bool:
+        """Persist and clear the entry while the lock is held."""
+        if self.entry is None:
+            return False
+        persisted = SoloWriteBuffer.persist(self.session_id, self.entry)
+        cache.delete(SoloWriteBuffer.key(self.session_id))
+        self.entry = None
+        return persisted
+
+
+class SoloWriteBuffer:
+    """Stage, overlay and flush buffered session writes."""
+
+    DEFAULT_FLUSH_SECONDS = 5
+    # Seconds a lock may be held before it expires, and waited for.
+    LOCK_TIMEOUT = 10
+    LOCK_WAIT = 2.0
+
+    @staticmethod
+    def enabled() -> bool:
+        return bool(getattr(settings, 'SOLO_WRITE_BEHIND', False))
+
+    @classmethod
+    def flush_seconds(cls) -> int:
+        return max(0, int(getattr(settings, 'SOLO_WRITE_BEHIND_FLUSH_SECONDS', cls.DEFAULT_FLUSH_SECONDS)))
+
+    @staticmethod
+    def key(session_id) -> str:
+        return f'solo:wb:{session_id}'
+
+    @classmethod
+    @contextmanager
+    def open(cls, session_id):
+        """Hold the session's buffer lock; yields a ``Staged`` with the current entry."""
+        lock_key = f'solo:wb:lock:{session_id}'
+        deadline = time.monotonic() + cls.LOCK_WAIT
+        while not cache.add(lock_key, 1, timeout=cls.LOCK_TIMEOUT):
+            if time.monotonic() >= deadline:
+                raise SoloWriteBufferBusy(session_id)
+            time.sleep(0.01)
+        staged = Staged(session_id, cache.get(cls.key(session_id)))
+        try:
+            yield staged
+        finally:
+            cache.delete(lock_key)
+        if staged.created:
+            cls.schedule_flush(session_id)
+
+    @staticmethod
+    def apply(session, entry: Optional[Dict[str, Any]]) -> bool:
+        if entry is None:
+            return False
+        for field in _FIELDS:
+            setattr(session, field, entry[field])
+        # The buffered state is fully materialized.
+        session.state_rev = entry['rev']
+        return True
+
+    @classmethod
+    def overlay(cls, session) -> bool:
+        """Show buffered saves on a session loaded for reading (no lock taken)."""
+        if not cls.enabled():
+            return False
+        entry = cache.get(cls.key(session.pk))
+        if entry is None or entry['db_rev'] != session.rev:
+            return False
+        return cls.apply(session, entry)
+
+    @classmethod
+    def flush(cls, session_id) -> bool:
+        """Persist the session's buffered saves, if any. Best effort when busy."""
+        if not cls.enabled() or cache.get(cls.key(session_id)) is None:
+            return False
+        try:
+            with cls.open(session_id) as staged:
+                return staged.flush()
+        except SoloWriteBufferBusy:
+            logger.warning('Write buffer of session %s busy; not flushed', session_id)
+            return False
+
+    @classmethod
+    def discard(cls, session_id) -> None:
+        cache.delete(cls.key(session_id))
+
+    @classmethod
+    def schedule_flush(cls, session_id) -> None:
+        try:
+            from apps.solo.tasks import flush_write_buffer_task
+
+            flush_write_buffer_task.apply_async(args=[str(session_id)], countdown=cls.flush_seconds())
+        except Exception:
+            # No task queue: write through.
+            cls.flush(session_id)
+
+    @classmethod
+    def flush_soon(cls, session_id) -> None:
+        """Queue a flush without waiting for it, if the session has buffered saves."""
+        if not cls.enabled() or cache.get(cls.key(session_id)) is None:
+            return
+        try:
+            from apps.solo.tasks import flush_write_buffer_task
+
+            flush_write_buffer_task.delay(str(session_id))
+        except Exception:
+            cls.flush(session_id)
+
+    @staticmethod
+    def persist(session_id, entry: Dict[str, Any]) -> bool:
+        """One conditional UPDATE of the session row plus the buffered op-log rows."""
+        from apps.solo.models import SoloSession, SoloOpLog
+
+        oplog: List[Any] = entry.get('oplog') or []
+        with transaction.atomic():
+            updated = SoloSession.objects.filter(
+                pk=session_id, rev=entry['db_rev'], storage_mode=STORAGE_BLOB,
+            ).update(
+                state=entry['state'],
+                rev=entry['rev'],
+                state_rev=entry['rev'],
+                state_digest=entry['state_digest'],
+                state_tree=entry['state_tree'],
+                page_count=entry['page_count'],
+                last_write_at=entry['last_write_at'],
+                updated_at=timezone.now(),
+                **SoloStateBytes.values(entry['state'], entry['rev']),
+            )
+            if updated and oplog:
+                SoloOpLog.objects.bulk_create([
+                    SoloOpLog(session_id=session_id, rev=rev, ops=ops) for rev, ops in oplog
+                ])
+        if not updated:
+            logger.error(
+                'Dropping write buffer for session %s: row is no longer at rev %s',
+                session_id, entry['db_rev'],
+            )
+            return False
+        SoloPageStore.maybe_schedule_convert(
+            SoloSession(pk=session_id, page_count=entry['page_count'], storage_mode=STORAGE_BLOB),
+        )
+        return True
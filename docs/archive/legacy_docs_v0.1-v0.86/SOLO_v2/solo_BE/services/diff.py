@@ -0,0 +1,219 @@
+"""Indexed diff engine for Solo session state."""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+
+class SoloDiffError(Exception):
+    """Raised when diff operations cannot be applied."""
+
+
+_REMOVED = object()
+
+
+class _CollectionIndex:
+    """id -> position map over one page collection (strokes or assets).
+
+    Removed items are tombstoned in place so positions of the remaining items
+    stay valid; the list is compacted once in ``finalize``.
+    """
+
+    __slots__ = ('items', 'positions', 'removed', 'owned')
+
+    def __init__(self, items: List[Dict[str, Any]]):
+        self.items = items
+        self.positions: Dict[Any, int] = {}
+        self.removed = 0
+        # Positions whose item dict is private to this apply (safe to mutate).
+        self.owned: set = set()
+        for position, item in enumerate(items):
+            item_id = item.get('id') if isinstance(item, dict) else None
+            if item_id is not None:
+                self.positions.setdefault(item_id, position)
+
+    def get(self, item_id: Any) -> Optional[Dict[str, Any]]:
+        position = self.positions.get(item_id)
+        if position is None:
+            return None
+        return self.items[position]
+
+    def get_writable(self, item_id: Any, copy_on_write: bool) -> Optional[Dict[str, Any]]:
+        position = self.positions.get(item_id)
+        if position is None:
+            return None
+        if copy_on_write and position not in self.owned:
+            self.items[position] = dict(self.items[position])
+            self.owned.add(position)
+        return self.items[position]
+
+    def __contains__(self, item_id: Any) -> bool:
+        return item_id in self.positions
+
+    def append(self, item: Dict[str, Any]) -> None:
+        self.positions[item['id']] = len(self.items)
+        self.owned.add(len(self.items))
+        self.items.append(item)
+
+    def remove(self, item_id: Any) -> None:
+        position = self.positions.pop(item_id)
+        self.items[position] = _REMOVED
+        self.removed += 1
+
+    def finalize(self) -> None:
+        if self.removed:
+            self.items[:] = [item for item in self.items if item is not _REMOVED]
+            self.removed = 0
+
+
+class DiffEngine:
+    """Applies diff operations to a state dict.
+
+    Page and item lookups go through maps that are built once per apply (and
+    only for the pages/collections the ops actually touch), so a batch of ops
+    costs O(ops) after the first touch of each collection instead of
+    O(ops x items).
+
+    With ``copy_on_write`` the input state is never mutated: the engine works
+    on a shallow copy and copies a page, collection, item or the meta dict
+    only when an op is about to change it. Everything else is shared with
+    the input, so the cost of an apply depends on the size of the change and
+    a failed apply leaves the caller's state untouched.
+    """
+
+    COLLECTIONS = {'stroke': 'strokes', 'asset': 'assets'}
+
+    def __init__(self, state: Dict[str, Any], copy_on_write: bool = False):
+        self.copy_on_write = copy_on_write
+        if copy_on_write:
+            state = dict(state)
+            if isinstance(state.get('pages'), list):
+                state['pages'] = list(state['pages'])
+        self.state = state
+        self._pages_by_id: Optional[Dict[Any, int]] = None
+        self._owned_pages: set = set()
+        self._meta_owned = not copy_on_write
+        self._indexes: Dict[tuple, _CollectionIndex] = {}
+
+    @property
+    def touched_page_positions(self) -> set:
+        """Positions in ``state['pages']`` of pages replaced by this apply."""
+        return set(self._owned_pages)
+
+    def own_page(self, position: int) -> Dict[str, Any]:
+        """Return a page that is safe to mutate, copying it on first write."""
+        pages = self.state['pages']
+        if self.copy_on_write and position not in self._owned_pages:
+            pages[position] = dict(pages[position])
+        self._owned_pages.add(position)
+        return pages[position]
+
+    def apply(self, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        for op in operations:
+            self.apply_op(op)
+        self.finalize()
+        return self.state
+
+    def finalize(self) -> None:
+        for index in self._indexes.values():
+            index.finalize()
+
+    def apply_op(self, op: Dict[str, Any]) -> None:
+        op_type = op.get('op')
+        kind = op.get('kind')
+        if op_type not in {'add', 'update', 'remove'}:
+            raise SoloDiffError(f"Unsupported op '{op_type}'")
+        if kind != 'meta' and kind not in self.COLLECTIONS:
+            raise SoloDiffError(f"Unsupported kind '{kind}'")
+
+        if kind == 'meta':
+            self._apply_meta_op(op)
+        else:
+            self._apply_collection_op(op_type, kind, op)
+
+    def _apply_meta_op(self, op: Dict[str, Any]) -> None:
+        if not self._meta_owned:
+            self.state['meta'] = dict(self.state.get('meta') or {})
+            self._meta_owned = True
+        meta = self.state.setdefault('meta', {})
+        if op['op'] == 'remove':
+            key = op.get('id')
+            if key in meta:
+                meta.pop(key, None)
+            return
+        patch = op.get('patch') or op.get('value')
+        if not isinstance(patch, dict):
+            raise SoloDiffError('Meta op requires dict payload')
+        meta.update(patch)
+
+    def _apply_collection_op(self, op_type: str, kind: str, op: Dict[str, Any]) -> None:
+        index = self._collection_index(self.resolve_page_position(op), kind)
+
+        if op_type == 'add':
+            value = op.get('value')
+            if not isinstance(value, dict):
+                raise SoloDiffError('Add op requires "value" dict')
+            item_id = value.get('id')
+            if not item_id:
+                raise SoloDiffError('Add op value must include id')
+            if item_id in index:
+                raise SoloDiffError(f'Item {item_id} already exists')
+            index.append(dict(value) if self.copy_on_write else value)
+            return
+
+        item_id = op.get('id')
+        if not item_id:
+            raise SoloDiffError('Update/remove ops require id')
+
+        if item_id not in index:
+            raise SoloDiffError(f'Item {item_id} not found')
+
+        if op_type == 'remove':
+            index.remove(item_id)
+            return
+
+        patch = op.get('patch') or op.get('value')
+        if not isinstance(patch, dict):
+            raise SoloDiffError('Update requires patch/value dict')
+        item = index.get_writable(item_id, self.copy_on_write)
+        for k, v in patch.items():
+            if k == 'id':
+                continue
+            item[k] = v
+
+    @staticmethod
+    def target_page_id(state: Dict[str, Any], op: Dict[str, Any]) -> Any:
+        value = op.get('value')
+        value_page_id = value.get('page_id') if isinstance(value, dict) else None
+        return op.get('page_id') or value_page_id or state.get('activePageId')
+
+    def resolve_page(self, op: Dict[str, Any]) -> Dict[str, Any]:
+        return self.state['pages'][self.resolve_page_position(op)]
+
+    def resolve_page_position(self, op: Dict[str, Any]) -> int:
+        target_page_id = self.target_page_id(self.state, op)
+        pages = self.state.setdefault('pages', [])
+        if self._pages_by_id is None:
+            self._pages_by_id = {}
+            for position, page in enumerate(pages):
+                self._pages_by_id.setdefault(page.get('id'), position)
+        position = self._pages_by_id.get(target_page_id)
+        if position is not None:
+            return position
+        if not pages:
+            page = {'id': target_page_id or 'page-1', 'strokes': [], 'assets': []}
+            pages.append(page)
+            self._owned_pages.add(0)
+            self._pages_by_id[page['id']] = 0
+        return 0
+
+    def _collection_index(self, position: int, kind: str) -> _CollectionIndex:
+        key = (position, kind)
+        index = self._indexes.get(key)
+        if index is None:
+            page = self.own_page(position)
+            name = self.COLLECTIONS[kind]
+            if self.copy_on_write:
+                page[name] = list(page[name])
+            index = _CollectionIndex(page[name])
+            self._indexes[key] = index
+        return index
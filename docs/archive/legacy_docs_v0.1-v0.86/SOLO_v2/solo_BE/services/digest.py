@@ -0,0 +1,174 @@
+"""Hierarchical (Merkle-style) digests for Solo session state."""
+from __future__ import annotations
+
+import hashlib
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+from apps.solo import codec
+
+
+DIGEST_MODE_FLAT = 'flat'
+DIGEST_MODE_TREE = 'tree'
+DIGEST_MODES = {DIGEST_MODE_FLAT, DIGEST_MODE_TREE}
+
+_COLLECTIONS = ('strokes', 'assets')
+
+
+def _canonical(value: Any) -> bytes:
+    return codec.canonical(value)
+
+
+def _sha(data: bytes) -> bytes:
+    return hashlib.sha256(data).digest()
+
+
+class SoloStateDigest:
+    """Item -> page -> session digest tree.
+
+    Every stroke/asset is hashed on its own, the item hashes of a page are
+    rolled up (in order) into a page hash and the page hashes into the
+    session root. The persisted tree looks like::
+
+        {'v': 1, 'rev': 12, 'root': '<hex>', 'pages': [['p1', '<hex>'], ...]}
+
+    ``update`` reuses the hash of every page the new state shares (by
+    identity) with the previous one, which is what copy-on-write
+    ``SoloDiffService.apply_diff`` produces, so a diff save only rehashes the
+    pages it touched. Trees built in-process also carry per-item hashes under
+    the transient ``'items'`` key; when present, untouched items of a touched
+    page are not re-serialized either. ``'items'`` is never persisted.
+    """
+
+    VERSION = 1
+
+    @staticmethod
+    def mode() -> str:
+        mode = getattr(settings, 'SOLO_DIGEST_MODE', DIGEST_MODE_FLAT)
+        return mode if mode in DIGEST_MODES else DIGEST_MODE_FLAT
+
+    @staticmethod
+    def flat(state: Optional[Dict[str, Any]]) -> str:
+        """Legacy digest: SHA256 of the canonical JSON of the whole state."""
+        return hashlib.sha256(_canonical(state or {})).hexdigest()
+
+    @classmethod
+    def build(cls, state: Optional[Dict[str, Any]], rev: Optional[int] = None) -> Dict[str, Any]:
+        return cls.update(None, None, state, rev=rev)
+
+    @classmethod
+    def update(
+        cls,
+        prev_state: Optional[Dict[str, Any]],
+        prev_tree: Optional[Dict[str, Any]],
+        state: Optional[Dict[str, Any]],
+        rev: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Return the digest tree of ``state``, reusing ``prev_tree`` where possible.
+
+        ``prev_tree`` must describe ``prev_state`` (see ``is_valid_for``).
+        """
+        state = state or {}
+        pages = state.get('pages') if isinstance(state.get('pages'), list) else []
+        prev_pages = cls._reusable_pages(prev_state, prev_tree)
+        prev_items = (prev_tree or {}).get('items') or {}
+
+        page_entries: List[List[Any]] = []
+        page_items: Dict[int, Dict[str, List[bytes]]] = {}
+        for position, page in enumerate(pages):
+            prev_page = prev_pages[position] if position < len(prev_pages) else None
+            if prev_page is not None and prev_page is page:
+                digest = prev_tree['pages'][position][1]
+                if position in prev_items:
+                    page_items[position] = prev_items[position]
+            else:
+                reuse = None
+                if prev_page is not None and position in prev_items:
+                    reuse = (prev_page, prev_items[position])
+                digest, page_items[position] = cls._page_digest(page, reuse)
+            page_entries.append([page.get('id') if isinstance(page, dict) else None, digest])
+
+        return {
+            'v': cls.VERSION,
+            'rev': rev,
+            'root': cls.root_digest(state, [digest for _, digest in page_entries]),
+            'pages': page_entries,
+            'items': page_items,
+        }
+
+    @staticmethod
+    def root_digest(state: Dict[str, Any], page_digests: List[str]) -> str:
+        """Session root from the non-page part of ``state`` and ordered page hashes."""
+        header = {k: v for k, v in (state or {}).items() if k != 'pages'}
+        root = hashlib.sha256(b'solo-state:v1\n')
+        root.update(_sha(_canonical(header)))
+        for digest in page_digests:
+            root.update(bytes.fromhex(digest))
+        return root.hexdigest()
+
+    @classmethod
+    def page_digest(cls, page: Any) -> str:
+        return cls._page_digest(page)[0]
+
+    @staticmethod
+    def is_valid_for(tree: Optional[Dict[str, Any]], rev: int, digest: str) -> bool:
+        """True if a persisted tree still describes the session at ``rev``/``digest``."""
+        return bool(
+            tree
+            and tree.get('v') == SoloStateDigest.VERSION
+            and tree.get('rev') == rev
+            and tree.get('root') == digest
+        )
+
+    @staticmethod
+    def to_storage(tree: Dict[str, Any]) -> Dict[str, Any]:
+        """Strip transient per-item hashes before saving the tree."""
+        return {k: v for k, v in tree.items() if k != 'items'}
+
+    @staticmethod
+    def page_digests(tree: Dict[str, Any]) -> Dict[Any, str]:
+        digests: Dict[Any, str] = {}
+        for page_id, digest in tree.get('pages') or []:
+            digests.setdefault(page_id, digest)
+        return digests
+
+    @staticmethod
+    def _reusable_pages(prev_state, prev_tree) -> list:
+        if not prev_state or not prev_tree:
+            return []
+        prev_pages = prev_state.get('pages')
+        if not isinstance(prev_pages, list) or len(prev_pages) != len(prev_tree.get('pages') or []):
+            return []
+        return prev_pages
+
+    @staticmethod
+    def _page_digest(page: Any, reuse=None):
+        if not isinstance(page, dict):
+            return _sha(_canonical(page)).hex(), {}
+
+        reuse_page, reuse_items = reuse or (None, {})
+        header = {k: v for k, v in page.items() if k not in _COLLECTIONS}
+        h = hashlib.sha256(b'solo-page:v1\n')
+        h.update(_sha(_canonical(header)))
+        item_digests: Dict[str, List[bytes]] = {}
+        for name in _COLLECTIONS:
+            items = page.get(name)
+            if not isinstance(items, list):
+                h.update(b'\x00' + name.encode('ascii') + _sha(_canonical(items)))
+                continue
+            known = {}
+            prev_items = reuse_page.get(name) if isinstance(reuse_page, dict) else None
+            prev_digests = reuse_items.get(name)
+            if isinstance(prev_items, list) and prev_digests and len(prev_items) == len(prev_digests):
+                known = {id(item): digest for item, digest in zip(prev_items, prev_digests)}
+            digests = []
+            for item in items:
+                digest = known.get(id(item))
+                if digest is None:
+                    digest = _sha(_canonical(item))
+                digests.append(digest)
+            h.update(b'\x01' + name.encode('ascii') + len(digests).to_bytes(8, 'big'))
+            h.update(b''.join(digests))
+            item_digests[name] = digests
+        return h.hexdigest(), item_digests
@@ -0,0 +1,105 @@
+"""
+Group commit of concurrent diff saves on one session.
+
+Saves of the same session that overlap in time (several tabs, a retry storm
+after a reconnect) would otherwise each lock the row, apply, digest and
+write the full state. With ``SOLO_DIFF_GROUP_COMMIT_MS`` set, a save that
+arrives while another save of the session is in flight in this process
+opens a group and waits that long for more saves. Its thread (the leader)
+then commits the whole group with one call of ``commit`` and hands every
+member its own result. A save with nothing in flight is committed alone
+without waiting.
+
+Grouping is per process and only helps with threaded workers.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from django.conf import settings
+
+logger = logging.getLogger('solo.groupcommit')
+
+
+class _Job:
+    __slots__ = ('payload', 'result', 'done')
+
+    def __init__(self, payload: Any):
+        self.payload = payload
+        self.result = None
+        self.done = threading.Event()
+
+
+class _Group:
+    __slots__ = ('jobs',)
+
+    def __init__(self):
+        self.jobs: List[_Job] = []
+
+
+class SoloDiffGroupCommit:
+    """Coordinates leaders and followers per session."""
+
+    _lock = threading.Lock()
+    _groups: Dict[str, _Group] = {}
+    _inflight: Dict[str, int] = {}
+
+    @staticmethod
+    def window_ms() -> int:
+        """How long a group stays open for more saves (0 disables grouping)."""
+        return max(0, int(getattr(settings, 'SOLO_DIFF_GROUP_COMMIT_MS', 0)))
+
+    @classmethod
+    def enabled(cls) -> bool:
+        return cls.window_ms() > 0
+
+    @classmethod
+    def run(cls, session_id, payload: Any, commit: Callable[[List[Any]], List[Any]]) -> Any:
+        """Commit ``payload`` alone or as part of a group; returns its result.
+
+        ``commit`` receives the payloads of a group in arrival order and
+        returns one result per payload. It runs in the leader's thread; a
+        ``None`` result (or an exception) tells that member to save on its own.
+        """
+        key = str(session_id)
+        job = _Job(payload)
+        with cls._lock:
+            busy = cls._inflight.get(key, 0) > 0
+            cls._inflight[key] = cls._inflight.get(key, 0) + 1
+            group = cls._groups.get(key)
+            leader = group is None
+            if leader:
+                group = _Group()
+                if busy:
+                    cls._groups[key] = group
+            group.jobs.append(job)
+
+        try:
+            if not leader:
+                job.done.wait()
+                return job.result
+
+            if busy:
+                time.sleep(cls.window_ms() / 1000)
+                with cls._lock:
+                    # Closed: later saves start a new group.
+                    if cls._groups.get(key) is group:
+                        del cls._groups[key]
+            jobs = group.jobs
+            try:
+                results = commit([member.payload for member in jobs])
+            except Exception:
+                logger.exception('Group commit of %d saves for session %s failed', len(jobs), key)
+                results = [None] * len(jobs)
+            for member, result in zip(jobs, results):
+                member.result = result
+            return job.result
+        finally:
+            if leader:
+                for member in group.jobs:
+                    member.done.set()
+            with cls._lock:
+                cls._inflight[key] -= 1
+                if not cls._inflight[key]:
+                    del cls._inflight[key]
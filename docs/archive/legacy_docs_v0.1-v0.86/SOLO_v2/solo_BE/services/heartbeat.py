@@ -0,0 +1,121 @@
+"""
+Coalesced beacon heartbeats.
+
+A beacon only has to move ``SoloSession.last_write_at`` forward. Instead of
+an UPDATE per beacon, ``SoloHeartbeats.record`` stores each beacon time in
+the Django cache under its own key, numbered with an atomic ``incr``, and
+lists the session once per flush window (``SOLO_HEARTBEAT_FLUSH_SECONDS``).
+Nothing is read back and overwritten, so racing beacons cannot lose the
+newest time. ``solo.flush_heartbeats`` runs once per window via celery beat,
+takes the latest beacon of every listed session of the finished windows and
+writes them with one UPDATE per batch. The UPDATE only moves
+``last_write_at`` forward, so beacons that race a save or an earlier window
+can never move it back.
+
+Recording never queries the database. Ownership is enforced by the flush
+UPDATE, which matches on ``(id, user_id)``: a beacon for a missing or
+foreign session is accepted and then matches no row.
+"""
+import logging
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, F, Q, When
+from django.utils import timezone
+
+logger = logging.getLogger('solo.heartbeat')
+
+
+class SoloHeartbeats:
+    """Cache-side last-seen map of beacon heartbeats."""
+
+    DEFAULT_FLUSH_SECONDS = 30
+    BATCH_SIZE = 500
+    OWNER_TIMEOUT = 60 * 60
+    # Windows kept for a late or skipped flush.
+    RETAINED_WINDOWS = 20
+
+    @classmethod
+    def flush_seconds(cls) -> int:
+        return max(1, int(getattr(settings, 'SOLO_HEARTBEAT_FLUSH_SECONDS', cls.DEFAULT_FLUSH_SECONDS)))
+
+    @classmethod
+    def window(cls, now: Optional[float] = None) -> int:
+        return int((time.time() if now is None else now) // cls.flush_seconds())
+
+    @classmethod
+    def record(cls, session_id, user_id, seen_at=None) -> None:
+        """Note a beacon of ``user_id`` for ``session_id`` at ``seen_at`` (default: now)."""
+        seen_at = seen_at or timezone.now()
+        ttl = cls.flush_seconds() * cls.RETAINED_WINDOWS
+        member = f'{user_id}:{session_id}'
+        window = cls.window()
+        beacons_key = f'solo:hb:beacons:{window}:{member}'
+        cache.add(beacons_key, 0, timeout=ttl)
+        beacon = cache.incr(beacons_key)
+        cache.set(f'solo:hb:seen:{window}:{member}:{beacon}', seen_at, timeout=ttl)
+
+        if beacon == 1:
+            count_key = f'solo:hb:count:{window}'
+            cache.add(count_key, 0, timeout=ttl)
+            slot = cache.incr(count_key)
+            cache.set(f'solo:hb:slot:{window}:{slot}', member, timeout=ttl)
+
+    @classmethod
+    def flush(cls, now: Optional[float] = None) -> int:
+        """Write the heartbeats of all windows finished by ``now``; returns the sessions updated."""
+        current = cls.window(now)
+        lock_key = 'solo:hb:flush-lock'
+        if not cache.add(lock_key, 1, timeout=cls.flush_seconds()):
+            return 0
+        try:
+            last = cache.get('solo:hb:flushed')
+            first = current - cls.RETAINED_WINDOWS if last is None else max(last + 1, current - cls.RETAINED_WINDOWS)
+            updated = 0
+            for window in range(first, current):
+                updated += cls._flush_window(window)
+                cache.set('solo:hb:flushed', window, timeout=None)
+            return updated
+        finally:
+            cache.delete(lock_key)
+
+    @classmethod
+    def _flush_window(cls, window: int) -> int:
+        count = cache.get(f'solo:hb:count:{window}') or 0
+        slot_keys = [f'solo:hb:slot:{window}:{slot}' for slot in range(1, count + 1)]
+        members = list(cache.get_many(slot_keys).values())
+        updated = 0
+        for start in range(0, len(members), cls.BATCH_SIZE):
+            batch = members[start:start + cls.BATCH_SIZE]
+            counts = cache.get_many([f'solo:hb:beacons:{window}:{member}' for member in batch])
+            keys = {
+                f'solo:hb:seen:{window}:{member}:{beacon}': member
+                for member in batch
+                for beacon in range(1, counts.get(f'solo:hb:beacons:{window}:{member}', 0) + 1)
+            }
+            latest = {}
+            for key, seen_at in cache.get_many(list(keys)).items():
+                member = tuple(keys[key].split(':', 1))
+                if member not in latest or latest[member] < seen_at:
+                    latest[member] = seen_at
+            updated += cls._write(latest)
+        return updated
+
+    @staticmethod
+    def _write(latest) -> int:
+        """One UPDATE moving ``last_write_at`` forward for ``{(user_id, session_id): seen_at}``."""
+        from apps.solo.models import SoloSession
+
+        if not latest:
+            return 0
+        newer = Q()
+        whens = []
+        for (user_id, session_id), seen_at in latest.items():
+            condition = Q(pk=session_id, user_id=user_id) & (Q(last_write_at__isnull=True) | Q(last_write_at__lt=seen_at))
+            newer |= condition
+            whens.append(When(condition, then=seen_at))
+        return SoloSession.objects.filter(newer).update(
+            last_write_at=Case(*whens, default=F('last_write_at')),
+        )
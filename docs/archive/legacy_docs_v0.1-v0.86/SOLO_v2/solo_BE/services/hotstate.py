@@ -0,0 +1,144 @@
+"""
+In-process cache of the parsed state of recently edited sessions.
+
+A diff save needs the session's current state. Without the cache that is a
+full row read plus a JSON decode of ``state`` on every save. With
+``SOLO_HOT_STATE_CACHE_BYTES`` set, each worker process keeps the state
+produced by its last save of a session (LRU, bounded by the approximate
+JSON size of the cached states). The next save of that session validates
+the entry with a narrow ``only()`` read of ``rev`` and ``updated_at``, and
+skips the state fetch when both match. Every write path bumps
+``updated_at``, including raw PATCH overwrites that keep the rev. A write
+from another process therefore makes the entry miss.
+
+Cached states are shared with the diff engine, which never mutates its
+input (copy-on-write), so entries are never copied.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional
+
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+
+from apps.solo import codec
+from apps.solo.services.pages import SoloPageStore
+
+logger = logging.getLogger('solo.hotstate')
+
+
+class _HotState(NamedTuple):
+    rev: int
+    updated_at: Any
+    state: Dict[str, Any]
+    state_digest: str
+    state_tree: Dict[str, Any]
+    size: int
+
+
+class SoloHotStateCache:
+    """Per-process LRU of ``(rev, updated_at) -> parsed state``."""
+
+    _entries: 'OrderedDict[str, _HotState]' = OrderedDict()
+    _bytes = 0
+    _lock = threading.Lock()
+    _counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    @staticmethod
+    def max_bytes() -> int:
+        """Budget for cached states in bytes of JSON (0 disables the cache)."""
+        return max(0, int(getattr(settings, 'SOLO_HOT_STATE_CACHE_BYTES', 0)))
+
+    @classmethod
+    def enabled(cls) -> bool:
+        return cls.max_bytes() > 0
+
+    @classmethod
+    def load(cls, queryset, session_id):
+        """Return ``(session, hit)`` for a diff save of ``session_id``.
+
+        On a hit, ``session`` is a narrow row whose current state, digest and
+        tree come from the cache; otherwise it is the full row from
+        ``queryset``. ``hit`` is ``None`` when the cache is disabled.
+        """
+        if not cls.enabled():
+            return get_object_or_404(queryset), None
+        key = str(session_id)
+        with cls._lock:
+            entry = cls._entries.get(key)
+        if entry is not None:
+            session = get_object_or_404(queryset.only('rev', 'state_rev', 'storage_mode', 'updated_at'))
+            if (
+                session.rev == entry.rev
+                and session.updated_at == entry.updated_at
+                and not SoloPageStore.is_paged(session)
+            ):
+                session.state_digest = entry.state_digest
+                session.state_tree = entry.state_tree
+                # Read by SoloOpLogService.current_state; ``state`` stays deferred.
+                session._solo_current_state = (session.rev, entry.state)
+                cls._count('hits')
+                return session, True
+            cls.discard(key)
+        cls._count('misses')
+        return get_object_or_404(queryset), False
+
+    @classmethod
+    def put(cls, session, state: Dict[str, Any], growth: Optional[int] = None) -> None:
+        """Cache ``state`` as the current state of the saved ``session``.
+
+        The size of a state that replaces a cached one is estimated as the
+        previous size plus ``growth`` (the request body size) instead of
+        re-encoding it.
+        """
+        max_bytes = cls.max_bytes()
+        if not max_bytes:
+            return
+        key = str(session.pk)
+        with cls._lock:
+            previous = cls._entries.get(key)
+        if previous is not None and growth is not None:
+            size = previous.size + growth
+        else:
+            size = len(codec.dumps(state))
+        entry = _HotState(session.rev, session.updated_at, state, session.state_digest, session.state_tree, size)
+
+        with cls._lock:
+            old = cls._entries.pop(key, None)
+            if old is not None:
+                cls._bytes -= old.size
+            if size > max_bytes:
+                return
+            cls._entries[key] = entry
+            cls._bytes += size
+            while cls._bytes > max_bytes:
+                _, evicted = cls._entries.popitem(last=False)
+                cls._bytes -= evicted.size
+                cls._counters['evictions'] += 1
+
+    @classmethod
+    def discard(cls, session_id) -> None:
+        with cls._lock:
+            old = cls._entries.pop(str(session_id), None)
+            if old is not None:
+                cls._bytes -= old.size
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._entries.clear()
+            cls._bytes = 0
+            for name in cls._counters:
+                cls._counters[name] = 0
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        """Counters of this process, for sizing ``SOLO_HOT_STATE_CACHE_BYTES``."""
+        with cls._lock:
+            return dict(cls._counters, entries=len(cls._entries), bytes=cls._bytes, max_bytes=cls.max_bytes())
+
+    @classmethod
+    def _count(cls, name: str) -> None:
+        with cls._lock:
+            cls._counters[name] += 1
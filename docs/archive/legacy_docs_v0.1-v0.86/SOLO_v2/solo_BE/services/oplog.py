@@ -0,0 +1,148 @@
+"""
+Append-only operation log for Solo sessions.
+
+Every accepted diff save appends its ops as one ``SoloOpLog`` row keyed by
+(session, rev). With ``SOLO_OPLOG_DEFER_STATE`` enabled, diff saves stop
+rewriting ``SoloSession.state``: ``state`` is only materialized up to
+``SoloSession.state_rev`` and readers replay the log tail on top of it. A
+compactor folds the tail back into ``state`` every
+``SOLO_OPLOG_COMPACT_EVERY_REVS`` revs (triggered by the save) or after
+``SOLO_OPLOG_COMPACT_AFTER_SECONDS`` of inactivity (periodic sweep).
+
+Rows at or below ``state_rev`` are kept for ``SOLO_OPLOG_RETAIN_REVS`` revs
+as recent history and pruned by the compactor.
+"""
+import logging
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.solo.services.diff import DiffEngine
+
+logger = logging.getLogger('solo.oplog')
+
+
+class SoloOpLogService:
+    """Op-log append, replay and compaction."""
+
+    DEFAULT_COMPACT_EVERY_REVS = 20
+    DEFAULT_COMPACT_AFTER_SECONDS = 30
+    DEFAULT_RETAIN_REVS = 100
+
+    @staticmethod
+    def defer_state() -> bool:
+        return bool(getattr(settings, 'SOLO_OPLOG_DEFER_STATE', False))
+
+    @classmethod
+    def compact_every_revs(cls) -> int:
+        return max(1, int(getattr(settings, 'SOLO_OPLOG_COMPACT_EVERY_REVS', cls.DEFAULT_COMPACT_EVERY_REVS)))
+
+    @classmethod
+    def compact_after_seconds(cls) -> int:
+        return max(0, int(getattr(settings, 'SOLO_OPLOG_COMPACT_AFTER_SECONDS', cls.DEFAULT_COMPACT_AFTER_SECONDS)))
+
+    @classmethod
+    def retain_revs(cls) -> int:
+        return max(0, int(getattr(settings, 'SOLO_OPLOG_RETAIN_REVS', cls.DEFAULT_RETAIN_REVS)))
+
+    @staticmethod
+    def append(session, rev: int, ops: List[Dict[str, Any]]):
+        from apps.solo.models import SoloOpLog
+
+        return SoloOpLog.objects.create(session_id=session.pk, rev=rev, ops=ops)
+
+    @staticmethod
+    def tail(session) -> List[List[Dict[str, Any]]]:
+        """Op batches committed after ``state`` was last materialized."""
+        from apps.solo.models import SoloOpLog
+
+        if session.state_rev >= session.rev:
+            return []
+        return list(
+            SoloOpLog.objects.filter(
+                session_id=session.pk,
+                rev__gt=session.state_rev,
+                rev__lte=session.rev,
+            ).order_by('rev').values_list('ops', flat=True)
+        )
+
+    @classmethod
+    def replay(cls, state: Optional[Dict[str, Any]], batches: List[List[Dict[str, Any]]]) -> Dict[str, Any]:
+        from apps.solo.services.solo import SoloDiffService
+
+        state = state or {}
+        for ops in batches:
+            state = SoloDiffService.apply_diff(state, ops)
+        return state
+
+    @classmethod
+    def current_state(cls, session) -> Dict[str, Any]:
+        """Materialized ``state`` plus the replayed log tail (memoized per rev)."""
+        cached = getattr(session, '_solo_current_state', None)
+        if cached is not None and cached[0] == session.rev:
+            return cached[1]
+        state = session.state or {}
+        if session.state_rev < session.rev:
+            state = cls.replay(state, cls.tail(session))
+        session._solo_current_state = (session.rev, state)
+        return state
+
+    @classmethod
+    def after_append(cls, session) -> None:
+        """Trigger compaction once enough revs are pending (or prune history)."""
+        pending = session.rev - session.state_rev
+        retain = cls.retain_revs()
+        if pending < cls.compact_every_revs() and (not retain or session.rev % retain):
+            return
+        try:
+            from apps.solo.tasks import compact_oplog_task
+
+            compact_oplog_task.delay(str(session.pk))
+        except Exception:
+            transaction.on_commit(lambda: cls.compact(session.pk))
+
+    @classmethod
+    def compact(cls, session_id) -> bool:
+        """Fold the log tail into ``state`` and prune old history."""
+        from apps.solo.models import SoloSession, SoloOpLog
+
+        with transaction.atomic():
+            try:
+                session = SoloSession.objects.select_for_update().get(pk=session_id)
+            except SoloSession.DoesNotExist:
+                return False
+
+            compacted = False
+            if session.state_rev < session.rev:
+                from apps.solo.services.statebytes import SoloStateBytes
+
+                session.state = cls.replay(session.state, cls.tail(session))
+                session.state_rev = session.rev
+                state_bytes = SoloStateBytes.values(session.state, session.rev)
+                for field, value in state_bytes.items():
+                    setattr(session, field, value)
+                session.save(update_fields=['state', 'state_rev', *state_bytes])
+                compacted = True
+
+            retain = cls.retain_revs()
+            SoloOpLog.objects.filter(
+                session_id=session.pk,
+                rev__lte=session.state_rev - retain,
+            ).delete()
+
+        return compacted
+
+    @classmethod
+    def idle_sessions(cls):
+        """Sessions with a pending tail and no write for the compaction delay."""
+        from apps.solo.models import SoloSession
+
+        cutoff = timezone.now() - timedelta(seconds=cls.compact_after_seconds())
+        return SoloSession.objects.filter(
+            state_rev__lt=F('rev'),
+            last_write_at__lt=cutoff,
+        ).values_list('id', flat=True)
@@ -0,0 +1,202 @@
+"""
+Per-page normalized storage for Solo sessions.
+
+Sessions with ``storage_mode='paged'`` keep every page in its own
+``SoloPage`` row (with its own rev and digest); ``SoloSession.state`` then
+only holds the page-less "shell" (``activePageId``, ``meta``, ...). Diff
+saves lock and rewrite only the pages their ops reference, and the session
+digest is always the tree root (``SoloStateDigest.root_digest``) built from
+the shell and the stored per-page digests.
+"""
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from apps.solo.services.diff import DiffEngine
+from apps.solo.services.digest import SoloStateDigest
+
+logger = logging.getLogger('solo.pages')
+
+STORAGE_BLOB = 'blob'
+STORAGE_PAGED = 'paged'
+
+
+class SoloPageStore:
+    """Read/write helpers for paged session storage."""
+
+    @staticmethod
+    def is_paged(session) -> bool:
+        return getattr(session, 'storage_mode', STORAGE_BLOB) == STORAGE_PAGED
+
+    @staticmethod
+    def min_pages() -> int:
+        """Page count from which blob sessions are converted (0 disables)."""
+        return max(0, int(getattr(settings, 'SOLO_PAGED_STORAGE_MIN_PAGES', 0)))
+
+    @staticmethod
+    def shell(state: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return {k: v for k, v in (state or {}).items() if k != 'pages'}
+
+    @staticmethod
+    def can_page(pages: Any) -> bool:
+        """Paged storage needs a list of dict pages with unique string ids."""
+        if not isinstance(pages, list):
+            return False
+        seen = set()
+        for page in pages:
+            page_id = page.get('id') if isinstance(page, dict) else None
+            if not isinstance(page_id, str) or not page_id or page_id in seen:
+                return False
+            seen.add(page_id)
+        return True
+
+    @classmethod
+    def assemble(cls, session, page_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Rebuild the full state (or only ``page_ids``) from page rows."""
+        from apps.solo.models import SoloPage
+
+        rows = SoloPage.objects.filter(session_id=session.pk)
+        if page_ids is not None:
+            rows = rows.filter(page_id__in=page_ids)
+        state = cls.shell(session.state)
+        state['pages'] = list(rows.order_by('position').values_list('data', flat=True))
+        return state
+
+    @classmethod
+    def apply_diff(cls, session, ops: List[Dict[str, Any]], rev: int) -> Tuple[str, int]:
+        """Apply ops to the referenced pages only; returns ``(digest, page_count)``.
+
+        Must run inside a transaction. Updates ``session.state`` (the shell)
+        but does not save the session row.
+        """
+        from apps.solo.models import SoloPage
+        from apps.solo.services.solo import SoloDiffService
+
+        shell = cls.shell(session.state)
+        targets = {
+            DiffEngine.target_page_id(shell, op)
+            for op in ops
+            if op.get('kind') != 'meta'
+        }
+        locked = SoloPage.objects.select_for_update().filter(session_id=session.pk)
+        rows = list(locked.filter(page_id__in=[t for t in targets if t]).order_by('position'))
+        found = {row.page_id for row in rows}
+        if 'activePageId' not in shell or any(t not in found for t in targets):
+            # Unknown targets fall back to the first page, as in blob mode.
+            first = locked.order_by('position').first()
+            if first is not None and first.page_id not in found:
+                rows.insert(0, first)
+        if not rows:
+            # Meta-only ops: load the active page anyway, or the engine would
+            # create a page that already exists as a row.
+            active = locked.filter(page_id=shell.get('activePageId')).first()
+            active = active or locked.order_by('position').first()
+            if active is not None:
+                rows.append(active)
+
+        partial = dict(shell, pages=[row.data for row in rows])
+        new_state = SoloDiffService.apply_diff(partial, ops)
+        new_pages = new_state.pop('pages')
+
+        for row, page in zip(rows, new_pages):
+            if page is row.data:
+                continue
+            row.data = page
+            row.digest = SoloStateDigest.page_digest(page)
+            row.rev = rev
+            row.save(update_fields=['data', 'digest', 'rev', 'updated_at'])
+        for page in new_pages[len(rows):]:
+            # Only reached when the session had no pages at all.
+            SoloPage.objects.create(
+                session_id=session.pk,
+                page_id=page['id'],
+                position=0,
+                data=page,
+                rev=rev,
+                digest=SoloStateDigest.page_digest(page),
+            )
+
+        session.state = new_state
+        digests = list(
+            SoloPage.objects.filter(session_id=session.pk).order_by('position').values_list('digest', flat=True)
+        )
+        return SoloStateDigest.root_digest(new_state, digests), max(1, len(digests))
+
+    @classmethod
+    def write_full_state(cls, session, state: Dict[str, Any], rev: int) -> Optional[Dict[str, Any]]:
+        """Replace all pages of a paged session with ``state``.
+
+        Returns the digest tree, or ``None`` if ``state`` cannot be paged, in
+        which case the session falls back to blob storage. Sets
+        ``session.state``/``storage_mode`` but does not save the session row.
+        """
+        from apps.solo.models import SoloPage
+
+        pages = (state or {}).get('pages')
+        if not cls.can_page(pages):
+            SoloPage.objects.filter(session_id=session.pk).delete()
+            session.storage_mode = STORAGE_BLOB
+            session.state = state
+            return None
+
+        tree = SoloStateDigest.build(state, rev=rev)
+        existing = {row.page_id: row for row in SoloPage.objects.filter(session_id=session.pk)}
+        to_create, to_update = [], []
+        for position, (page, (page_id, digest)) in enumerate(zip(pages, tree['pages'])):
+            row = existing.pop(page_id, None)
+            if row is None:
+                to_create.append(SoloPage(
+                    session_id=session.pk, page_id=page_id, position=position,
+                    data=page, rev=rev, digest=digest,
+                ))
+            elif row.digest != digest or row.position != position:
+                row.data, row.position, row.rev, row.digest = page, position, rev, digest
+                to_update.append(row)
+        if existing:
+            SoloPage.objects.filter(pk__in=[row.pk for row in existing.values()]).delete()
+        if to_update:
+            SoloPage.objects.bulk_update(to_update, ['data', 'position', 'rev', 'digest'])
+        if to_create:
+            SoloPage.objects.bulk_create(to_create)
+
+        session.storage_mode = STORAGE_PAGED
+        session.state = cls.shell(state)
+        return tree
+
+    @classmethod
+    def convert(cls, session_id) -> bool:
+        """Move a blob session into per-page rows."""
+        from apps.solo.models import SoloSession
+        from apps.solo.services.oplog import SoloOpLogService
+
+        with transaction.atomic():
+            try:
+                session = SoloSession.objects.select_for_update().get(pk=session_id)
+            except SoloSession.DoesNotExist:
+                return False
+            if cls.is_paged(session):
+                return False
+            state = SoloOpLogService.current_state(session)
+            tree = cls.write_full_state(session, state, session.rev)
+            if tree is None:
+                return False
+            session.state_digest = tree['root']
+            session.state_tree = {}
+            session.state_rev = session.rev
+            session.save(update_fields=['state', 'storage_mode', 'state_digest', 'state_tree', 'state_rev'])
+        logger.info(f"Converted session {session_id} to paged storage")
+        return True
+
+    @classmethod
+    def maybe_schedule_convert(cls, session) -> None:
+        threshold = cls.min_pages()
+        if not threshold or cls.is_paged(session) or session.page_count < threshold:
+            return
+        try:
+            from apps.solo.tasks import convert_paged_storage_task
+
+            convert_paged_storage_task.delay(str(session.pk))
+        except Exception:
+            pass
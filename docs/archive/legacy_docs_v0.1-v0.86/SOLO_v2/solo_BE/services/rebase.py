@@ -0,0 +1,99 @@
+"""
+Server-side rebase of stale diff saves.
+
+A diff save built on ``base_rev`` while the session is already at a later
+rev can still be applied if none of the ops committed since ``base_rev``
+(read from ``SoloOpLog``) touch the same items or meta keys. The incoming
+ops are then applied on top of the current state as a normal save and the
+client receives the intervening ops to catch up without a full refetch.
+"""
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from django.conf import settings
+
+from apps.solo.services.diff import DiffEngine
+
+
+class SoloRebaseConflict(Exception):
+    """Raised when intervening ops touch the same items as the incoming ops."""
+
+    def __init__(self, conflicts: List[Tuple[Any, ...]]):
+        super().__init__('Rebase conflict')
+        self.conflicts = conflicts
+
+
+class SoloRebaseService:
+    """Decide whether a stale diff can be applied on top of the server rev."""
+
+    DEFAULT_MAX_REVS = 20
+
+    @classmethod
+    def max_revs(cls) -> int:
+        """How far behind a client may be and still be rebased (0 disables)."""
+        return max(0, int(getattr(settings, 'SOLO_DIFF_REBASE_MAX_REVS', cls.DEFAULT_MAX_REVS)))
+
+    @staticmethod
+    def touched_keys(ops: List[Dict[str, Any]]) -> Set[Tuple[Any, ...]]:
+        """``(kind, item_id)`` per collection op, ``('meta', key)`` per meta key."""
+        keys: Set[Tuple[Any, ...]] = set()
+        for op in ops:
+            kind = op.get('kind')
+            if kind == 'meta':
+                if op.get('op') == 'remove':
+                    keys.add(('meta', op.get('id')))
+                    continue
+                patch = op.get('patch') or op.get('value')
+                if isinstance(patch, dict):
+                    keys.update(('meta', key) for key in patch)
+                continue
+            if kind not in DiffEngine.COLLECTIONS:
+                continue
+            if op.get('op') == 'add':
+                value = op.get('value')
+                item_id = value.get('id') if isinstance(value, dict) else None
+            else:
+                item_id = op.get('id')
+            keys.add((kind, item_id))
+        return keys
+
+    @classmethod
+    def intervening(cls, session, base_rev: int) -> Optional[List[Dict[str, Any]]]:
+        """Op batches committed after ``base_rev``, or ``None`` if not rebasable.
+
+        ``None`` means the gap is too large or the log does not cover every rev
+        in between (e.g. a full save or a pruned history); the caller should
+        then answer with the regular stale-rev response.
+        """
+        from apps.solo.models import SoloOpLog
+
+        gap = session.rev - base_rev
+        if base_rev < 0 or gap <= 0 or gap > cls.max_revs():
+            return None
+        rows = list(
+            SoloOpLog.objects.filter(
+                session_id=session.pk,
+                rev__gt=base_rev,
+                rev__lte=session.rev,
+            ).order_by('rev').values('rev', 'ops')
+        )
+        if len(rows) != gap:
+            return None
+        return rows
+
+    @classmethod
+    def rebase(cls, session, base_rev: int, ops: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """Return the intervening batches if ``ops`` can be applied at ``session.rev``.
+
+        Raises ``SoloRebaseConflict`` when they overlap with ``ops``.
+        """
+        batches = cls.intervening(session, base_rev)
+        if batches is None:
+            return None
+        incoming = cls.touched_keys(ops)
+        committed: Set[Tuple[Any, ...]] = set()
+        for batch in batches:
+            committed |= cls.touched_keys(batch['ops'])
+        conflicts = incoming & committed
+        if conflicts:
+            raise SoloRebaseConflict(sorted(conflicts, key=repr))
+        return batches
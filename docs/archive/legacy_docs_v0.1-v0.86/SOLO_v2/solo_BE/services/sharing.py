@@ -54,7 +54,12 @@ class SharingService:
         """Get share token by token string."""
         from apps.solo.models import ShareToken
         try:
-            share = ShareToken.objects.select_related('session', 'session__user').get(token=token)
+            share = (
+                ShareToken.objects.select_related('session', 'session__user')
+                # Loaded on demand, i.e. not for a 304.
+                .defer('session__state', 'session__state_tree', 'session__state_bytes')
+                .get(token=token)
+            )
             if share.is_valid():
                 return share
             return None
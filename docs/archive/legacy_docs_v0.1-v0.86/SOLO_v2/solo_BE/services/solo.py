@@ -2,11 +2,10 @@
 from __future__ import annotations
 
 import copy
-import hashlib
-import json
 import io
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+from apps.solo import codec
 from apps.solo.services.storage import (
     StorageBackend,
     S3StorageBackend,
@@ -17,10 +16,12 @@ from apps.solo.services.storage import (
 from apps.solo.services.sharing import SharingService
 from apps.solo.services.thumbnail import ThumbnailService
 from apps.solo.services.cdn import CdnService
+from apps.solo.services.diff import DiffEngine, SoloDiffError
+from apps.solo.services.digest import SoloStateDigest, DIGEST_MODE_TREE
+from apps.solo.services.state import SoloStateService
 
 
-class SoloDiffError(Exception):
-    """Raised when diff operations cannot be applied."""
+_UNMERGED = object()
 
 
 class SoloDiffService:
@@ -31,114 +32,156 @@ class SoloDiffService:
     @staticmethod
     def compute_digest(state: Dict[str, Any]) -> str:
         """Return SHA256 digest of the session state."""
-        normalized = json.dumps(state or {}, sort_keys=True, separators=(',', ':'))
-        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+        return SoloStateDigest.flat(state)
+
+    @staticmethod
+    def digest_state(
+        state: Dict[str, Any],
+        rev: int,
+        prev_state: Optional[Dict[str, Any]] = None,
+        prev_tree: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Return ``(digest, tree)`` for a state about to be stored at ``rev``.
+
+        In the default ``flat`` mode this is ``compute_digest`` and no tree.
+        In ``tree`` mode the digest is the root of the per-page digest tree;
+        pass the previous state and its (valid) tree to rehash only what
+        changed.
+        """
+        if SoloStateDigest.mode() != DIGEST_MODE_TREE:
+            return SoloStateDigest.flat(state), None
+        tree = SoloStateDigest.update(prev_state, prev_tree, state, rev=rev)
+        return tree['root'], tree
 
     @classmethod
-    def apply_diff(cls, state: Dict[str, Any], operations: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Apply diff operations to a copy of the provided state."""
-        new_state = copy.deepcopy(state or {})
+    def apply_diff(
+        cls,
+        state: Dict[str, Any],
+        operations: List[Dict[str, Any]],
+        copy_on_write: bool = True,
+    ) -> Dict[str, Any]:
+        """Apply diff operations and return the new state.
+
+        The input state is never mutated. By default the result shares every
+        page, collection and item the ops do not touch with the input
+        (structural sharing); pass ``copy_on_write=False`` to get a fully
+        independent deep copy instead.
+        """
+        if not copy_on_write:
+            engine = DiffEngine(copy.deepcopy(state or {}))
+        else:
+            engine = DiffEngine(state or {}, copy_on_write=True)
+        new_state = engine.state
         pages = new_state.setdefault('pages', [])
         if not pages:
             pages.append({'id': new_state.get('activePageId') or 'page-1', 'strokes': [], 'assets': []})
-        for page in pages:
-            page.setdefault('strokes', [])
-            page.setdefault('assets', [])
+        for position, page in enumerate(pages):
+            if 'strokes' not in page or 'assets' not in page:
+                page = engine.own_page(position)
+                page.setdefault('strokes', [])
+                page.setdefault('assets', [])
         new_state.setdefault('activePageId', pages[0].get('id'))
 
-        for op in operations:
-            cls._apply_single_op(new_state, op)
-
-        return new_state
+        return engine.apply(operations)
 
     @classmethod
-    def _apply_single_op(cls, state: Dict[str, Any], op: Dict[str, Any]) -> None:
-        op_type = op.get('op')
-        kind = op.get('kind')
-        if op_type not in {'add', 'update', 'remove'}:
-            raise SoloDiffError(f"Unsupported op '{op_type}'")
-        if kind not in cls.SUPPORTED_KINDS:
-            raise SoloDiffError(f"Unsupported kind '{kind}'")
-
-        if kind == 'meta':
-            cls._apply_meta_op(state, op)
-        else:
-            cls._apply_collection_op(state, op_type, kind, op)
+    def normalize_ops(cls, operations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Coalesce op chains on the same item into one effective op.
+
+        Per (page, kind, id), in order: ``add`` + ``update`` becomes one
+        ``add`` with the patched value, ``update`` + ``update`` one merged
+        ``update`` and ``update`` + ``remove`` a single ``remove``.
+        Consecutive meta patches are merged into one. A merged op keeps the
+        position of the first op of its chain; an op naming the item through
+        another page (e.g. ``page_id`` vs the active page) starts a new one. An ``add`` + ``remove`` pair
+        is kept: the state is not known here, so the engine must still
+        reject an ``add`` of an id that already exists. Ops that cannot be
+        merged (anything after a ``remove``, a second ``add``, non-dict
+        payloads) are kept as they are so the engine still reports them.
+        The input ops are not mutated.
+        """
+        result: List[Optional[Dict[str, Any]]] = []
+        chains: Dict[tuple, tuple] = {}
+        last_meta: Optional[int] = None
 
-    @classmethod
-    def _apply_meta_op(cls, state: Dict[str, Any], op: Dict[str, Any]) -> None:
-        meta = state.setdefault('meta', {})
-        if op['op'] == 'remove':
-            key = op.get('id')
-            if key in meta:
-                meta.pop(key, None)
-            return
-        patch = op.get('patch') or op.get('value')
-        if not isinstance(patch, dict):
-            raise SoloDiffError('Meta op requires dict payload')
-        meta.update(patch)
+        for op in operations:
+            if op.get('kind') == 'meta':
+                if last_meta is not None:
+                    merged = cls._merge_meta_ops(result[last_meta], op)
+                    if merged is not None:
+                        result[last_meta] = merged
+                        continue
+                last_meta = len(result)
+                result.append(op)
+                continue
 
-    @classmethod
-    def _apply_collection_op(
-        cls,
-        state: Dict[str, Any],
-        op_type: str,
-        kind: str,
-        op: Dict[str, Any],
-    ) -> None:
-        page = cls._resolve_page(state, op)
-        collection = page['strokes'] if kind == 'stroke' else page['assets']
-
-        if op_type == 'add':
-            value = op.get('value')
-            if not isinstance(value, dict):
-                raise SoloDiffError('Add op requires "value" dict')
-            item_id = value.get('id')
-            if not item_id:
-                raise SoloDiffError('Add op value must include id')
-            if any(item.get('id') == item_id for item in collection):
-                raise SoloDiffError(f'Item {item_id} already exists')
-            collection.append(value)
-            return
-
-        item_id = op.get('id')
-        if not item_id:
-            raise SoloDiffError('Update/remove ops require id')
-
-        item = cls._find_item(collection, item_id)
-        if item is None:
-            raise SoloDiffError(f'Item {item_id} not found')
+            # The page is resolved without the state: an explicit page_id and
+            # the active page may be the same page. An op reaching the item
+            # through another page key ends its chain, so order is kept.
+            key = (op.get('kind'), cls._op_item_id(op))
+            page = DiffEngine.target_page_id({}, op)
+            chain = chains.get(key)
+            if chain is not None and chain[0] == page:
+                merged = cls._merge_item_ops(result[chain[1]], op)
+                if merged is not _UNMERGED:
+                    result[chain[1]] = merged
+                    continue
+            if key[1]:
+                chains[key] = (page, len(result))
+            result.append(op)
+
+        return [op for op in result if op is not None]
 
-        if op_type == 'remove':
-            collection.remove(item)
-            return
-
-        patch = op.get('patch') or op.get('value')
-        if not isinstance(patch, dict):
-            raise SoloDiffError('Update requires patch/value dict')
-        for k, v in patch.items():
-            if k == 'id':
-                continue
-            item[k] = v
+    @staticmethod
+    def _op_item_id(op: Dict[str, Any]) -> Any:
+        if op.get('op') == 'add':
+            value = op.get('value')
+            return value.get('id') if isinstance(value, dict) else None
+        return op.get('id')
 
     @staticmethod
-    def _find_item(collection: List[Dict[str, Any]], item_id: str) -> Optional[Dict[str, Any]]:
-        for item in collection:
-            if item.get('id') == item_id:
-                return item
-        return None
+    def _merge_item_ops(current: Dict[str, Any], op: Dict[str, Any]):
+        """Merge ``op`` into ``current``; ``_UNMERGED`` keeps both."""
+        current_type, op_type = current.get('op'), op.get('op')
+        if current_type == 'add':
+            current_payload = current.get('value')
+        else:
+            current_payload = current.get('patch') or current.get('value')
+        if not isinstance(current_payload, dict):
+            return _UNMERGED
+
+        if op_type == 'remove':
+            if current_type == 'update':
+                return op
+            return _UNMERGED
+
+        payload = op.get('patch') or op.get('value')
+        if op_type != 'update' or not isinstance(payload, dict):
+            return _UNMERGED
+        if current_type == 'add':
+            if 'page_id' in payload:
+                # value['page_id'] selects the target page of an add.
+                return _UNMERGED
+            value = dict(current_payload)
+            value.update((k, v) for k, v in payload.items() if k != 'id')
+            return dict(current, value=value)
+        if current_type == 'update':
+            patch = dict(current_payload)
+            patch.update(payload)
+            return dict(current, patch=patch)
+        return _UNMERGED
 
     @staticmethod
-    def _resolve_page(state: Dict[str, Any], op: Dict[str, Any]) -> Dict[str, Any]:
-        target_page_id = op.get('page_id') or op.get('value', {}).get('page_id') or state.get('activePageId')
-        pages = state.setdefault('pages', [])
-        for page in pages:
-            if page.get('id') == target_page_id:
-                return page
-        if not pages:
-            pages.append({'id': target_page_id or 'page-1', 'strokes': [], 'assets': []})
-            return pages[-1]
-        return pages[0]
+    def _merge_meta_ops(current: Dict[str, Any], op: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if current.get('op') == 'remove' or op.get('op') == 'remove':
+            return None
+        current_payload = current.get('patch') or current.get('value')
+        payload = op.get('patch') or op.get('value')
+        if not isinstance(current_payload, dict) or not isinstance(payload, dict):
+            return None
+        patch = dict(current_payload)
+        patch.update(payload)
+        return dict(current, patch=patch)
 
 
 class SoloService:
@@ -193,27 +236,36 @@ class SoloService:
     @staticmethod
     def _process_json_export(export):
         """Process JSON export synchronously."""
-        session = export.session
+        from apps.solo.models import SoloSession
+        from apps.solo.services.statebytes import SoloStateBytes
 
-        content = json.dumps(
-            {
-                'id': str(session.id),
-                'name': session.name,
-                'state': session.state,
-                'page_count': session.page_count,
-                'created_at': session.created_at.isoformat(),
-                'updated_at': session.updated_at.isoformat(),
-            },
-            indent=2,
-            ensure_ascii=False,
-        )
+        session = export.session
+        if SoloStateBytes.is_current(session):
+            # Embedded below; the other columns of ``session`` suffice elsewhere.
+            session = SoloSession.objects.with_state_bytes().get(pk=session.pk)
+        header = {
+            'id': str(session.id),
+            'name': session.name,
+            'page_count': session.page_count,
+            'created_at': session.created_at.isoformat(),
+            'updated_at': session.updated_at.isoformat(),
+        }
+        state_json = SoloStateBytes.raw(session)
+        if state_json is not None:
+            # Stored bytes are compact; only the header is indented.
+            head = codec.dumps(header, indent=True)
+            payload_bytes = head[:-2] + b',\n  "state": ' + state_json + b'\n}'
+        else:
+            payload_bytes = codec.dumps(
+                dict(header, state=SoloStateService.current_state(session)),
+                indent=True,
+            )
 
-        file_size = len(content.encode('utf-8'))
+        file_size = len(payload_bytes)
 
         try:
             storage = get_storage_backend()
             file_path = f"exports/{export.user.id}/{export.id}.json"
-            payload_bytes = content.encode('utf-8')
             if hasattr(storage, 'upload_content'):
                 file_url = storage.upload_content(
                     payload_bytes,
@@ -266,18 +318,49 @@ class SoloService:
         new_session = SoloSession.objects.create(
             user=session.user,
             name=f"{session.name} (Copy)",
-            state=session.state,
+            state=SoloStateService.current_state(session),
             page_count=session.page_count,
         )
 
         return new_session
 
+    # Bounds how long a count that raced a create/delete can be off.
+    SESSION_COUNT_TIMEOUT = 60 * 60
+
+    @staticmethod
+    def session_count_key(user_id) -> str:
+        return f'solo:session_count:{user_id}'
+
+    @classmethod
+    def session_count(cls, user_id) -> int:
+        """Number of sessions of ``user_id``, counted once and then kept by signals."""
+        from django.core.cache import cache
+        from apps.solo.models import SoloSession
+
+        key = cls.session_count_key(user_id)
+        count = cache.get(key)
+        if count is None:
+            count = SoloSession.objects.filter(user_id=user_id).count()
+            cache.add(key, count, timeout=cls.SESSION_COUNT_TIMEOUT)
+        return count
+
+    @classmethod
+    def adjust_session_count(cls, user_id, delta: int) -> None:
+        """Apply a create (+1) or delete (-1) to a cached count, if there is one."""
+        from django.core.cache import cache
+
+        try:
+            cache.incr(cls.session_count_key(user_id), delta)
+        except ValueError:
+            # Not cached: the next read counts.
+            pass
+
     @staticmethod
     def get_recent_sessions(user, limit: int = 5):
         """Get user's recent sessions."""
         from apps.solo.models import SoloSession
 
-        return SoloSession.objects.filter(user=user)[:limit]
+        return SoloSession.objects.without_state().filter(user=user)[:limit]
 
 
 __all__ = [
@@ -291,4 +374,5 @@ __all__ = [
     'CdnService',
     'SoloService',
     'SoloDiffService',
+    'SoloDiffError',
 ]
@@ -0,0 +1,90 @@
+"""
+Single read path for Solo session state.
+
+Hides how a session's state is stored: a materialized blob (plus a pending
+op-log tail, see ``SoloOpLogService``) or per-page rows (see
+``SoloPageStore``).
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from apps.solo.services.digest import SoloStateDigest
+from apps.solo.services.oplog import SoloOpLogService
+from apps.solo.services.pages import SoloPageStore
+
+# Stands for the state's ``activePageId`` in a page selection.
+ACTIVE_PAGE = 'active'
+
+
+class SoloStateService:
+    """Resolve the current full state of a session."""
+
+    @staticmethod
+    def current_state(session) -> Dict[str, Any]:
+        if SoloPageStore.is_paged(session):
+            cached = getattr(session, '_solo_current_state', None)
+            if cached is not None and cached[0] == session.rev:
+                return cached[1]
+            state = SoloPageStore.assemble(session)
+            session._solo_current_state = (session.rev, state)
+            return state
+        return SoloOpLogService.current_state(session)
+
+    @classmethod
+    def select_pages(cls, session, page_ids: List[str]) -> Tuple[Dict[str, Any], List[Any]]:
+        """Return the state with only ``page_ids`` and the ids of all pages, in order.
+
+        Paged sessions read only the selected page rows.
+        """
+        if SoloPageStore.is_paged(session):
+            from apps.solo.models import SoloPage
+
+            wanted = cls._resolve_active(session.state, page_ids)
+            all_ids = list(
+                SoloPage.objects.filter(session_id=session.pk).order_by('position').values_list('page_id', flat=True)
+            )
+            return SoloPageStore.assemble(session, wanted), all_ids
+
+        state = cls.current_state(session)
+        wanted = set(cls._resolve_active(state, page_ids))
+        pages = state.get('pages') if isinstance(state.get('pages'), list) else []
+        all_ids = [page.get('id') if isinstance(page, dict) else None for page in pages]
+        selected = [page for page, page_id in zip(pages, all_ids) if page_id in wanted]
+        return dict(state, pages=selected), all_ids
+
+    @classmethod
+    def stored_page_digest(cls, session, page_id: str) -> Optional[str]:
+        """Digest of one page if it is known without reading the state."""
+        if SoloPageStore.is_paged(session):
+            from apps.solo.models import SoloPage
+
+            digest = (
+                SoloPage.objects.filter(session_id=session.pk, page_id=page_id)
+                .values_list('digest', flat=True)
+                .first()
+            )
+            return digest or None
+        tree = session.state_tree
+        if SoloStateDigest.is_valid_for(tree, session.rev, session.state_digest):
+            return SoloStateDigest.page_digests(tree).get(page_id)
+        return None
+
+    @classmethod
+    def page(cls, session, page_id: str) -> Optional[Dict[str, Any]]:
+        """One page of the current state, or ``None`` if there is no such page."""
+        if SoloPageStore.is_paged(session):
+            from apps.solo.models import SoloPage
+
+            return (
+                SoloPage.objects.filter(session_id=session.pk, page_id=page_id)
+                .values_list('data', flat=True)
+                .first()
+            )
+        for page in cls.current_state(session).get('pages') or []:
+            if isinstance(page, dict) and page.get('id') == page_id:
+                return page
+        return None
+
+    @staticmethod
+    def _resolve_active(state: Optional[Dict[str, Any]], page_ids: List[str]) -> List[str]:
+        active = (state or {}).get('activePageId')
+        return [active if page_id == ACTIVE_PAGE else page_id for page_id in page_ids]
@@ -0,0 +1,127 @@
+"""
+Serialized state bytes stored next to ``SoloSession.state``.
+
+With ``SOLO_STATE_BYTES`` set to ``'identity'``, ``'gzip'`` or ``'zstd'``,
+every write that materializes a blob session's state also stores its JSON
+encoding (``codec.dumps``), compressed with that coding, together with the
+uncompressed size and the rev it was written at. Readers that would
+otherwise re-encode the state (detail and public GET, snapshots, versioned
+uploads, JSON exports, the export size check) use the stored bytes while
+``state_bytes_rev`` equals the session's rev. Any write that bumps the rev
+without storing bytes (deferred op-log state, paged storage, buffered
+saves not yet flushed) makes them stale, and readers fall back to encoding
+the state. Raw PATCH overwrites keep the rev and therefore always replace
+or clear the bytes.
+
+``state_bytes`` is deferred by the default manager; load it with
+``SoloSession.objects.with_state_bytes()``.
+"""
+import gzip
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+
+from apps.solo import codec
+from apps.solo.services.pages import SoloPageStore
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+logger = logging.getLogger('solo.statebytes')
+
+ENCODING_IDENTITY = 'identity'
+ENCODING_GZIP = 'gzip'
+ENCODING_ZSTD = 'zstd'
+
+
+class SoloStateBytes:
+    """Encode the state once per write, reuse the bytes on reads."""
+
+    CLEARED: Dict[str, Any] = {
+        'state_bytes': None,
+        'state_bytes_encoding': '',
+        'state_bytes_size': 0,
+        'state_bytes_rev': None,
+    }
+
+    @staticmethod
+    def mode() -> str:
+        """Coding of stored bytes; ``''`` disables storing them."""
+        return (getattr(settings, 'SOLO_STATE_BYTES', '') or '').lower()
+
+    @classmethod
+    def enabled(cls) -> bool:
+        return bool(cls.mode())
+
+    @classmethod
+    def values(cls, state: Dict[str, Any], rev: int) -> Dict[str, Any]:
+        """Columns to write along with ``state`` at ``rev`` (empty when disabled)."""
+        mode = cls.mode()
+        if not mode:
+            return {}
+        raw = codec.dumps(state)
+        encoding, data = cls._compress(raw, mode)
+        return {
+            'state_bytes': data,
+            'state_bytes_encoding': encoding,
+            'state_bytes_size': len(raw),
+            'state_bytes_rev': rev,
+        }
+
+    @staticmethod
+    def is_current(session) -> bool:
+        """True if the stored bytes encode the session's state at its rev."""
+        return (
+            session.state_bytes_rev is not None
+            and session.state_bytes_rev == session.rev
+            and not SoloPageStore.is_paged(session)
+        )
+
+    @classmethod
+    def size(cls, session) -> Optional[int]:
+        """Length of the JSON encoding, without loading the bytes or the state."""
+        return session.state_bytes_size if cls.is_current(session) else None
+
+    @classmethod
+    def encoded(cls, session) -> Optional[Tuple[bytes, str]]:
+        """``(bytes, content coding)`` as stored, or ``None`` if stale."""
+        if not cls.is_current(session) or session.state_bytes is None:
+            return None
+        return bytes(session.state_bytes), session.state_bytes_encoding or ENCODING_IDENTITY
+
+    @classmethod
+    def raw(cls, session) -> Optional[bytes]:
+        """The stored JSON encoding, decompressed, or ``None`` if stale."""
+        stored = cls.encoded(session)
+        if stored is None:
+            return None
+        data, encoding = stored
+        if encoding == ENCODING_GZIP:
+            return gzip.decompress(data)
+        if encoding == ENCODING_ZSTD:
+            return zstandard.ZstdDecompressor().decompress(data, max_output_size=session.state_bytes_size)
+        return data
+
+    @classmethod
+    def state_json(cls, session) -> bytes:
+        """``codec.dumps`` of the current state, from the stored bytes when possible."""
+        raw = cls.raw(session)
+        if raw is not None:
+            return raw
+        from apps.solo.services.state import SoloStateService
+
+        return codec.dumps(SoloStateService.current_state(session))
+
+    @staticmethod
+    def _compress(raw: bytes, mode: str) -> Tuple[str, bytes]:
+        if mode == ENCODING_ZSTD:
+            if zstandard is not None:
+                return ENCODING_ZSTD, zstandard.ZstdCompressor().compress(raw)
+            logger.warning('SOLO_STATE_BYTES=zstd needs the zstandard package; storing gzip')
+            mode = ENCODING_GZIP
+        if mode == ENCODING_GZIP:
+            return ENCODING_GZIP, gzip.compress(raw, compresslevel=6, mtime=0)
+        return ENCODING_IDENTITY, raw
@@ -123,9 +123,10 @@ class ThumbnailService:
     def generate_and_upload(session) -> Optional[str]:
         """Generate thumbnail and upload to storage."""
         from apps.solo.services.storage import SoloStorageService
+        from apps.solo.services.state import SoloStateService
         
         try:
-            thumbnail = ThumbnailService.generate_from_state(session.state)
+            thumbnail = ThumbnailService.generate_from_state(SoloStateService.current_state(session))
             
             storage = SoloStorageService()
             url = storage.upload_thumbnail(str(session.id), thumbnail)
@@ -0,0 +1,175 @@
+"""
+Resumable uploads of full session states.
+
+A save-stream body must arrive in one request. For states that are large
+or sent over flaky connections, the client opens an upload instead
+(``create``: total size and SHA-256 of the body), sends it as numbered
+chunks of ``chunk_size`` bytes in any order (``put_chunk``), and commits.
+``assemble`` checks that every chunk is there, hashes them in order and
+joins them once into the body. Interrupted uploads resume by sending only
+the chunks ``missing`` reports.
+
+Chunks are staged in the Django cache, shared by all workers, and expire
+``SOLO_UPLOAD_TTL_SECONDS`` after the upload was opened. That cache also
+holds the write-behind buffer, which must not be evicted, so each user may
+have at most ``SOLO_UPLOAD_MAX_OPEN`` uploads open at a time.
+"""
+import hashlib
+import re
+import uuid
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.solo.limits import UPLOAD_CHUNK_MAX_BYTES, UPLOAD_MAX_BYTES
+
+_SHA256 = re.compile(r'^[0-9a-f]{64}$')
+
+
+class SoloUploadError(Exception):
+    """Raised for an invalid upload request; ``code`` is the API error."""
+
+    def __init__(self, code: str, **detail):
+        super().__init__(code)
+        self.code = code
+        self.detail = detail
+
+
+class SoloUploadStore:
+    """Stage, inspect and assemble chunked uploads."""
+
+    DEFAULT_TTL_SECONDS = 60 * 60
+    DEFAULT_MAX_OPEN = 2
+    MIN_CHUNK_BYTES = 64 * 1024
+    # Seconds the per-user lock around ``create`` may be held.
+    LOCK_TIMEOUT = 5
+
+    @classmethod
+    def ttl(cls) -> int:
+        return max(60, int(getattr(settings, 'SOLO_UPLOAD_TTL_SECONDS', cls.DEFAULT_TTL_SECONDS)))
+
+    @classmethod
+    def max_open(cls) -> int:
+        return max(1, int(getattr(settings, 'SOLO_UPLOAD_MAX_OPEN', cls.DEFAULT_MAX_OPEN)))
+
+    @staticmethod
+    def user_key(user_id) -> str:
+        return f'solo:upload:user:{user_id}'
+
+    @staticmethod
+    def key(upload_id: str) -> str:
+        return f'solo:upload:{upload_id}'
+
+    @classmethod
+    def chunk_key(cls, upload_id: str, index: int) -> str:
+        return f'{cls.key(upload_id)}:chunk:{index}'
+
+    @classmethod
+    def mark_key(cls, upload_id: str, index: int) -> str:
+        return f'{cls.key(upload_id)}:got:{index}'
+
+    @classmethod
+    def create(cls, user_id, session_id, size, sha256, chunk_size=None) -> Dict[str, Any]:
+        """Open an upload of ``size`` bytes whose SHA-256 is ``sha256``."""
+        if not isinstance(size, int) or isinstance(size, bool) or size < 1:
+            raise SoloUploadError('invalid_size')
+        if size > UPLOAD_MAX_BYTES:
+            raise SoloUploadError('too_large', limit=UPLOAD_MAX_BYTES)
+        if not isinstance(sha256, str) or not _SHA256.match(sha256.lower()):
+            raise SoloUploadError('invalid_sha256')
+        if chunk_size is None:
+            chunk_size = UPLOAD_CHUNK_MAX_BYTES
+        if (
+            not isinstance(chunk_size, int) or isinstance(chunk_size, bool)
+            or not cls.MIN_CHUNK_BYTES <= chunk_size <= UPLOAD_CHUNK_MAX_BYTES
+        ):
+            raise SoloUploadError('invalid_chunk_size', min=cls.MIN_CHUNK_BYTES, max=UPLOAD_CHUNK_MAX_BYTES)
+
+        user_key = cls.user_key(user_id)
+        lock_key = f'{user_key}:lock'
+        if not cache.add(lock_key, 1, timeout=cls.LOCK_TIMEOUT):
+            raise SoloUploadError('upload_busy')
+        try:
+            # Uploads that were committed, abandoned or expired no longer count.
+            open_ids = cache.get(user_key) or []
+            live = cache.get_many([cls.key(upload_id) for upload_id in open_ids])
+            open_ids = [upload_id for upload_id in open_ids if cls.key(upload_id) in live]
+            if len(open_ids) >= cls.max_open():
+                raise SoloUploadError('too_many_uploads', limit=cls.max_open())
+            upload = cls._open(user_id, session_id, size, sha256, chunk_size)
+            cache.set(user_key, open_ids + [upload['upload_id']], timeout=cls.ttl())
+        finally:
+            cache.delete(lock_key)
+        return upload
+
+    @classmethod
+    def _open(cls, user_id, session_id, size, sha256, chunk_size) -> Dict[str, Any]:
+        upload = {
+            'upload_id': uuid.uuid4().hex,
+            'user_id': str(user_id),
+            'session_id': str(session_id),
+            'size': size,
+            'sha256': sha256.lower(),
+            'chunk_size': chunk_size,
+            'chunks': -(-size // chunk_size),
+        }
+        cache.set(cls.key(upload['upload_id']), upload, timeout=cls.ttl())
+        return upload
+
+    @classmethod
+    def get(cls, upload_id: str, user_id, session_id) -> Optional[Dict[str, Any]]:
+        """The upload, if it exists and belongs to this user and session."""
+        upload = cache.get(cls.key(upload_id))
+        if upload is None or upload['user_id'] != str(user_id) or upload['session_id'] != str(session_id):
+            return None
+        return upload
+
+    @staticmethod
+    def chunk_range(upload: Dict[str, Any], index: int):
+        """``(start, end)`` byte offsets of chunk ``index`` (end exclusive)."""
+        start = index * upload['chunk_size']
+        return start, min(start + upload['chunk_size'], upload['size'])
+
+    @classmethod
+    def put_chunk(cls, upload: Dict[str, Any], index: int, data: bytes) -> None:
+        if not 0 <= index < upload['chunks']:
+            raise SoloUploadError('invalid_chunk', chunks=upload['chunks'])
+        start, end = cls.chunk_range(upload, index)
+        if len(data) != end - start:
+            raise SoloUploadError('invalid_range', start=start, end=end - 1, size=upload['size'])
+        upload_id = upload['upload_id']
+        cache.set(cls.chunk_key(upload_id, index), data, timeout=cls.ttl())
+        # Small marker so ``missing`` does not fetch the chunks themselves.
+        cache.set(cls.mark_key(upload_id, index), 1, timeout=cls.ttl())
+
+    @classmethod
+    def missing(cls, upload: Dict[str, Any]) -> List[int]:
+        upload_id = upload['upload_id']
+        marks = cache.get_many([cls.mark_key(upload_id, index) for index in range(upload['chunks'])])
+        return [index for index in range(upload['chunks']) if cls.mark_key(upload_id, index) not in marks]
+
+    @classmethod
+    def assemble(cls, upload: Dict[str, Any]) -> bytes:
+        """The uploaded body; raises ``SoloUploadError`` if incomplete or corrupt."""
+        upload_id = upload['upload_id']
+        keys = [cls.chunk_key(upload_id, index) for index in range(upload['chunks'])]
+        found = cache.get_many(keys)
+        missing = [index for index, key in enumerate(keys) if key not in found]
+        if missing:
+            raise SoloUploadError('upload_incomplete', missing=missing)
+        chunks = [found[key] for key in keys]
+        digest = hashlib.sha256()
+        for chunk in chunks:
+            digest.update(chunk)
+        if digest.hexdigest() != upload['sha256']:
+            raise SoloUploadError('digest_mismatch')
+        return chunks[0] if len(chunks) == 1 else b''.join(chunks)
+
+    @classmethod
+    def discard(cls, upload: Dict[str, Any]) -> None:
+        upload_id = upload['upload_id']
+        keys = [cls.key(upload_id)]
+        for index in range(upload['chunks']):
+            keys += [cls.chunk_key(upload_id, index), cls.mark_key(upload_id, index)]
+        cache.delete_many(keys)
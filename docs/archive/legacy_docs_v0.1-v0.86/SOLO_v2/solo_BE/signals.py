@@ -1,11 +1,13 @@
 """
-Signals for Solo Workspace observability.
+Signals for Solo Workspace observability and cached session counts.
 """
 import logging
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
 from apps.solo.models import SoloSession, SoloExport, ShareToken
+from apps.solo.services.solo import SoloService
 
 logger = logging.getLogger('solo.events')
 
@@ -14,6 +16,9 @@ logger = logging.getLogger('solo.events')
 def log_session_saved(sender, instance, created, **kwargs):
     """Log session save events."""
     action = 'created' if created else 'updated'
+    if created:
+        # Rolled-back creates must not count.
+        transaction.on_commit(lambda: SoloService.adjust_session_count(instance.user_id, 1))
     logger.info(
         f"SOLO_SESSION_{action.upper()} | "
         f"session_id={instance.id} | "
@@ -26,6 +31,7 @@ def log_session_saved(sender, instance, created, **kwargs):
 @receiver(post_delete, sender=SoloSession)
 def log_session_deleted(sender, instance, **kwargs):
     """Log session delete events."""
+    transaction.on_commit(lambda: SoloService.adjust_session_count(instance.user_id, -1))
     logger.info(
         f"SOLO_SESSION_DELETED | "
         f"session_id={instance.id} | "
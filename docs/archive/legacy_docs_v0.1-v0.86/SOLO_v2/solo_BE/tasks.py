@@ -157,7 +157,9 @@ def generate_png_export_task(session_id: str, export_id: str, page: int = 0):
         export = SoloExport.objects.get(pk=export_id)
         
         # Generate PNG using thumbnail service (full size)
-        png_buffer = ThumbnailService.generate_from_state(session.state)
+        from apps.solo.services.state import SoloStateService
+
+        png_buffer = ThumbnailService.generate_from_state(SoloStateService.current_state(session))
         
         # Upload
         storage = SoloStorageService()
@@ -183,14 +185,17 @@ def upload_state_versioned_task(user_id: str, session_id: str, rev: int):
     from apps.solo.services.storage import SoloStorageService
 
     try:
-        session = SoloSession.objects.get(pk=session_id)
+        session = SoloSession.objects.with_state_bytes().get(pk=session_id)
     except SoloSession.DoesNotExist:
         logger.warning(f"Session {session_id} not found for versioned state upload")
         return {'status': 'error', 'message': 'Session not found'}
 
     try:
-        state_json = session.state or {}
-        payload = __import__('json').dumps(state_json, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        from apps.solo.services.buffer import SoloWriteBuffer
+        from apps.solo.services.statebytes import SoloStateBytes
+
+        SoloWriteBuffer.overlay(session)
+        payload = SoloStateBytes.state_json(session)
         storage = SoloStorageService()
         result = storage.upload_state_versioned(user_id=str(user_id), session_id=str(session_id), rev=int(rev), state_json=payload)
         return {'status': 'success', 'result': result}
@@ -261,3 +266,94 @@ def cleanup_old_snapshots(keep_last: int | None = None):
         'freed_bytes': freed_bytes_total,
         'keep_last': keep_last,
     }
+
+
+@shared_task(name='solo.compact_oplog')
+def compact_oplog_task(session_id: str):
+    """Fold a session's op-log tail into its materialized state."""
+    from apps.solo.services.oplog import SoloOpLogService
+
+    try:
+        compacted = SoloOpLogService.compact(session_id)
+        return {'status': 'success', 'compacted': compacted}
+    except Exception as e:
+        logger.error(f"Failed to compact op log for session {session_id}: {e}")
+        return {'status': 'error', 'message': str(e)}
+
+
+@shared_task(name='solo.compact_idle_oplogs')
+def compact_idle_oplogs():
+    """
+    Materialize sessions whose op-log tail has been idle.
+
+    Runs every few seconds via celery beat (SOLO_OPLOG_COMPACT_AFTER_SECONDS).
+    """
+    from apps.solo.services.oplog import SoloOpLogService
+
+    compacted = 0
+    for session_id in SoloOpLogService.idle_sessions().iterator():
+        try:
+            if SoloOpLogService.compact(session_id):
+                compacted += 1
+        except Exception as e:
+            logger.error(f"Failed to compact op log for session {session_id}: {e}")
+
+    if compacted:
+        logger.info(f"Compacted op log of {compacted} idle sessions")
+    return {'compacted': compacted}
+
+
+@shared_task(name='solo.convert_paged_storage')
+def convert_paged_storage_task(session_id: str):
+    """Move a large session from the state blob into per-page rows."""
+    from apps.solo.services.buffer import SoloWriteBuffer
+    from apps.solo.services.pages import SoloPageStore
+
+    try:
+        if SoloWriteBuffer.enabled():
+            # Buffered saves must reach the blob before it is split into pages.
+            with SoloWriteBuffer.open(session_id) as staged:
+                staged.flush()
+                converted = SoloPageStore.convert(session_id)
+        else:
+            converted = SoloPageStore.convert(session_id)
+        return {'status': 'success', 'converted': converted}
+    except Exception as e:
+        logger.error(f"Failed to convert session {session_id} to paged storage: {e}")
+        return {'status': 'error', 'message': str(e)}
+
+
+@shared_task(name='solo.flush_write_buffer')
+def flush_write_buffer_task(session_id: str):
+    """Persist a session's write-behind buffer (see SoloWriteBuffer)."""
+    from django.core.cache import cache
+    from apps.solo.services.buffer import SoloWriteBuffer
+
+    try:
+        flushed = SoloWriteBuffer.flush(session_id)
+        if not flushed and cache.get(SoloWriteBuffer.key(session_id)) is not None:
+            # Lock was busy: try again later rather than leave the entry behind.
+            SoloWriteBuffer.schedule_flush(session_id)
+        return {'status': 'success', 'flushed': flushed}
+    except Exception as e:
+        logger.error(f"Failed to flush write buffer of session {session_id}: {e}")
+        return {'status': 'error', 'message': str(e)}
+
+
+@shared_task(name='solo.flush_heartbeats')
+def flush_heartbeats():
+    """
+    Write coalesced beacon heartbeats to SoloSession.last_write_at.
+
+    Runs every SOLO_HEARTBEAT_FLUSH_SECONDS via celery beat (see SoloHeartbeats).
+    """
+    from apps.solo.services.heartbeat import SoloHeartbeats
+
+    try:
+        updated = SoloHeartbeats.flush()
+    except Exception as e:
+        logger.error(f"Failed to flush beacon heartbeats: {e}")
+        return {'status': 'error', 'message': str(e)}
+    if updated:
+        logger.info(f"Flushed heartbeats of {updated} sessions")
+    return {'status': 'success', 'updated': updated}
@@ -0,0 +1,56 @@
+"""
+Tests for the pluggable JSON codec (stdlib parity of the fast backend).
+"""
+import json
+
+import pytest
+from django.test.utils import override_settings
+
+from apps.solo import codec
+
+
+SAMPLES = [
+    {'pages': [{'id': 'p1', 'strokes': [{'id': 's1', 'points': [[1.5, 2.25, 0.3]], 'color': '#a3e4f0'}]}]},
+    {'b': 1, 'a': [0.0001, 100.0, 123456789012345.6, -0.0, True, False]},
+    {'tiny': 1e-05, 'tinier': 2.5e-07, 'huge': 1e16, 'exp': 1.5e+300},
+    {'text': 'Привет, мир 😀', 'ctrl': '\x00\x1f\x7f ', 'quote': '"\\/'},
+    {'nothing': None, 'nan': float('nan'), 'inf': float('-inf')},
+    {'big': 2 ** 64, 'small': -2 ** 63 - 1, 'ok': 2 ** 63 - 1},
+    {1: 'int key', 2: [[[{}]]]},
+    'scalar',
+    1e-05,
+]
+
+
+@pytest.fixture(params=[codec.BACKEND_JSON, codec.BACKEND_ORJSON])
+def backend(request):
+    if request.param == codec.BACKEND_ORJSON and codec.orjson is None:
+        pytest.skip('orjson is not installed')
+    with override_settings(SOLO_JSON_BACKEND=request.param):
+        yield request.param
+
+
+class TestCodecParity:
+    @pytest.mark.parametrize('value', SAMPLES)
+    def test_canonical_is_byte_identical(self, backend, value):
+        expected = json.dumps(value, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        assert codec.canonical(value) == expected
+
+    @pytest.mark.parametrize('value', SAMPLES)
+    def test_dumps_is_byte_identical(self, backend, value):
+        assert codec.dumps(value) == json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        assert codec.dumps(value, indent=True) == json.dumps(value, ensure_ascii=False, indent=2).encode('utf-8')
+
+    @pytest.mark.parametrize('text', [
+        '{"a": [1, 2.5, 1e-05, "x"], "b": null}',
+        '[18446744073709551616, -9694248950087451372]',
+        '[NaN, Infinity]',
+        '{"a": 1, "a": 2}',
+    ])
+    def test_loads_matches_stdlib(self, backend, text):
+        assert repr(codec.loads(text)) == repr(json.loads(text))
+        assert repr(codec.loads(text.encode('utf-8'))) == repr(json.loads(text))
+
+    def test_loads_raises_stdlib_errors(self, backend):
+        with pytest.raises(json.JSONDecodeError):
+            codec.loads('{"a":')
@@ -0,0 +1,148 @@
+"""
+Tests for ETag / If-None-Match on session reads.
+"""
+import re
+import time
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.users.models import User
+from apps.solo.api.views import SoloSessionSnapshotLatestView
+from apps.solo.models import SoloSession
+from apps.solo.services.sharing import SharingService
+
+_STATE_COLUMN = re.compile(r'"solo_session"\."state"')
+
+
+@pytest.fixture
+def owner(db):
+    return User.objects.create_user(
+        email='etag-student@test.com',
+        password='testpass123',
+        first_name='Etag',
+        last_name='Student',
+        role='student',
+    )
+
+
+@pytest.fixture
+def api_client(owner):
+    client = APIClient()
+    client.force_authenticate(user=owner)
+    return client
+
+
+@pytest.fixture
+def solo_session(owner):
+    return SoloSession.objects.create(
+        user=owner,
+        name='Etag Session',
+        state={'pages': [{'id': 'p1', 'strokes': [], 'assets': []}], 'activePageId': 'p1'},
+        page_count=1,
+    )
+
+
+def _state_reads(queries):
+    return [q['sql'] for q in queries.captured_queries if _STATE_COLUMN.search(q['sql'].split(' FROM ')[0])]
+
+
+@pytest.mark.django_db
+class TestDetailConditionalGet:
+    def test_matching_etag_is_304_without_state(self, api_client, solo_session):
+        url = reverse('solo-api:session-detail', args=[solo_session.id])
+        etag = api_client.get(url)['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+        assert _state_reads(queries) == []
+
+    def test_diff_save_changes_the_etag(self, api_client, solo_session):
+        url = reverse('solo-api:session-detail', args=[solo_session.id])
+        etag = api_client.get(url)['ETag']
+        api_client.patch(
+            reverse('solo-api:session-diff', args=[solo_session.id]),
+            {'rev': solo_session.rev, 'ops': [{'op': 'add', 'kind': 'stroke', 'value': {'id': 's1', 'points': []}}]},
+            format='json',
+            HTTP_IF_MATCH=f'W/"rev:{solo_session.rev}"',
+        )
+
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+        assert response.data['state']['pages'][0]['strokes'][0]['id'] == 's1'
+
+    def test_rename_changes_the_etag(self, api_client, solo_session):
+        url = reverse('solo-api:session-detail', args=[solo_session.id])
+        etag = api_client.get(url)['ETag']
+        api_client.patch(url, {'name': 'Renamed'}, format='json')
+
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=f'"other", {etag}')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['name'] == 'Renamed'
+
+
+@pytest.mark.django_db
+class TestPublicAndSnapshotConditionalGet:
+    def test_public_session_304(self, solo_session):
+        share = SharingService.create_share(session=solo_session)
+        client = APIClient()
+        url = reverse('solo-api:public-session', args=[share.token])
+        etag = client.get(url)['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert _state_reads(queries) == []
+        share.refresh_from_db()
+        assert share.view_count == 1
+
+    def test_public_etag_covers_share_and_owner(self, owner, solo_session):
+        share = SharingService.create_share(session=solo_session)
+        client = APIClient()
+        url = reverse('solo-api:public-session', args=[share.token])
+        etag = client.get(url)['ETag']
+
+        share.allow_download = not share.allow_download
+        share.save()
+        after_share = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        owner.first_name = 'Renamed'
+        owner.save()
+        after_owner = client.get(url, HTTP_IF_NONE_MATCH=after_share['ETag'])
+
+        assert after_share.status_code == status.HTTP_200_OK
+        assert after_share.data['allow_download'] == share.allow_download
+        assert after_owner.status_code == status.HTTP_200_OK
+        assert after_owner.data['owner'].startswith('Renamed')
+
+    def test_snapshot_latest_304(self, api_client, solo_session):
+        api_client.post(reverse('solo-api:session-snapshot-create', args=[solo_session.id]))
+        url = reverse('solo-api:session-snapshot-latest', args=[solo_session.id])
+        first = api_client.get(url)
+
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        assert first.status_code == status.HTTP_200_OK
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_snapshot_etag_changes_with_the_url_expiry(self, api_client, solo_session, monkeypatch):
+        api_client.post(reverse('solo-api:session-snapshot-create', args=[solo_session.id]))
+        url = reverse('solo-api:session-snapshot-latest', args=[solo_session.id])
+        first = api_client.get(url)
+        later = time.time() + SoloSessionSnapshotLatestView.URL_WINDOW_SECONDS
+        monkeypatch.setattr(time, 'time', lambda: later)
+
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != first['ETag']
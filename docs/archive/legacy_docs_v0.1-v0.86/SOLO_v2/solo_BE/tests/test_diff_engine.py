@@ -0,0 +1,221 @@
+"""
+Unit tests for the indexed diff engine (SoloDiffService.apply_diff).
+"""
+import pytest
+
+from apps.solo.services import SoloDiffService, SoloDiffError
+
+
+def _state(stroke_count=0):
+    return {
+        'pages': [
+            {'id': 'p1', 'strokes': [{'id': f's{i}', 'points': []} for i in range(stroke_count)], 'assets': []},
+            {'id': 'p2', 'strokes': [], 'assets': []},
+        ],
+        'activePageId': 'p1',
+    }
+
+
+class TestDiffEngine:
+    def test_add_update_remove_keep_order(self):
+        ops = [
+            {'op': 'add', 'kind': 'stroke', 'value': {'id': 'new', 'points': []}},
+            {'op': 'remove', 'kind': 'stroke', 'id': 's1'},
+            {'op': 'update', 'kind': 'stroke', 'id': 's3', 'patch': {'color': '#f00', 'id': 'ignored'}},
+            {'op': 'remove', 'kind': 'stroke', 'id': 'new'},
+            {'op': 'add', 'kind': 'stroke', 'value': {'id': 's1', 'points': [1]}},
+        ]
+
+        new_state = SoloDiffService.apply_diff(_state(5), ops)
+
+        strokes = new_state['pages'][0]['strokes']
+        assert [s['id'] for s in strokes] == ['s0', 's2', 's3', 's4', 's1']
+        assert strokes[2] == {'id': 's3', 'points': [], 'color': '#f00'}
+
+    def test_targets_page_by_id(self):
+        ops = [{'op': 'add', 'kind': 'asset', 'page_id': 'p2', 'value': {'id': 'a1'}}]
+
+        new_state = SoloDiffService.apply_diff(_state(), ops)
+
+        assert new_state['pages'][1]['assets'] == [{'id': 'a1'}]
+        assert new_state['pages'][0]['assets'] == []
+
+    def test_unknown_page_falls_back_to_first_page(self):
+        ops = [{'op': 'add', 'kind': 'stroke', 'page_id': 'missing', 'value': {'id': 'x'}}]
+
+        new_state = SoloDiffService.apply_diff(_state(), ops)
+
+        assert new_state['pages'][0]['strokes'] == [{'id': 'x'}]
+
+    def test_duplicate_add_is_rejected(self):
+        ops = [{'op': 'add', 'kind': 'stroke', 'value': {'id': 's0'}}]
+
+        with pytest.raises(SoloDiffError, match='already exists'):
+            SoloDiffService.apply_diff(_state(1), ops)
+
+    def test_update_after_remove_is_rejected(self):
+        ops = [
+            {'op': 'remove', 'kind': 'stroke', 'id': 's0'},
+            {'op': 'update', 'kind': 'stroke', 'id': 's0', 'patch': {'color': '#000'}},
+        ]
+
+        with pytest.raises(SoloDiffError, match='not found'):
+            SoloDiffService.apply_diff(_state(1), ops)
+
+    def test_large_page_batch(self):
+        state = _state(50_000)
+        ops = [
+            {'op': 'update', 'kind': 'stroke', 'id': f's{i}', 'patch': {'w': i}}
+            for i in range(0, 50_000, 1000)
+        ] + [
+            {'op': 'remove', 'kind': 'stroke', 'id': f's{i}'}
+            for i in range(1, 50_000, 1000)
+        ]
+
+        new_state = SoloDiffService.apply_diff(state, ops)
+
+        strokes = new_state['pages'][0]['strokes']
+        assert len(strokes) == 50_000 - 50
+        assert strokes[0] == {'id': 's0', 'points': [], 'w': 0}
+        assert state['pages'][0]['strokes'][1]['id'] == 's1'
+
+
+class TestCopyOnWriteApply:
+    def test_untouched_pages_and_items_are_shared(self):
+        state = _state(3)
+        state['pages'][1]['strokes'].append({'id': 'q0'})
+
+        new_state = SoloDiffService.apply_diff(
+            state,
+            [{'op': 'update', 'kind': 'stroke', 'id': 's1', 'patch': {'color': '#0f0'}}],
+        )
+
+        assert new_state['pages'][1] is state['pages'][1]
+        assert new_state['pages'][0] is not state['pages'][0]
+        assert new_state['pages'][0]['strokes'][0] is state['pages'][0]['strokes'][0]
+        assert new_state['pages'][0]['strokes'][1] == {'id': 's1', 'points': [], 'color': '#0f0'}
+        assert state['pages'][0]['strokes'][1] == {'id': 's1', 'points': []}
+
+    def test_failed_apply_leaves_input_untouched(self):
+        state = _state(2)
+        state['meta'] = {'title': 'a'}
+        ops = [
+            {'op': 'update', 'kind': 'stroke', 'id': 's0', 'patch': {'color': '#111'}},
+            {'op': 'remove', 'kind': 'stroke', 'id': 's1'},
+            {'op': 'update', 'kind': 'meta', 'patch': {'title': 'b'}},
+            {'op': 'remove', 'kind': 'stroke', 'id': 'missing'},
+        ]
+
+        with pytest.raises(SoloDiffError):
+            SoloDiffService.apply_diff(state, ops)
+
+        assert state == dict(_state(2), meta={'title': 'a'})
+
+    def test_matches_deep_copy_mode(self):
+        state = {'pages': [{'id': 'p1', 'strokes': [{'id': 's0'}]}, {'id': 'p2'}], 'activePageId': 'p1'}
+        ops = [
+            {'op': 'add', 'kind': 'stroke', 'value': {'id': 's1'}},
+            {'op': 'update', 'kind': 'stroke', 'id': 's1', 'patch': {'w': 2}},
+            {'op': 'update', 'kind': 'meta', 'value': {'zoom': 2}},
+        ]
+
+        shared = SoloDiffService.apply_diff(state, ops)
+        assert ops[0]['value'] == {'id': 's1'}
+        copied = SoloDiffService.apply_diff(state, ops, copy_on_write=False)
+
+        assert shared == copied
+        assert state == {'pages': [{'id': 'p1', 'strokes': [{'id': 's0'}]}, {'id': 'p2'}], 'activePageId': 'p1'}
+
+
+class TestNormalizeOps:
+    def test_add_update_chain_becomes_single_add(self):
+        ops = [
+            {'op': 'add', 'kind': 'stroke', 'value': {'id': 'n', 'points': []}},
+            {'op': 'update', 'kind': 'stroke', 'id': 'n', 'patch': {'color': '#111'}},
+            {'op': 'update', 'kind': 'stroke', 'id': 'n', 'patch': {'color': '#222', 'w': 3}},
+        ]
+
+        normalized = SoloDiffService.normalize_ops(ops)
+
+        assert normalized == [
+            {'op': 'add', 'kind': 'stroke', 'value': {'id': 'n', 'points': [], 'color': '#222', 'w': 3}},
+        ]
+        assert ops[0]['value'] == {'id': 'n', 'points': []}
+
+    def test_add_remove_is_kept_and_update_remove_becomes_remove(self):
+        ops = [
+            {'op': 'add', 'kind': 'stroke', 'value': {'id': 'tmp'}},
+            {'op': 'update', 'kind': 'stroke', 'id': 's0', 'patch': {'w': 1}},
+            {'op': 'update', 'kind': 'stroke', 'id': 'tmp', 'patch': {'w': 2}},
+            {'op': 'remove', 'kind': 'stroke', 'id': 'tmp'},
+            {'op': 'remove', 'kind': 'stroke', 'id': 's0'},
+        ]
+
+        assert SoloDiffService.normalize_ops(ops) == [
+            {'op': 'add', 'kind': 'stroke', 'value': {'id': 'tmp', 'w': 2}},
+            {'op': 'remove', 'kind': 'stroke', 'id': 's0'},
+            {'op': 'remove', 'kind': 'stroke', 'id': 'tmp'},
+        ]
+
+    def test_add_remove_of_an_existing_id_is_still_rejected(self):
+        ops = [
+            {'op': 'add', 'kind': 'stroke', 'value': {'id': 's0'}},
+            {'op': 'remove', 'kind': 'stroke', 'id': 's0'},
+        ]
+
+        with pytest.raises(SoloDiffError, match='already exists'):
+            SoloDiffService.apply_diff(_state(1), SoloDiffService.normalize_ops(ops))
+
+    def test_consecutive_meta_patches_merge(self):
+        ops = [
+            {'op': 'update', 'kind': 'meta', 'id': 'm', 'patch': {'zoom': 1}},
+            {'op': 'add', 'kind': 'stroke', 'value': {'id': 'x'}},
+            {'op': 'update', 'kind': 'meta', 'id': 'm', 'patch': {'zoom': 2, 'title': 't'}},
+        ]
+
+        normalized = SoloDiffService.normalize_ops(ops)
+
+        assert normalized[0]['patch'] == {'zoom': 2, 'title': 't'}
+        assert len(normalized) == 2
+
+    def test_different_pages_are_not_merged(self):
+        ops = [
+            {'op': 'add', 'kind': 'asset', 'page_id': 'p2', 'value': {'id': 'a'}},
+            {'op': 'remove', 'kind': 'asset', 'page_id': 'p1', 'id': 'a'},
+        ]
+
+        assert SoloDiffService.normalize_ops(ops) == ops
+
+    def test_explicit_and_active_page_keep_their_order(self):
+        ops = [
+            {'op': 'update', 'kind': 'stroke', 'page_id': 'p1', 'id': 's1', 'patch': {'c': 1}},
+            {'op': 'update', 'kind': 'stroke', 'id': 's1', 'patch': {'c': 2}},
+            {'op': 'update', 'kind': 'stroke', 'page_id': 'p1', 'id': 's1', 'patch': {'c': 3}},
+            {'op': 'update', 'kind': 'stroke', 'page_id': 'p1', 'id': 's1', 'patch': {'w': 1}},
+        ]
+
+        normalized = SoloDiffService.normalize_ops(ops)
+
+        assert len(normalized) == 3
+        state = SoloDiffService.apply_diff(_state(2), normalized)
+        assert state == SoloDiffService.apply_diff(_state(2), ops)
+        assert state['pages'][0]['strokes'][1] == {'id': 's1', 'points': [], 'c': 3, 'w': 1}
+
+    def test_normalized_batch_matches_raw_apply(self):
+        ops = [
+            {'op': 'add', 'kind': 'stroke', 'value': {'id': 'new', 'points': []}},
+            {'op': 'remove', 'kind': 'stroke', 'id': 's1'},
+            {'op': 'update', 'kind': 'stroke', 'id': 's3', 'patch': {'color': '#f00'}},
+            {'op': 'update', 'kind': 'stroke', 'id': 'new', 'patch': {'w': 1}},
+            {'op': 'update', 'kind': 'stroke', 'id': 's3', 'patch': {'w': 2}},
+            {'op': 'add', 'kind': 'stroke', 'value': {'id': 's1', 'points': [1]}},
+            {'op': 'update', 'kind': 'stroke', 'id': 's1', 'patch': {'w': 4}},
+            {'op': 'update', 'kind': 'meta', 'id': 'm', 'value': {'zoom': 2}},
+            {'op': 'remove', 'kind': 'meta', 'id': 'zoom'},
+            {'op': 'update', 'kind': 'meta', 'id': 'm', 'patch': {'title': 'a'}},
+        ]
+
+        normalized = SoloDiffService.normalize_ops(ops)
+
+        assert len(normalized) == 7
+        assert SoloDiffService.apply_diff(_state(5), normalized) == SoloDiffService.apply_diff(_state(5), ops)
@@ -4,13 +4,14 @@ Tests for diff-save API (BE29-1).
 import gzip
 import json
 import pytest
+from django.test.utils import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from apps.users.models import User
 from apps.solo.models import SoloSession
-from apps.solo.services import SoloDiffService
+from apps.solo.services import SoloDiffService, SoloOpLogService
 from apps.solo.api.views import SoloSessionDiffSaveView
 
 
@@ -215,7 +216,7 @@ class TestDiffSaveAPI:
         assert response.data['error'] == 'payload_too_large'
         assert response.data['encoding'] == 'gzip'
 
-    def test_diff_save_br_is_415(self, api_client, student_user, solo_session):
+    def test_diff_save_unknown_encoding_is_415(self, api_client, student_user, solo_session):
         api_client.force_authenticate(user=student_user)
         url = reverse('solo-api:session-diff', args=[solo_session.id])
 
@@ -228,8 +229,90 @@ class TestDiffSaveAPI:
             data=raw,
             content_type='application/json',
             HTTP_IF_MATCH=f'W/"rev:{solo_session.rev}"',
-            HTTP_CONTENT_ENCODING='br',
+            HTTP_CONTENT_ENCODING='deflate',
         )
 
         assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
         assert response.data['error'] == 'unsupported_media_type'
+        assert 'gzip' in response.data['accepted_encodings']
+        assert 'gzip' in response['Accept-Encoding']
+
+    @pytest.mark.parametrize('encoding, module', [('zstd', 'zstandard'), ('br', 'brotli')])
+    def test_diff_save_zstd_and_br(self, api_client, student_user, solo_session, encoding, module):
+        compressor = pytest.importorskip(module)
+        api_client.force_authenticate(user=student_user)
+        url = reverse('solo-api:session-diff', args=[solo_session.id])
+
+        payload = {
+            'rev': solo_session.rev,
+            'ops': [{'op': 'add', 'kind': 'stroke', 'value': {'id': f's-{encoding}', 'points': [[1, 2]]}}],
+        }
+        raw = json.dumps(payload).encode('utf-8')
+        body = compressor.ZstdCompressor().compress(raw) if encoding == 'zstd' else compressor.compress(raw)
+
+        response = api_client.generic(
+            'PATCH',
+            url,
+            data=body,
+            content_type='application/json',
+            HTTP_IF_MATCH=f'W/"rev:{solo_session.rev}"',
+            HTTP_CONTENT_ENCODING=encoding,
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert encoding in response['Accept-Encoding']
+
+
+@pytest.mark.django_db
+class TestDiffSaveConcurrency:
+    def _patch(self, api_client, session, stroke_id, base_rev=0, rebase=False):
+        return api_client.patch(
+            reverse('solo-api:session-diff', args=[session.id]),
+            {'rev': base_rev, 'rebase': rebase, 'ops': [{'op': 'add', 'kind': 'stroke', 'value': {'id': stroke_id}}]},
+            format='json',
+            HTTP_IF_MATCH=f'W/"rev:{base_rev}"',
+        )
+
+    def _race_once(self, monkeypatch, session):
+        """Commit rev 1 from "another tab" between the unlocked read and the UPDATE."""
+        real = SoloSessionDiffSaveView._blob_values
+
+        def racing(current, ops, next_rev):
+            values = real(current, ops, next_rev)
+            if next_rev == 1:
+                SoloSession.objects.filter(pk=session.pk).update(rev=1)
+                SoloOpLogService.append(session, 1, [{'op': 'add', 'kind': 'stroke', 'value': {'id': 'other'}}])
+            return values
+
+        monkeypatch.setattr(SoloSessionDiffSaveView, '_blob_values', staticmethod(racing))
+
+    def test_lost_cas_is_reported_as_stale(self, api_client, student_user, solo_session, monkeypatch):
+        api_client.force_authenticate(user=student_user)
+        self._race_once(monkeypatch, solo_session)
+
+        response = self._patch(api_client, solo_session, 'mine')
+
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+        solo_session.refresh_from_db()
+        assert solo_session.rev == 1
+
+    def test_lost_cas_is_retried_with_rebase(self, api_client, student_user, solo_session, monkeypatch):
+        api_client.force_authenticate(user=student_user)
+        self._race_once(monkeypatch, solo_session)
+
+        response = self._patch(api_client, solo_session, 'mine', rebase=True)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert (response.data['next_rev'], response.data['rebased_from']) == (2, 0)
+        solo_session.refresh_from_db()
+        assert solo_session.rev == 2
+
+    @override_settings(SOLO_DIFF_OPTIMISTIC=False)
+    def test_locked_path_still_available(self, api_client, student_user, solo_session):
+        api_client.force_authenticate(user=student_user)
+
+        response = self._patch(api_client, solo_session, 'mine')
+
+        assert response.status_code == status.HTTP_200_OK
+        solo_session.refresh_from_db()
+        assert [s['id'] for s in solo_session.state['pages'][0]['strokes']] == ['mine']
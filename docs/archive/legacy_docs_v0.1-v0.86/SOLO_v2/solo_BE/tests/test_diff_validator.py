@@ -0,0 +1,62 @@
+"""
+Tests for the fast-path diff payload validator.
+"""
+import pytest
+
+from apps.solo.api.serializers import SoloDiffSaveSerializer
+from apps.solo.api.validators import validate_diff_payload
+
+
+def _serializer_result(payload):
+    serializer = SoloDiffSaveSerializer(data=payload)
+    if not serializer.is_valid():
+        return None
+    data = dict(serializer.validated_data)
+    data['ops'] = [dict(op) for op in data['ops']]
+    return data
+
+
+VALID_PAYLOADS = [
+    {'rev': 0, 'ops': []},
+    {
+        'rev': 3,
+        'rebase': True,
+        'client_ts': '2025-01-01T10:00:00Z',
+        'ops': [
+            {'op': 'add', 'kind': 'stroke', 'page_id': 'p1', 'value': {'id': 's1', 'points': [1, 2]}},
+            {'op': 'update', 'kind': 'stroke', 'id': 's1', 'patch': {'color': '#000'}, 'extra': 1},
+            {'op': 'update', 'kind': 'asset', 'id': 'a1', 'value': {'x': 1}},
+            {'op': 'remove', 'kind': 'asset', 'id': 'a1', 'page_id': ''},
+            {'op': 'update', 'kind': 'meta', 'id': 'meta', 'patch': {'zoom': 2}},
+            {'op': 'remove', 'kind': 'meta', 'id': 'zoom'},
+        ],
+    },
+]
+
+FALLBACK_PAYLOADS = [
+    {'rev': '3', 'ops': []},
+    {'rev': True, 'ops': []},
+    {'rev': -1, 'ops': []},
+    {'rev': 0},
+    {'rev': 0, 'ops': {}},
+    {'rev': 0, 'ops': [{'op': 'move', 'kind': 'stroke', 'id': 's1'}]},
+    {'rev': 0, 'ops': [{'op': 'add', 'kind': 'stroke'}]},
+    {'rev': 0, 'ops': [{'op': 'update', 'kind': 'stroke', 'id': 's1'}]},
+    {'rev': 0, 'ops': [{'op': 'remove', 'kind': 'stroke'}]},
+    {'rev': 0, 'ops': [{'op': 'remove', 'kind': 'stroke', 'id': ' s1 '}]},
+    {'rev': 0, 'ops': [{'op': 'remove', 'kind': 'stroke', 'id': 7}]},
+    {'rev': 0, 'ops': [{'op': 'add', 'kind': 'stroke', 'value': None}]},
+    {'rev': 0, 'ops': [{'op': 'update', 'kind': 'meta', 'id': 'm', 'patch': [1]}]},
+    {'rev': 0, 'ops': [], 'rebase': 'true'},
+    {'rev': 0, 'ops': [], 'client_ts': 'yesterday'},
+]
+
+
+class TestValidateDiffPayload:
+    @pytest.mark.parametrize('payload', VALID_PAYLOADS)
+    def test_matches_serializer(self, payload):
+        assert validate_diff_payload(payload) == _serializer_result(payload)
+
+    @pytest.mark.parametrize('payload', FALLBACK_PAYLOADS)
+    def test_defers_to_serializer(self, payload):
+        assert validate_diff_payload(payload) is None
@@ -0,0 +1,71 @@
+"""
+Unit tests for the hierarchical state digest (SoloStateDigest).
+"""
+from django.test.utils import override_settings
+
+from apps.solo.services import SoloDiffService, SoloStateDigest
+
+
+def _state():
+    return {
+        'pages': [
+            {'id': 'p1', 'strokes': [{'id': f's{i}', 'points': [i]} for i in range(20)], 'assets': []},
+            {'id': 'p2', 'strokes': [{'id': 'q1'}], 'assets': [{'id': 'a1'}], 'background': 'grid'},
+        ],
+        'activePageId': 'p1',
+        'meta': {'zoom': 1},
+    }
+
+
+class TestSoloStateDigest:
+    def test_incremental_update_matches_full_build(self):
+        state = _state()
+        tree = SoloStateDigest.build(state, rev=1)
+        new_state = SoloDiffService.apply_diff(state, [
+            {'op': 'update', 'kind': 'stroke', 'id': 's3', 'patch': {'color': '#f00'}},
+            {'op': 'remove', 'kind': 'stroke', 'id': 's7'},
+        ])
+
+        updated = SoloStateDigest.update(state, tree, new_state, rev=2)
+
+        assert updated['root'] == SoloStateDigest.build(new_state, rev=2)['root']
+        assert updated['pages'][1] == tree['pages'][1]
+        assert updated['pages'][0] != tree['pages'][0]
+
+    def test_persisted_tree_without_item_hashes_still_matches(self):
+        state = _state()
+        tree = SoloStateDigest.to_storage(SoloStateDigest.build(state, rev=1))
+        new_state = SoloDiffService.apply_diff(state, [
+            {'op': 'update', 'kind': 'meta', 'patch': {'zoom': 2}},
+        ])
+
+        updated = SoloStateDigest.update(state, tree, new_state, rev=2)
+
+        assert 'items' not in tree
+        assert updated['pages'] == tree['pages']
+        assert updated['root'] == SoloStateDigest.build(new_state)['root']
+        assert updated['root'] != tree['root']
+
+    def test_validity_is_tied_to_rev_and_root(self):
+        tree = SoloStateDigest.to_storage(SoloStateDigest.build(_state(), rev=4))
+
+        assert SoloStateDigest.is_valid_for(tree, 4, tree['root'])
+        assert not SoloStateDigest.is_valid_for(tree, 5, tree['root'])
+        assert not SoloStateDigest.is_valid_for({}, 4, tree['root'])
+
+    def test_flat_mode_is_legacy_digest(self):
+        state = _state()
+
+        digest, tree = SoloDiffService.digest_state(state, 1)
+
+        assert tree is None
+        assert digest == SoloDiffService.compute_digest(state)
+
+    @override_settings(SOLO_DIGEST_MODE='tree')
+    def test_tree_mode_returns_root(self):
+        state = _state()
+
+        digest, tree = SoloDiffService.digest_state(state, 3)
+
+        assert digest == tree['root'] == SoloStateDigest.build(state)['root']
+        assert tree['rev'] == 3
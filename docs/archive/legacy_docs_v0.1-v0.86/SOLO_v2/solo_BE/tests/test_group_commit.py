@@ -0,0 +1,195 @@
+"""
+Tests for group commit of concurrent diff saves.
+"""
+import threading
+
+import pytest
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.users.models import User
+from apps.solo.api.views import SoloSessionDiffSaveView
+from apps.solo.models import SoloSession, SoloOpLog
+from apps.solo.services import SoloDiffGroupCommit, SoloStateBytes
+
+
+class TestGroupCoordinator:
+    @override_settings(SOLO_DIFF_GROUP_COMMIT_MS=50)
+    def test_save_with_nothing_in_flight_commits_alone(self):
+        batches = []
+
+        result = SoloDiffGroupCommit.run('s', 'a', lambda jobs: batches.append(jobs) or [j.upper() for j in jobs])
+
+        assert result == 'A'
+        assert batches == [['a']]
+        assert SoloDiffGroupCommit._inflight == {}
+
+    @override_settings(SOLO_DIFF_GROUP_COMMIT_MS=100)
+    def test_overlapping_saves_share_one_commit(self):
+        batches = []
+        first_started = threading.Event()
+        release_first = threading.Event()
+
+        def commit(jobs):
+            batches.append(list(jobs))
+            if jobs == ['first']:
+                first_started.set()
+                release_first.wait(5)
+            return [job.upper() for job in jobs]
+
+        results = {}
+
+        def save(name):
+            results[name] = SoloDiffGroupCommit.run('s', name, commit)
+
+        first = threading.Thread(target=save, args=('first',))
+        first.start()
+        assert first_started.wait(5)
+        others = [threading.Thread(target=save, args=(name,)) for name in ('b', 'c')]
+        for thread in others:
+            thread.start()
+        for thread in others:
+            thread.join(5)
+        release_first.set()
+        first.join(5)
+
+        assert results == {'first': 'FIRST', 'b': 'B', 'c': 'C'}
+        assert batches[0] == ['first']
+        assert sorted(batches[1]) == ['b', 'c']
+        assert SoloDiffGroupCommit._inflight == {} and SoloDiffGroupCommit._groups == {}
+
+    @override_settings(SOLO_DIFF_GROUP_COMMIT_MS=50)
+    def test_failed_commit_sends_members_their_own_way(self):
+        def commit(jobs):
+            raise RuntimeError('boom')
+
+        assert SoloDiffGroupCommit.run('s', 'a', commit) is None
+
+
+def _stroke(stroke_id):
+    return {'op': 'add', 'kind': 'stroke', 'value': {'id': stroke_id, 'points': [{'x': 0, 'y': 0}]}}
+
+
+@pytest.fixture
+def owner(db):
+    return User.objects.create_user(
+        email='group-commit@test.com',
+        password='testpass123',
+        first_name='Group',
+        last_name='Commit',
+        role='student',
+    )
+
+
+@pytest.fixture
+def solo_session(owner):
+    return SoloSession.objects.create(
+        user=owner,
+        name='Group Session',
+        state={'pages': [{'id': 'p1', 'strokes': [], 'assets': []}], 'activePageId': 'p1'},
+        page_count=1,
+    )
+
+
+@pytest.mark.django_db
+class TestCommitGroup:
+    def _job(self, owner, rev, stroke_id):
+        request = RequestFactory().patch('/', HTTP_IF_MATCH=f'W/"rev:{rev}"')
+        request.user = owner
+        ops = [_stroke(stroke_id)]
+        return request, {'ops': ops}, ops
+
+    def test_chained_saves_are_one_update(self, owner, solo_session):
+        jobs = [self._job(owner, 0, 's1'), self._job(owner, 1, 's2'), self._job(owner, 0, 'stale')]
+
+        with CaptureQueriesContext(connection) as queries:
+            results = SoloSessionDiffSaveView()._commit_group(solo_session.pk, jobs)
+
+        assert [r.session.rev for r in results[:2]] == [1, 2]
+        assert [r.write_path for r in results[:2]] == ['group', 'group']
+        # Only the head state goes to the hot-state cache.
+        assert results[0].state is None and results[1].state is not None
+        assert results[2].status_code == status.HTTP_412_PRECONDITION_FAILED
+        assert len([q for q in queries.captured_queries if q['sql'].startswith('UPDATE')]) == 1
+        solo_session.refresh_from_db()
+        assert solo_session.rev == 2
+        assert [s['id'] for s in solo_session.state['pages'][0]['strokes']] == ['s1', 's2']
+        assert list(
+            SoloOpLog.objects.filter(session=solo_session).order_by('rev').values_list('rev', flat=True)
+        ) == [1, 2]
+
+    def test_other_users_save_is_not_grouped(self, owner, solo_session):
+        intruder = User.objects.create_user(
+            email='group-intruder@test.com',
+            password='testpass123',
+            first_name='Group',
+            last_name='Intruder',
+            role='student',
+        )
+        jobs = [self._job(owner, 0, 's1'), self._job(intruder, 1, 'intruder')]
+
+        results = SoloSessionDiffSaveView()._commit_group(solo_session.pk, jobs)
+
+        assert results[0].session.rev == 1
+        assert results[1] is None
+        solo_session.refresh_from_db()
+        assert [s['id'] for s in solo_session.state['pages'][0]['strokes']] == ['s1']
+
+    @override_settings(SOLO_DIFF_GROUP_COMMIT_MS=20)
+    def test_other_user_cannot_patch_through_a_group(self, owner, solo_session):
+        intruder = User.objects.create_user(
+            email='group-intruder@test.com',
+            password='testpass123',
+            first_name='Group',
+            last_name='Intruder',
+            role='student',
+        )
+        client = APIClient()
+        client.force_authenticate(user=intruder)
+        url = reverse('solo-api:session-diff', args=[solo_session.id])
+        # The owner's save is in flight; the intruder's must not join it.
+        SoloDiffGroupCommit._inflight[f'{owner.pk}:{solo_session.pk}'] = 1
+        try:
+            response = client.patch(url, {'rev': 0, 'ops': [_stroke('x')]}, format='json', HTTP_IF_MATCH='W/"rev:0"')
+        finally:
+            SoloDiffGroupCommit._inflight.clear()
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        solo_session.refresh_from_db()
+        assert solo_session.rev == 0
+
+    def test_state_bytes_are_encoded_once(self, owner, solo_session, monkeypatch):
+        calls = []
+        real = SoloStateBytes.values
+        monkeypatch.setattr(
+            SoloStateBytes, 'values', staticmethod(lambda state, rev: calls.append(rev) or real(state, rev)),
+        )
+        jobs = [self._job(owner, 0, 's1'), self._job(owner, 1, 's2'), self._job(owner, 2, 's3')]
+
+        SoloSessionDiffSaveView()._commit_group(solo_session.pk, jobs)
+
+        assert calls == [3]
+
+    def test_rebasing_member_saves_on_its_own(self, owner, solo_session):
+        request, _, ops = self._job(owner, 5, 's1')
+
+        results = SoloSessionDiffSaveView()._commit_group(solo_session.pk, [(request, {'ops': ops, 'rebase': True}, ops)])
+
+        assert results == [None]
+
+    @override_settings(SOLO_DIFF_GROUP_COMMIT_MS=20)
+    def test_diff_save_endpoint_with_grouping_enabled(self, owner, solo_session):
+        client = APIClient()
+        client.force_authenticate(user=owner)
+        url = reverse('solo-api:session-diff', args=[solo_session.id])
+
+        response = client.patch(url, {'rev': 0, 'ops': [_stroke('s1')]}, format='json', HTTP_IF_MATCH='W/"rev:0"')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['next_rev'] == 1
+        solo_session.refresh_from_db()
+        assert solo_session.rev == 1
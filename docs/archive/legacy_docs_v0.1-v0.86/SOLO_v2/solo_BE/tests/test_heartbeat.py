@@ -0,0 +1,144 @@
+"""
+Tests for coalesced beacon heartbeats.
+"""
+import time
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.users.models import User
+from apps.solo.models import SoloSession
+from apps.solo.services import SoloHeartbeats
+from apps.solo.tasks import flush_heartbeats
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def owner(db):
+    return User.objects.create_user(
+        email='heartbeat-student@test.com',
+        password='testpass123',
+        first_name='Heartbeat',
+        last_name='Student',
+        role='student',
+    )
+
+
+@pytest.fixture
+def api_client(owner):
+    client = APIClient()
+    client.force_authenticate(user=owner)
+    return client
+
+
+@pytest.fixture
+def solo_session(owner):
+    return SoloSession.objects.create(user=owner, name='Heartbeat Session', state={'pages': []})
+
+
+def _flush():
+    return SoloHeartbeats.flush(now=time.time() + SoloHeartbeats.flush_seconds())
+
+
+@pytest.mark.django_db
+class TestHeartbeats:
+    def test_beacon_does_not_query_the_database(self, api_client, solo_session):
+        url = reverse('solo-api:session-beacon', args=[solo_session.id])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.post(url, {'client_ts': 1}, format='json')
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert queries.captured_queries == []
+        solo_session.refresh_from_db()
+        assert solo_session.last_write_at is None
+
+    def test_beacons_are_written_with_one_update(self, api_client, owner, solo_session):
+        other = SoloSession.objects.create(user=owner, name='Other', state={'pages': []})
+        for session in (solo_session, solo_session, other):
+            api_client.post(reverse('solo-api:session-beacon', args=[session.id]), {'client_ts': 1}, format='json')
+
+        with CaptureQueriesContext(connection) as queries:
+            assert _flush() == 2
+
+        assert [q['sql'].split()[0] for q in queries.captured_queries] == ['UPDATE']
+        for session in (solo_session, other):
+            session.refresh_from_db()
+            assert session.last_write_at is not None
+
+    def test_flush_only_moves_forward(self, owner, solo_session):
+        now = timezone.now()
+        SoloHeartbeats.record(solo_session.id, owner.id, now)
+        SoloHeartbeats.record(solo_session.id, owner.id, now - timedelta(seconds=5))
+        later = now + timedelta(minutes=1)
+        SoloSession.objects.filter(pk=solo_session.pk).update(last_write_at=later)
+
+        _flush()
+
+        solo_session.refresh_from_db()
+        assert solo_session.last_write_at == later
+
+    def test_latest_beacon_wins(self, owner, solo_session):
+        now = timezone.now()
+        SoloHeartbeats.record(solo_session.id, owner.id, now - timedelta(seconds=5))
+        SoloHeartbeats.record(solo_session.id, owner.id, now)
+
+        _flush()
+
+        solo_session.refresh_from_db()
+        assert solo_session.last_write_at == now
+
+    def test_racing_beacons_keep_the_newest_time(self, owner, solo_session, monkeypatch):
+        now = timezone.now()
+        SoloHeartbeats.record(solo_session.id, owner.id, now)
+        # A beacon that read the last-seen value before ``now`` was written
+        # would overwrite it; recording must not read it back at all.
+        monkeypatch.setattr(cache, 'get', lambda *args, **kwargs: None)
+        SoloHeartbeats.record(solo_session.id, owner.id, now - timedelta(seconds=5))
+        monkeypatch.undo()
+
+        _flush()
+
+        solo_session.refresh_from_db()
+        assert solo_session.last_write_at == now
+
+    def test_foreign_session_is_not_updated(self, api_client, solo_session):
+        intruder = User.objects.create_user(
+            email='heartbeat-intruder@test.com',
+            password='testpass123',
+            first_name='Heartbeat',
+            last_name='Intruder',
+            role='student',
+        )
+        api_client.force_authenticate(user=intruder)
+
+        response = api_client.post(
+            reverse('solo-api:session-beacon', args=[solo_session.id]), {'client_ts': 1}, format='json',
+        )
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert _flush() == 0
+        solo_session.refresh_from_db()
+        assert solo_session.last_write_at is None
+
+    def test_current_window_waits_for_the_next_flush(self, owner, solo_session, settings):
+        settings.SOLO_HEARTBEAT_FLUSH_SECONDS = 3600
+        SoloHeartbeats.record(solo_session.id, owner.id)
+
+        assert flush_heartbeats()['updated'] == 0
+        assert _flush() == 1
+        # Already flushed windows are not written again.
+        assert _flush() == 0
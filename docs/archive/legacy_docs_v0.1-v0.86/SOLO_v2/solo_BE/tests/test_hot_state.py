@@ -0,0 +1,117 @@
+"""
+Tests for the in-process hot-session state cache.
+"""
+from types import SimpleNamespace
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.solo.services import SoloHotStateCache
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    SoloHotStateCache.clear()
+    yield
+    SoloHotStateCache.clear()
+
+
+def _session(pk, rev=1):
+    return SimpleNamespace(pk=pk, rev=rev, updated_at=None, state_digest='d', state_tree={})
+
+
+class TestHotStateLRU:
+    def test_evicts_least_recently_saved_by_bytes(self, settings):
+        settings.SOLO_HOT_STATE_CACHE_BYTES = 100
+        state = {'pages': ['x' * 30]}  # 44 bytes of JSON
+
+        SoloHotStateCache.put(_session('a'), state)
+        SoloHotStateCache.put(_session('b'), state)
+        SoloHotStateCache.put(_session('c'), state)
+
+        stats = SoloHotStateCache.stats()
+        assert (stats['entries'], stats['bytes'], stats['evictions']) == (2, 88, 1)
+        assert list(SoloHotStateCache._entries) == ['b', 'c']
+
+    def test_growth_estimate_and_oversized_states(self, settings):
+        settings.SOLO_HOT_STATE_CACHE_BYTES = 100
+        SoloHotStateCache.put(_session('a'), {'n': 1})
+        SoloHotStateCache.put(_session('a', rev=2), {'n': 2}, growth=10)
+        assert SoloHotStateCache.stats()['bytes'] == 17
+
+        SoloHotStateCache.put(_session('a', rev=3), {'n': 'x' * 200})
+        assert SoloHotStateCache.stats()['entries'] == 0
+
+    def test_disabled_by_default(self):
+        SoloHotStateCache.put(_session('a'), {'n': 1})
+        assert SoloHotStateCache.stats()['entries'] == 0
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def student_user(db):
+    from apps.users.models import User
+
+    return User.objects.create_user(
+        email='hot-student@test.com',
+        password='testpass123',
+        first_name='Hot',
+        last_name='Student',
+        role='student',
+    )
+
+
+@pytest.fixture
+def solo_session(db, student_user):
+    from apps.solo.models import SoloSession
+
+    return SoloSession.objects.create(
+        user=student_user,
+        name='Hot Session',
+        state={'pages': [{'id': 'p1', 'strokes': [], 'assets': []}], 'activePageId': 'p1'},
+        page_count=1,
+    )
+
+
+def _add_stroke(api_client, session, rev, stroke_id):
+    return api_client.patch(
+        reverse('solo-api:session-diff', args=[session.id]),
+        {'rev': rev, 'ops': [{'op': 'add', 'kind': 'stroke', 'value': {'id': stroke_id}}]},
+        format='json',
+        HTTP_IF_MATCH=f'W/"rev:{rev}"',
+    )
+
+
+@pytest.mark.django_db
+class TestHotStateDiffSave:
+    @pytest.fixture(autouse=True)
+    def enable_cache(self, settings):
+        settings.SOLO_HOT_STATE_CACHE_BYTES = 1024 * 1024
+
+    def test_consecutive_saves_hit(self, api_client, student_user, solo_session):
+        api_client.force_authenticate(user=student_user)
+
+        assert _add_stroke(api_client, solo_session, 0, 's1').status_code == status.HTTP_200_OK
+        assert _add_stroke(api_client, solo_session, 1, 's2').status_code == status.HTTP_200_OK
+
+        assert SoloHotStateCache.stats()['hits'] == 1
+        solo_session.refresh_from_db()
+        assert [s['id'] for s in solo_session.state['pages'][0]['strokes']] == ['s1', 's2']
+
+    def test_raw_patch_invalidates(self, api_client, student_user, solo_session):
+        api_client.force_authenticate(user=student_user)
+        _add_stroke(api_client, solo_session, 0, 's1')
+        overwrite = {'pages': [{'id': 'p1', 'strokes': [{'id': 'raw'}], 'assets': []}], 'activePageId': 'p1'}
+        api_client.patch(reverse('solo-api:session-detail', args=[solo_session.id]), {'state': overwrite}, format='json')
+
+        assert _add_stroke(api_client, solo_session, 1, 's2').status_code == status.HTTP_200_OK
+
+        assert SoloHotStateCache.stats()['hits'] == 0
+        solo_session.refresh_from_db()
+        assert [s['id'] for s in solo_session.state['pages'][0]['strokes']] == ['raw', 's2']
@@ -0,0 +1,178 @@
+"""
+Tests for the append-only op log and deferred state materialization.
+"""
+from datetime import timedelta
+
+import pytest
+from django.test.utils import override_settings
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.users.models import User
+from apps.solo.models import SoloSession, SoloOpLog
+from apps.solo.services import SoloOpLogService
+from apps.solo.tasks import compact_idle_oplogs, compact_oplog_task
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def student_user(db):
+    return User.objects.create_user(
+        email='oplog-student@test.com',
+        password='testpass123',
+        first_name='OpLog',
+        last_name='Student',
+        role='student',
+    )
+
+
+@pytest.fixture
+def solo_session(db, student_user):
+    return SoloSession.objects.create(
+        user=student_user,
+        name='OpLog Session',
+        state={
+            'pages': [
+                {'id': 'p1', 'strokes': [], 'assets': []},
+            ],
+            'activePageId': 'p1',
+        },
+        page_count=1,
+    )
+
+
+def _add_stroke(api_client, session, rev, stroke_id):
+    url = reverse('solo-api:session-diff', args=[session.id])
+    return api_client.patch(
+        url,
+        {'rev': rev, 'ops': [{'op': 'add', 'kind': 'stroke', 'value': {'id': stroke_id}}]},
+        format='json',
+        HTTP_IF_MATCH=f'W/"rev:{rev}"',
+    )
+
+
+@pytest.mark.django_db
+class TestOpLog:
+    def test_diff_save_appends_ops(self, api_client, student_user, solo_session):
+        api_client.force_authenticate(user=student_user)
+
+        response = _add_stroke(api_client, solo_session, 0, 's1')
+
+        assert response.status_code == status.HTTP_200_OK
+        entry = SoloOpLog.objects.get(session=solo_session)
+        assert entry.rev == 1
+        assert entry.ops == [{'op': 'add', 'kind': 'stroke', 'value': {'id': 's1'}}]
+        solo_session.refresh_from_db()
+        assert solo_session.state_rev == 1
+
+    @override_settings(SOLO_OPLOG_DEFER_STATE=True, SOLO_OPLOG_COMPACT_EVERY_REVS=100)
+    def test_deferred_state_is_replayed_on_read(self, api_client, student_user, solo_session):
+        api_client.force_authenticate(user=student_user)
+
+        assert _add_stroke(api_client, solo_session, 0, 's1').status_code == status.HTTP_200_OK
+        assert _add_stroke(api_client, solo_session, 1, 's2').status_code == status.HTTP_200_OK
+
+        solo_session.refresh_from_db()
+        assert solo_session.rev == 2
+        assert solo_session.state_rev == 0
+        assert solo_session.state['pages'][0]['strokes'] == []
+
+        detail = api_client.get(reverse('solo-api:session-detail', args=[solo_session.id]))
+        strokes = detail.data['state']['pages'][0]['strokes']
+        assert [s['id'] for s in strokes] == ['s1', 's2']
+
+    @override_settings(SOLO_OPLOG_DEFER_STATE=True, SOLO_OPLOG_COMPACT_EVERY_REVS=100, SOLO_OPLOG_RETAIN_REVS=1)
+    def test_compaction_materializes_and_prunes(self, api_client, student_user, solo_session):
+        api_client.force_authenticate(user=student_user)
+        for rev, stroke_id in enumerate(['s1', 's2', 's3']):
+            assert _add_stroke(api_client, solo_session, rev, stroke_id).status_code == status.HTTP_200_OK
+
+        assert SoloOpLogService.compact(solo_session.id) is True
+
+        solo_session.refresh_from_db()
+        assert solo_session.state_rev == 3
+        assert [s['id'] for s in solo_session.state['pages'][0]['strokes']] == ['s1', 's2', 's3']
+        assert list(SoloOpLog.objects.filter(session=solo_session).values_list('rev', flat=True)) == [3]
+
+    @override_settings(SOLO_OPLOG_DEFER_STATE=True, SOLO_OPLOG_COMPACT_EVERY_REVS=100)
+    def test_idle_sweep_materializes_state(self, api_client, student_user, solo_session):
+        api_client.force_authenticate(user=student_user)
+        assert _add_stroke(api_client, solo_session, 0, 's1').status_code == status.HTTP_200_OK
+        SoloSession.objects.filter(pk=solo_session.pk).update(last_write_at=timezone.now() - timedelta(days=1))
+
+        assert compact_idle_oplogs() == {'compacted': 1}
+
+        solo_session.refresh_from_db()
+        assert solo_session.state_rev == 1
+        assert [s['id'] for s in solo_session.state['pages'][0]['strokes']] == ['s1']
+
+    @override_settings(SOLO_OPLOG_DEFER_STATE=True, SOLO_OPLOG_COMPACT_EVERY_REVS=100)
+    def test_compact_task(self, api_client, student_user, solo_session):
+        api_client.force_authenticate(user=student_user)
+        _add_stroke(api_client, solo_session, 0, 's1')
+
+        assert compact_oplog_task(str(solo_session.id)) == {'status': 'success', 'compacted': True}
+
+
+@pytest.mark.django_db
+class TestRebase:
+    def _stale_add(self, api_client, session, base_rev, stroke_id, rebase=True):
+        url = reverse('solo-api:session-diff', args=[session.id])
+        return api_client.patch(
+            url,
+            {
+                'rev': base_rev,
+                'rebase': rebase,
+                'ops': [{'op': 'add', 'kind': 'stroke', 'value': {'id': stroke_id}}],
+            },
+            format='json',
+            HTTP_IF_MATCH=f'W/"rev:{base_rev}"',
+        )
+
+    def test_non_conflicting_stale_diff_is_rebased(self, api_client, student_user, solo_session):
+        api_client.force_authenticate(user=student_user)
+        assert _add_stroke(api_client, solo_session, 0, 's1').status_code == status.HTTP_200_OK
+
+        response = self._stale_add(api_client, solo_session, 0, 's2')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['next_rev'] == 2
+        assert response.data['rebased_from'] == 0
+        assert response.data['intervening'] == [
+            {'rev': 1, 'ops': [{'op': 'add', 'kind': 'stroke', 'value': {'id': 's1'}}]},
+        ]
+        solo_session.refresh_from_db()
+        assert [s['id'] for s in solo_session.state['pages'][0]['strokes']] == ['s1', 's2']
+
+    def test_conflicting_stale_diff_is_rejected(self, api_client, student_user, solo_session):
+        api_client.force_authenticate(user=student_user)
+        assert _add_stroke(api_client, solo_session, 0, 's1').status_code == status.HTTP_200_OK
+
+        response = self._stale_add(api_client, solo_session, 0, 's1')
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response.data['error'] == 'rebase_conflict'
+        assert response.data['conflicts'] == [['stroke', 's1']]
+
+    def test_stale_diff_without_rebase_flag_keeps_412(self, api_client, student_user, solo_session):
+        api_client.force_authenticate(user=student_user)
+        assert _add_stroke(api_client, solo_session, 0, 's1').status_code == status.HTTP_200_OK
+
+        response = self._stale_add(api_client, solo_session, 0, 's2', rebase=False)
+
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+
+    def test_gap_in_history_is_not_rebased(self, api_client, student_user, solo_session):
+        api_client.force_authenticate(user=student_user)
+        assert _add_stroke(api_client, solo_session, 0, 's1').status_code == status.HTTP_200_OK
+        SoloOpLog.objects.filter(session=solo_session).delete()
+
+        response = self._stale_add(api_client, solo_session, 0, 's2')
+
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
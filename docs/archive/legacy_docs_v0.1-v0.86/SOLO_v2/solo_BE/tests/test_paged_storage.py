@@ -0,0 +1,105 @@
+"""
+Tests for per-page normalized session storage.
+"""
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.users.models import User
+from apps.solo.models import SoloSession, SoloPage
+from apps.solo.services import SoloPageStore, SoloStateDigest
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def student_user(db):
+    return User.objects.create_user(
+        email='paged-student@test.com',
+        password='testpass123',
+        first_name='Paged',
+        last_name='Student',
+        role='student',
+    )
+
+
+@pytest.fixture
+def solo_session(db, student_user):
+    return SoloSession.objects.create(
+        user=student_user,
+        name='Paged Session',
+        state={
+            'pages': [
+                {'id': 'p1', 'strokes': [{'id': 's1'}], 'assets': []},
+                {'id': 'p2', 'strokes': [], 'assets': []},
+            ],
+            'activePageId': 'p1',
+        },
+        page_count=2,
+    )
+
+
+@pytest.mark.django_db
+class TestPagedStorage:
+    def test_convert_moves_pages_to_rows(self, solo_session):
+        full_state = dict(solo_session.state)
+
+        assert SoloPageStore.convert(solo_session.id)
+
+        solo_session.refresh_from_db()
+        assert solo_session.storage_mode == 'paged'
+        assert solo_session.state == {'activePageId': 'p1'}
+        assert list(SoloPage.objects.filter(session=solo_session).values_list('page_id', flat=True)) == ['p1', 'p2']
+        assert solo_session.state_digest == SoloStateDigest.build(full_state)['root']
+
+    def test_diff_rewrites_only_target_page(self, api_client, student_user, solo_session):
+        SoloPageStore.convert(solo_session.id)
+        untouched = SoloPage.objects.get(session=solo_session, page_id='p1')
+        api_client.force_authenticate(user=student_user)
+
+        url = reverse('solo-api:session-diff', args=[solo_session.id])
+        response = api_client.patch(
+            url,
+            {'rev': 0, 'ops': [{'op': 'add', 'kind': 'stroke', 'page_id': 'p2', 'value': {'id': 's2'}}]},
+            format='json',
+            HTTP_IF_MATCH='W/"rev:0"',
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        p1 = SoloPage.objects.get(session=solo_session, page_id='p1')
+        p2 = SoloPage.objects.get(session=solo_session, page_id='p2')
+        assert (p1.rev, p1.updated_at) == (untouched.rev, untouched.updated_at)
+        assert p2.rev == 1
+        assert p2.data['strokes'] == [{'id': 's2'}]
+
+        detail = api_client.get(reverse('solo-api:session-detail', args=[solo_session.id]))
+        expected = {
+            'pages': [
+                {'id': 'p1', 'strokes': [{'id': 's1'}], 'assets': []},
+                {'id': 'p2', 'strokes': [{'id': 's2'}], 'assets': []},
+            ],
+            'activePageId': 'p1',
+        }
+        assert detail.data['state'] == expected
+        assert response.data['digest'] == SoloStateDigest.build(expected)['root']
+
+    def test_meta_only_diff_keeps_the_pages(self, api_client, student_user, solo_session):
+        SoloPageStore.convert(solo_session.id)
+        api_client.force_authenticate(user=student_user)
+
+        response = api_client.patch(
+            reverse('solo-api:session-diff', args=[solo_session.id]),
+            {'rev': 0, 'ops': [{'op': 'update', 'kind': 'meta', 'id': 'm', 'patch': {'zoom': 2}}]},
+            format='json',
+            HTTP_IF_MATCH='W/"rev:0"',
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert list(SoloPage.objects.filter(session=solo_session).values_list('page_id', flat=True)) == ['p1', 'p2']
+        solo_session.refresh_from_db()
+        assert solo_session.rev == 1
+        assert solo_session.state['meta'] == {'zoom': 2}
@@ -0,0 +1,144 @@
+"""
+Tests for the decode-once request body helper.
+"""
+import gzip
+import io
+
+import pytest
+
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from apps.solo import request_body
+from apps.solo.request_body import (
+    decode_body,
+    BODY_TOO_LARGE,
+    BODY_UNSUPPORTED_ENCODING,
+    BODY_INVALID_ENCODING,
+)
+
+
+def _request(body, encoding=None):
+    extra = {'HTTP_CONTENT_ENCODING': encoding} if encoding else {}
+    return RequestFactory().post('/x/', data=body, content_type='application/json', **extra)
+
+
+def _chunked_request(stream, encoding=None):
+    extra = {'HTTP_CONTENT_ENCODING': encoding} if encoding else {}
+    return RequestFactory().post(
+        '/x/', data=b'', content_type='application/json',
+        CONTENT_LENGTH='', **{'wsgi.input': stream, 'wsgi.input_terminated': True}, **extra,
+    )
+
+
+class _CountingStream(io.BytesIO):
+    consumed = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.consumed += len(chunk)
+        return chunk
+
+
+class TestDecodeBody:
+    def test_gzip_is_decoded_once_per_request(self, monkeypatch):
+        calls = []
+        real = request_body._gunzip
+        monkeypatch.setattr(request_body, '_gunzip', lambda data, limit: calls.append(1) or real(data, limit))
+        http_request = _request(gzip.compress(b'{"rev": 1}'), 'gzip')
+
+        first = decode_body(http_request, 1024)
+        second = decode_body(Request(http_request), 1024)
+
+        assert first.data == second.data == b'{"rev": 1}'
+        assert len(calls) == 1
+
+    def test_multi_member_and_padding(self):
+        body = gzip.compress(b'{"a":') + gzip.compress(b'1}') + b'\x00\x00'
+
+        assert decode_body(_request(body, 'gzip'), 1024).data == b'{"a":1}'
+
+    def test_stops_after_limit(self):
+        decoded = decode_body(_request(gzip.compress(b'x' * 10_000), 'gzip'), 100)
+
+        assert (decoded.error, decoded.encoding) == (BODY_TOO_LARGE, 'gzip')
+
+    def test_truncated_gzip_is_invalid(self):
+        body = gzip.compress(b'{"rev": 1}')[:-4]
+
+        assert decode_body(_request(body, 'gzip'), 1024).error == BODY_INVALID_ENCODING
+
+    def test_raw_and_unsupported(self):
+        assert decode_body(_request(b'{}'), 1024).data == b'{}'
+        assert decode_body(_request(b'x' * 20), 10).error == BODY_TOO_LARGE
+        assert decode_body(_request(b'{}', 'deflate'), 1024).error == BODY_UNSUPPORTED_ENCODING
+
+    def test_zstd_multi_frame_and_limit(self):
+        zstandard = pytest.importorskip('zstandard')
+        compressor = zstandard.ZstdCompressor()
+        body = compressor.compress(b'{"a":') + compressor.compress(b'1}')
+
+        assert decode_body(_request(body, 'zstd'), 1024).data == b'{"a":1}'
+        decoded = decode_body(_request(compressor.compress(b'x' * 1_000_000), 'zstd'), 100)
+        assert (decoded.error, decoded.encoding) == (BODY_TOO_LARGE, 'zstd')
+        assert decode_body(_request(b'not zstd', 'zstd'), 1024).error == BODY_INVALID_ENCODING
+
+    def test_brotli_limit_and_truncation(self):
+        brotli = pytest.importorskip('brotli')
+
+        assert decode_body(_request(brotli.compress(b'{"a":1}'), 'br'), 1024).data == b'{"a":1}'
+        decoded = decode_body(_request(brotli.compress(b'x' * 1_000_000), 'br'), 100)
+        assert (decoded.error, decoded.encoding) == (BODY_TOO_LARGE, 'br')
+        body = brotli.compress(b'{"rev": 1}' * 50)[:-2]
+        assert decode_body(_request(body, 'br'), 1024).error == BODY_INVALID_ENCODING
+
+    def test_brotli_fallback_stops_once_the_total_is_over(self):
+        class _OldDecompressor:
+            calls = 0
+
+            def process(self, data):
+                self.calls += 1
+                return b'x' * 40
+
+            def is_finished(self):
+                return True
+
+        decompressor = _OldDecompressor()
+        out = request_body._Collector(100)
+        body = b'\0' * (request_body._BROTLI_INPUT_CHUNK * 10)
+
+        decoded = request_body._unbrotli_chunked(decompressor, body, out)
+
+        assert (decoded.error, decoded.encoding) == (BODY_TOO_LARGE, 'br')
+        # 40 + 40 fit, the third call takes the total to 120.
+        assert decompressor.calls == 3
+        assert out.chunks == [b'x' * 40] * 2
+
+    def test_accept_encoding_lists_installed_decoders(self):
+        assert request_body.accept_encoding().endswith('gzip, identity')
+        assert set(request_body.supported_encodings()) == set(request_body._DECODERS)
+
+    def test_chunked_body_is_read_incrementally(self):
+        stream = _CountingStream(b'{"a":1}')
+        http_request = _chunked_request(stream)
+
+        assert decode_body(http_request, 1024).data == b'{"a":1}'
+        # Handed back to Django without re-reading the input.
+        assert http_request.body == b'{"a":1}'
+        assert http_request.read() == b'{"a":1}'
+
+    def test_chunked_body_stops_after_limit(self):
+        stream = _CountingStream(b'x' * 1_000_000)
+
+        decoded = decode_body(_chunked_request(stream), 100)
+
+        assert decoded.error == BODY_TOO_LARGE
+        assert stream.consumed == 101
+
+    def test_compressed_body_over_raw_limit(self):
+        stream = _CountingStream(b'\x1f\x8b' + b'x' * 10_000)
+
+        decoded = decode_body(_chunked_request(stream, 'gzip'), 100)
+
+        assert (decoded.error, decoded.encoding) == (BODY_TOO_LARGE, 'gzip')
+        assert stream.consumed == 101
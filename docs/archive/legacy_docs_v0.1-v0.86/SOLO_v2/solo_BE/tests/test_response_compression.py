@@ -0,0 +1,132 @@
+"""
+Tests for negotiated, cached compressed session responses.
+"""
+import gzip
+import json
+import re
+from types import SimpleNamespace
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.users.models import User
+from apps.solo import response_body
+from apps.solo.models import SoloSession
+from apps.solo.services.sharing import SharingService
+
+_STATE_COLUMN = re.compile(r'"solo_session"\."state"')
+
+
+class TestNegotiate:
+    @pytest.mark.parametrize('header, expected', [
+        ('gzip, deflate', 'gzip'),
+        ('gzip;q=0', None),
+        ('identity', None),
+        ('', None),
+        ('*', next(iter(response_body._COMPRESSORS))),
+        ('deflate, GZIP;q=0.5', 'gzip'),
+    ])
+    def test_picks_accepted_coding(self, header, expected):
+        request = SimpleNamespace(headers={'Accept-Encoding': header})
+
+        assert response_body.negotiate(request) == expected
+
+
+@pytest.fixture(autouse=True)
+def compress_responses(settings):
+    settings.SOLO_COMPRESS_RESPONSES = True
+    settings.SOLO_COMPRESS_MIN_BYTES = 100
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def owner(db):
+    return User.objects.create_user(
+        email='gzip-student@test.com',
+        password='testpass123',
+        first_name='Gzip',
+        last_name='Student',
+        role='student',
+    )
+
+
+@pytest.fixture
+def api_client(owner):
+    client = APIClient()
+    client.force_authenticate(user=owner)
+    return client
+
+
+@pytest.fixture
+def solo_session(owner):
+    return SoloSession.objects.create(
+        user=owner,
+        name='Big Session',
+        state={'pages': [{'id': f'p{i}', 'strokes': [{'id': f's{i}'}] * 20} for i in range(10)]},
+        page_count=10,
+    )
+
+
+def _state_reads(queries):
+    return [q['sql'] for q in queries.captured_queries if _STATE_COLUMN.search(q['sql'].split(' FROM ')[0])]
+
+
+@pytest.mark.django_db
+class TestCompressedDetail:
+    def test_gzip_body_is_cached_per_rev(self, api_client, solo_session):
+        url = reverse('solo-api:session-detail', args=[solo_session.id])
+
+        first = api_client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        with CaptureQueriesContext(connection) as queries:
+            second = api_client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+
+        assert first['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in first['Vary']
+        body = json.loads(gzip.decompress(first.content))
+        assert len(body['state']['pages']) == 10
+        assert second.content == first.content
+        assert _state_reads(queries) == []
+
+    def test_new_rev_is_compressed_again(self, api_client, solo_session):
+        url = reverse('solo-api:session-detail', args=[solo_session.id])
+        first = api_client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        api_client.patch(
+            reverse('solo-api:session-diff', args=[solo_session.id]),
+            {'rev': 0, 'ops': [{'op': 'add', 'kind': 'stroke', 'value': {'id': 'new', 'points': []}}]},
+            format='json',
+            HTTP_IF_MATCH='W/"rev:0"',
+        )
+
+        second = api_client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+
+        assert second['ETag'] != first['ETag']
+        assert json.loads(gzip.decompress(second.content))['rev'] == 1
+
+    def test_identity_and_projections_are_not_compressed(self, api_client, solo_session):
+        url = reverse('solo-api:session-detail', args=[solo_session.id])
+
+        plain = api_client.get(url)
+        projected = api_client.get(url, {'fields': 'id,name'}, HTTP_ACCEPT_ENCODING='gzip')
+
+        assert not plain.has_header('Content-Encoding')
+        assert len(json.loads(plain.content)['state']['pages']) == 10
+        assert not projected.has_header('Content-Encoding')
+
+
+@pytest.mark.django_db
+def test_public_session_is_compressed(solo_session):
+    share = SharingService.create_share(session=solo_session)
+    url = reverse('solo-api:public-session', args=[share.token])
+
+    response = APIClient().get(url, HTTP_ACCEPT_ENCODING='gzip')
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(response.content))['name'] == 'Big Session'
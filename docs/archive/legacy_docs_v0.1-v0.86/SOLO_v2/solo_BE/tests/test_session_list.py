@@ -0,0 +1,113 @@
+"""
+Tests for keyset pagination and the cached total of the session list.
+"""
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.users.models import User
+from apps.solo.models import SoloSession
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def owner(db):
+    return User.objects.create_user(
+        email='list-student@test.com',
+        password='testpass123',
+        first_name='List',
+        last_name='Student',
+        role='student',
+    )
+
+
+@pytest.fixture
+def api_client(owner):
+    client = APIClient()
+    client.force_authenticate(user=owner)
+    return client
+
+
+@pytest.fixture
+def sessions(owner):
+    created = [SoloSession.objects.create(user=owner, name=f'S{i}') for i in range(5)]
+    now = timezone.now()
+    # Two sessions share an updated_at; the id breaks the tie.
+    for i, session in enumerate(created):
+        SoloSession.objects.filter(pk=session.pk).update(updated_at=now - timedelta(minutes=min(i, 3)))
+    return created
+
+
+@pytest.mark.django_db
+class TestSessionListPagination:
+    def test_pages_cover_every_session_once(self, api_client, sessions):
+        url = reverse('solo-api:session-list')
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 2}
+            if cursor:
+                params['cursor'] = cursor
+            response = api_client.get(url, params)
+            assert response.status_code == status.HTTP_200_OK
+            assert response.data['count'] == 5
+            seen.extend(item['id'] for item in response.data['results'])
+            cursor = response.data['next']
+            if cursor is None:
+                break
+
+        expected = SoloSession.objects.order_by('-updated_at', '-id').values_list('id', flat=True)
+        assert seen == [str(pk) for pk in expected]
+
+    def test_limit_is_capped(self, api_client, sessions):
+        response = api_client.get(reverse('solo-api:session-list'), {'limit': 10_000})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 5
+        assert response.data['next'] is None
+
+    def test_invalid_cursor_is_400(self, api_client, sessions):
+        response = api_client.get(reverse('solo-api:session-list'), {'cursor': 'not-a-cursor'})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestCachedSessionCount:
+    def test_count_query_runs_once(self, api_client, sessions):
+        url = reverse('solo-api:session-list')
+        api_client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(url)
+
+        assert response.data['count'] == 5
+        assert not [q for q in queries.captured_queries if 'COUNT(' in q['sql']]
+
+    def test_create_and_delete_update_the_count(
+        self, api_client, owner, sessions, django_capture_on_commit_callbacks,
+    ):
+        url = reverse('solo-api:session-list')
+        assert api_client.get(url).data['count'] == 5
+
+        with django_capture_on_commit_callbacks(execute=True):
+            SoloSession.objects.create(user=owner, name='New')
+        assert api_client.get(url).data['count'] == 6
+
+        with django_capture_on_commit_callbacks(execute=True):
+            sessions[0].delete()
+            sessions[1].delete()
+        assert api_client.get(url).data['count'] == 4
@@ -0,0 +1,109 @@
+"""
+Tests for detail projections and the per-page endpoint.
+"""
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.users.models import User
+from apps.solo.models import SoloSession
+from apps.solo.services import SoloPageStore
+
+
+@pytest.fixture
+def owner(db):
+    return User.objects.create_user(
+        email='pages-student@test.com',
+        password='testpass123',
+        first_name='Pages',
+        last_name='Student',
+        role='student',
+    )
+
+
+@pytest.fixture
+def api_client(owner):
+    client = APIClient()
+    client.force_authenticate(user=owner)
+    return client
+
+
+@pytest.fixture
+def solo_session(owner):
+    return SoloSession.objects.create(
+        user=owner,
+        name='Notebook',
+        state={
+            'pages': [{'id': f'p{i}', 'strokes': [{'id': f's{i}'}], 'assets': []} for i in range(1, 5)],
+            'activePageId': 'p3',
+        },
+        page_count=4,
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('paged', [False, True])
+class TestDetailProjection:
+    def test_pages_selects_requested_pages(self, api_client, solo_session, paged):
+        if paged:
+            SoloPageStore.convert(solo_session.id)
+        url = reverse('solo-api:session-detail', args=[solo_session.id])
+
+        response = api_client.get(url, {'pages': 'active,p1'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [page['id'] for page in response.data['state']['pages']] == ['p1', 'p3']
+        assert response.data['state']['activePageId'] == 'p3'
+        assert response.data['page_ids'] == ['p1', 'p2', 'p3', 'p4']
+        assert response.data['name'] == 'Notebook'
+
+    def test_page_endpoint_and_etag(self, api_client, solo_session, paged):
+        if paged:
+            SoloPageStore.convert(solo_session.id)
+        url = reverse('solo-api:session-page', args=[solo_session.id, 'p2'])
+
+        first = api_client.get(url)
+        second = api_client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        other = api_client.get(reverse('solo-api:session-page', args=[solo_session.id, 'p4']))
+
+        assert first.status_code == status.HTTP_200_OK
+        assert first.data['page']['strokes'] == [{'id': 's2'}]
+        assert second.status_code == status.HTTP_304_NOT_MODIFIED
+        assert other['ETag'] != first['ETag']
+
+
+@pytest.mark.django_db
+class TestFieldsProjection:
+    def test_fields_without_state(self, api_client, solo_session):
+        url = reverse('solo-api:session-detail', args=[solo_session.id])
+
+        response = api_client.get(url, {'fields': 'id,name,rev'})
+
+        assert set(response.data) == {'id', 'name', 'rev'}
+
+    def test_projections_have_their_own_etag(self, api_client, solo_session):
+        url = reverse('solo-api:session-detail', args=[solo_session.id])
+
+        full = api_client.get(url)['ETag']
+        fields = api_client.get(url, {'fields': 'id,name'})['ETag']
+        reordered = api_client.get(url, {'fields': 'name,id'})['ETag']
+        pages = api_client.get(url, {'pages': 'active'})['ETag']
+
+        assert len({full, fields, pages}) == 3
+        assert fields == reordered
+        assert api_client.get(url, HTTP_IF_NONE_MATCH=fields).status_code == status.HTTP_200_OK
+        assert api_client.get(url, {'fields': 'id,name'}, HTTP_IF_NONE_MATCH=full).status_code == status.HTTP_200_OK
+        assert api_client.get(url, {'fields': 'id,name'}, HTTP_IF_NONE_MATCH=fields).status_code == (
+            status.HTTP_304_NOT_MODIFIED
+        )
+
+    def test_unknown_field_is_400(self, api_client, solo_session):
+        url = reverse('solo-api:session-detail', args=[solo_session.id])
+
+        assert api_client.get(url, {'fields': 'name,secret'}).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_unknown_page_is_404(self, api_client, solo_session):
+        url = reverse('solo-api:session-page', args=[solo_session.id, 'missing'])
+
+        assert api_client.get(url).status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,131 @@
+"""
+Tests for the serialized state bytes stored with each write.
+"""
+import gzip
+import json
+import re
+from types import SimpleNamespace
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.users.models import User
+from apps.solo import codec
+from apps.solo.models import SoloSession
+from apps.solo.services import SoloStateBytes, SoloOpLogService
+
+STATE = {'pages': [{'id': 'p1', 'strokes': [], 'assets': []}], 'activePageId': 'p1'}
+# The blob column itself, not state_bytes_size/_rev/_encoding.
+_BYTES_COLUMN = re.compile(r'"solo_session"\."state_bytes"')
+
+
+def _row(values, rev):
+    return SimpleNamespace(rev=rev, storage_mode='blob', **values)
+
+
+class TestStateBytesValues:
+    def test_disabled_by_default(self):
+        assert SoloStateBytes.values(STATE, 3) == {}
+
+    @pytest.mark.parametrize('mode', ['identity', 'gzip'])
+    def test_round_trip(self, mode):
+        with override_settings(SOLO_STATE_BYTES=mode):
+            values = SoloStateBytes.values(STATE, 3)
+
+        assert values['state_bytes_size'] == len(codec.dumps(STATE))
+        assert SoloStateBytes.raw(_row(values, 3)) == codec.dumps(STATE)
+        if mode == 'gzip':
+            assert gzip.decompress(values['state_bytes']) == codec.dumps(STATE)
+
+    @override_settings(SOLO_STATE_BYTES='gzip')
+    def test_bytes_of_another_rev_are_stale(self):
+        row = _row(SoloStateBytes.values(STATE, 3), 4)
+
+        assert SoloStateBytes.raw(row) is None
+        assert SoloStateBytes.size(row) is None
+
+
+@pytest.fixture
+def owner(db):
+    return User.objects.create_user(
+        email='bytes-student@test.com',
+        password='testpass123',
+        first_name='Bytes',
+        last_name='Student',
+        role='student',
+    )
+
+
+@pytest.fixture
+def api_client(owner):
+    client = APIClient()
+    client.force_authenticate(user=owner)
+    return client
+
+
+@pytest.fixture
+def solo_session(owner):
+    return SoloSession.objects.create(user=owner, name='Bytes Session', state=STATE, page_count=1)
+
+
+def _add_stroke(api_client, session_id, rev, stroke_id):
+    return api_client.patch(
+        reverse('solo-api:session-diff', args=[session_id]),
+        {'rev': rev, 'ops': [{'op': 'add', 'kind': 'stroke', 'value': {'id': stroke_id, 'points': []}}]},
+        format='json',
+        HTTP_IF_MATCH=f'W/"rev:{rev}"',
+    )
+
+
+@pytest.mark.django_db
+class TestStateBytesAPI:
+    @pytest.fixture(autouse=True)
+    def store_gzip(self, settings):
+        settings.SOLO_STATE_BYTES = 'gzip'
+
+    def test_diff_save_stores_bytes_and_detail_serves_them(self, api_client, solo_session):
+        assert _add_stroke(api_client, solo_session.id, 0, 's1').status_code == status.HTTP_200_OK
+        row = SoloSession.objects.with_state_bytes().get(pk=solo_session.pk)
+        assert (row.state_bytes_rev, row.state_bytes_encoding) == (1, 'gzip')
+
+        response = api_client.get(reverse('solo-api:session-detail', args=[solo_session.id]))
+
+        body = json.loads(response.content)
+        assert response.status_code == status.HTTP_200_OK
+        assert body['rev'] == 1
+        assert body['state']['pages'][0]['strokes'][0]['id'] == 's1'
+
+    def test_raw_patch_replaces_bytes(self, api_client, solo_session):
+        _add_stroke(api_client, solo_session.id, 0, 's1')
+        url = reverse('solo-api:session-detail', args=[solo_session.id])
+        new_state = {'pages': [{'id': 'p9', 'strokes': [], 'assets': []}], 'activePageId': 'p9'}
+
+        api_client.patch(url, {'state': new_state}, format='json')
+
+        assert json.loads(api_client.get(url).content)['state'] == new_state
+
+    def test_deferred_state_falls_back_until_compaction(self, api_client, solo_session, settings):
+        settings.SOLO_OPLOG_DEFER_STATE = True
+        _add_stroke(api_client, solo_session.id, 0, 's1')
+        row = SoloSession.objects.with_state_bytes().get(pk=solo_session.pk)
+        assert SoloStateBytes.raw(row) is None
+        url = reverse('solo-api:session-detail', args=[solo_session.id])
+        assert api_client.get(url).data['state']['pages'][0]['strokes'][0]['id'] == 's1'
+
+        SoloOpLogService.compact(solo_session.pk)
+
+        row = SoloSession.objects.with_state_bytes().get(pk=solo_session.pk)
+        assert json.loads(SoloStateBytes.raw(row))['pages'][0]['strokes'][0]['id'] == 's1'
+
+    def test_export_size_check_does_not_load_the_bytes(self, api_client, solo_session):
+        _add_stroke(api_client, solo_session.id, 0, 's1')
+        url = reverse('solo-api:session-export', args=[solo_session.id])
+
+        with CaptureQueriesContext(connection) as queries:
+            api_client.post(url, {'format': 'png'}, format='json')
+
+        assert not [q['sql'] for q in queries.captured_queries if _BYTES_COLUMN.search(q['sql'])]
@@ -0,0 +1,86 @@
+"""
+Metadata endpoints must not read the session state columns.
+"""
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.users.models import User
+from apps.solo.models import SoloSession
+
+# A selected state column, e.g. "solo_session"."state" or "solo_session"."state_tree".
+_STATE_COLUMN = re.compile(r'"solo_session"\."(state|state_tree)"')
+
+
+@pytest.fixture
+def api_client(owner):
+    client = APIClient()
+    client.force_authenticate(user=owner)
+    return client
+
+
+@pytest.fixture
+def owner(db):
+    return User.objects.create_user(
+        email='deferral-student@test.com',
+        password='testpass123',
+        first_name='Deferral',
+        last_name='Student',
+        role='student',
+    )
+
+
+@pytest.fixture
+def solo_session(owner):
+    return SoloSession.objects.create(
+        user=owner,
+        name='Large Session',
+        state={'pages': [{'id': f'p{i}', 'strokes': ['x' * 1000] * 50} for i in range(5)]},
+        page_count=5,
+    )
+
+
+def _state_reads(queries):
+    return [
+        query['sql'] for query in queries.captured_queries
+        if query['sql'].startswith('SELECT') and _STATE_COLUMN.search(query['sql'].split(' FROM ')[0])
+    ]
+
+
+@pytest.mark.django_db
+class TestStateIsNotLoaded:
+    @pytest.mark.parametrize('method, name, expected', [
+        ('get', 'session-list', status.HTTP_200_OK),
+        ('get', 'session-share', status.HTTP_200_OK),
+        ('post', 'session-share', status.HTTP_201_CREATED),
+        ('delete', 'session-share', status.HTTP_204_NO_CONTENT),
+        ('get', 'session-exports-list', status.HTTP_200_OK),
+        ('post', 'session-beacon', status.HTTP_204_NO_CONTENT),
+        ('get', 'session-snapshot-latest', status.HTTP_404_NOT_FOUND),
+        ('delete', 'session-detail', status.HTTP_204_NO_CONTENT),
+    ])
+    def test_endpoint_skips_state(self, api_client, solo_session, method, name, expected):
+        args = [] if name == 'session-list' else [solo_session.id]
+        url = reverse(f'solo-api:{name}', args=args)
+        data = {'client_ts': 1} if name == 'session-beacon' else None
+
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(api_client, method)(url, data, format='json')
+
+        assert response.status_code == expected
+        assert _state_reads(queries) == []
+
+    def test_detail_still_reads_state(self, api_client, solo_session):
+        url = reverse('solo-api:session-detail', args=[solo_session.id])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['state']['pages']) == 5
+        assert _state_reads(queries)
@@ -1,7 +1,12 @@
 """
 Tests for stream/beacon save API (BE29-2).
 """
+import time
+
 import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.test.utils import override_settings
 from rest_framework import status
@@ -9,6 +14,7 @@ from rest_framework.test import APIClient
 
 from apps.users.models import User
 from apps.solo.models import SoloSession
+from apps.solo.services import SoloHeartbeats
 
 
 @pytest.fixture
@@ -165,6 +171,36 @@ class TestStreamSaveAPI:
         assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
         assert response.data['error'] == 'precondition_failed'
     
+    def test_stream_save_is_a_single_conditional_update(self, api_client, student_user, solo_session):
+        api_client.force_authenticate(user=student_user)
+        url = reverse('solo-api:session-stream-save', args=[solo_session.id])
+        new_state = {'pages': [{'id': 'p1', 'strokes': [{'id': 's1'}], 'assets': []}], 'activePageId': 'p1'}
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.post(url, {'state': new_state}, format='json', HTTP_X_REV='0')
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        session_queries = [q['sql'] for q in queries.captured_queries if 'solo_session' in q['sql']]
+        assert len(session_queries) == 1
+        assert session_queries[0].startswith('UPDATE')
+        solo_session.refresh_from_db()
+        assert (solo_session.rev, solo_session.state) == (1, new_state)
+
+    def test_stream_save_x_rev_conflict_reports_server_rev(self, api_client, student_user, solo_session):
+        api_client.force_authenticate(user=student_user)
+        url = reverse('solo-api:session-stream-save', args=[solo_session.id])
+        SoloSession.objects.filter(pk=solo_session.pk).update(rev=5)
+
+        response = api_client.post(
+            url,
+            {'state': {'pages': [{'id': 'p1', 'strokes': [], 'assets': []}]}},
+            format='json',
+            HTTP_X_REV='4',
+        )
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response.data == {'error': 'rev_mismatch', 'server_rev': 5}
+
     def test_stream_save_missing_state(self, api_client, student_user, solo_session):
         """Test stream save without state returns 400."""
         api_client.force_authenticate(user=student_user)
@@ -210,6 +246,7 @@ class TestBeaconSaveAPI:
         api_client.force_authenticate(user=student_user)
         url = reverse('solo-api:session-beacon', args=[solo_session.id])
         
+        cache.clear()
         solo_session.refresh_from_db()
         prev_rev = solo_session.rev
         old_write = solo_session.last_write_at
@@ -221,6 +258,8 @@ class TestBeaconSaveAPI:
         )
         
         assert response.status_code == status.HTTP_204_NO_CONTENT
+        # Heartbeats are coalesced in the cache and written by the flush task.
+        SoloHeartbeats.flush(now=time.time() + SoloHeartbeats.flush_seconds())
         solo_session.refresh_from_db()
         # Rev should not change for heartbeat
         assert solo_session.rev == prev_rev
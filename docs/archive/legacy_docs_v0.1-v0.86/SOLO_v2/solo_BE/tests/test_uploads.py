@@ -0,0 +1,197 @@
+"""
+Tests for resumable chunked uploads of save-stream states.
+"""
+import hashlib
+import json
+
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.users.models import User
+from apps.solo.limits import STREAM_MAX_BYTES, UPLOAD_MAX_BYTES
+from apps.solo.models import SoloSession
+
+CHUNK = 64 * 1024
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def student_user(db):
+    return User.objects.create_user(
+        email='upload-student@test.com',
+        password='testpass123',
+        first_name='Upload',
+        last_name='Student',
+        role='student',
+    )
+
+
+@pytest.fixture
+def api_client(student_user):
+    client = APIClient()
+    client.force_authenticate(user=student_user)
+    return client
+
+
+@pytest.fixture
+def solo_session(student_user):
+    return SoloSession.objects.create(
+        user=student_user,
+        name='Upload Session',
+        state={'pages': [{'id': 'p1', 'strokes': [], 'assets': []}], 'activePageId': 'p1'},
+        page_count=1,
+    )
+
+
+@pytest.fixture
+def body():
+    strokes = [{'id': f's{i}', 'points': [[i, i]] * 10} for i in range(3000)]
+    state = {'pages': [{'id': 'p1', 'strokes': strokes, 'assets': []}], 'activePageId': 'p1'}
+    return json.dumps(state).encode('utf-8')
+
+
+def _open(api_client, session, body, **extra):
+    data = {'size': len(body), 'sha256': hashlib.sha256(body).hexdigest(), 'chunk_size': CHUNK, **extra}
+    return api_client.post(reverse('solo-api:session-upload-create', args=[session.id]), data, format='json')
+
+
+def _put(api_client, session, upload_id, body, index, **headers):
+    return api_client.put(
+        reverse('solo-api:session-upload-chunk', args=[session.id, upload_id, index]),
+        body[index * CHUNK:(index + 1) * CHUNK],
+        content_type='application/octet-stream',
+        **headers,
+    )
+
+
+def _commit(api_client, session, upload_id, **headers):
+    return api_client.post(reverse('solo-api:session-upload-commit', args=[session.id, upload_id]), **headers)
+
+
+@pytest.mark.django_db
+class TestUploads:
+    def test_resumed_upload_is_committed(self, api_client, solo_session, body):
+        opened = _open(api_client, solo_session, body)
+        assert opened.status_code == status.HTTP_201_CREATED
+        upload_id, chunks = opened.data['upload_id'], opened.data['chunks']
+        assert chunks > 2
+
+        for index in reversed(range(1, chunks)):
+            assert _put(api_client, solo_session, upload_id, body, index).status_code == status.HTTP_204_NO_CONTENT
+        incomplete = _commit(api_client, solo_session, upload_id, HTTP_X_REV='0')
+        assert incomplete.status_code == status.HTTP_409_CONFLICT
+        assert incomplete.data == {'error': 'upload_incomplete', 'missing': [0]}
+
+        upload_url = reverse('solo-api:session-upload', args=[solo_session.id, upload_id])
+        assert api_client.get(upload_url).data['missing'] == [0]
+        _put(api_client, solo_session, upload_id, body, 0)
+        committed = _commit(api_client, solo_session, upload_id, HTTP_X_REV='0')
+
+        assert committed.status_code == status.HTTP_202_ACCEPTED
+        assert committed.data['rev'] == 1
+        solo_session.refresh_from_db()
+        assert len(solo_session.state['pages'][0]['strokes']) == 3000
+        assert api_client.get(upload_url).status_code == status.HTTP_404_NOT_FOUND
+        # A retried commit gets the same answer.
+        assert _commit(api_client, solo_session, upload_id, HTTP_X_REV='0').data == committed.data
+
+    def test_stale_rev_keeps_the_upload(self, api_client, solo_session, body):
+        upload_id = _open(api_client, solo_session, body).data['upload_id']
+        for index in range(-(-len(body) // CHUNK)):
+            _put(api_client, solo_session, upload_id, body, index)
+
+        stale = _commit(api_client, solo_session, upload_id, HTTP_IF_MATCH='W/"rev:5"')
+        assert stale.status_code == status.HTTP_412_PRECONDITION_FAILED
+
+        assert _commit(api_client, solo_session, upload_id, HTTP_IF_MATCH='W/"rev:0"').status_code == (
+            status.HTTP_202_ACCEPTED
+        )
+
+    def test_digest_mismatch_drops_the_upload(self, api_client, solo_session, body):
+        upload_id = _open(api_client, solo_session, body, sha256='0' * 64).data['upload_id']
+        for index in range(-(-len(body) // CHUNK)):
+            _put(api_client, solo_session, upload_id, body, index)
+
+        response = _commit(api_client, solo_session, upload_id, HTTP_X_REV='0')
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert response.data == {'error': 'digest_mismatch'}
+        solo_session.refresh_from_db()
+        assert solo_session.rev == 0
+        upload_url = reverse('solo-api:session-upload', args=[solo_session.id, upload_id])
+        assert api_client.get(upload_url).status_code == status.HTTP_404_NOT_FOUND
+
+    def test_chunk_ranges_are_checked(self, api_client, solo_session, body):
+        upload_id = _open(api_client, solo_session, body).data['upload_id']
+
+        wrong_range = _put(
+            api_client, solo_session, upload_id, body, 1, HTTP_CONTENT_RANGE=f'bytes 0-{CHUNK - 1}/{len(body)}',
+        )
+        short = api_client.put(
+            reverse('solo-api:session-upload-chunk', args=[solo_session.id, upload_id, 0]),
+            body[:100],
+            content_type='application/octet-stream',
+        )
+        past_end = _put(api_client, solo_session, upload_id, body, 99)
+
+        assert wrong_range.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        assert short.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        assert past_end.data['error'] == 'invalid_chunk'
+        ok = _put(
+            api_client, solo_session, upload_id, body, 1,
+            HTTP_CONTENT_RANGE=f'bytes {CHUNK}-{2 * CHUNK - 1}/{len(body)}',
+        )
+        assert ok.status_code == status.HTTP_204_NO_CONTENT
+
+    def test_size_limits(self, api_client, solo_session):
+        over_stream = _open(api_client, solo_session, b'', size=STREAM_MAX_BYTES + 1, sha256='a' * 64)
+        over_upload = _open(api_client, solo_session, b'', size=UPLOAD_MAX_BYTES + 1, sha256='a' * 64)
+
+        assert over_stream.status_code == status.HTTP_201_CREATED
+        assert over_upload.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+    def test_other_users_cannot_use_the_upload(self, api_client, solo_session, body):
+        upload_id = _open(api_client, solo_session, body).data['upload_id']
+        intruder = User.objects.create_user(
+            email='upload-intruder@test.com',
+            password='testpass123',
+            first_name='Upload',
+            last_name='Intruder',
+            role='student',
+        )
+        api_client.force_authenticate(user=intruder)
+
+        assert _put(api_client, solo_session, upload_id, body, 0).status_code == status.HTTP_404_NOT_FOUND
+        assert _commit(api_client, solo_session, upload_id, HTTP_X_REV='0').data == {'error': 'upload_not_found'}
+
+    def test_open_uploads_are_capped_per_user(self, api_client, solo_session, body, settings):
+        settings.SOLO_UPLOAD_MAX_OPEN = 2
+        first = _open(api_client, solo_session, body).data['upload_id']
+        _open(api_client, solo_session, body)
+
+        refused = _open(api_client, solo_session, body)
+        assert refused.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert refused.data == {'error': 'too_many_uploads', 'limit': 2}
+
+        api_client.delete(reverse('solo-api:session-upload', args=[solo_session.id, first]))
+        assert _open(api_client, solo_session, body).status_code == status.HTTP_201_CREATED
+
+    def test_unchanged_commit_is_replayed_as_no_content(self, api_client, solo_session):
+        body = json.dumps(solo_session.state).encode('utf-8')
+        for rev in range(2):
+            upload_id = _open(api_client, solo_session, body).data['upload_id']
+            _put(api_client, solo_session, upload_id, body, 0)
+            committed = _commit(api_client, solo_session, upload_id, HTTP_X_REV=str(rev))
+        retried = _commit(api_client, solo_session, upload_id, HTTP_X_REV='1')
+
+        assert committed.status_code == status.HTTP_204_NO_CONTENT
+        assert retried.status_code == status.HTTP_204_NO_CONTENT
@@ -0,0 +1,140 @@
+"""
+Tests for the write-behind save buffer.
+"""
+import pytest
+from django.core.cache import cache
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.users.models import User
+from apps.solo.models import SoloSession, SoloOpLog
+from apps.solo.services import SoloWriteBuffer
+from apps.solo.tasks import flush_write_buffer_task
+
+
+@pytest.fixture(autouse=True)
+def write_behind(monkeypatch):
+    scheduled = []
+    monkeypatch.setattr(SoloWriteBuffer, 'schedule_flush', classmethod(lambda cls, pk: scheduled.append(str(pk))))
+    cache.clear()
+    with override_settings(SOLO_WRITE_BEHIND=True):
+        yield scheduled
+    cache.clear()
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def student_user(db):
+    return User.objects.create_user(
+        email='buffer-student@test.com',
+        password='testpass123',
+        first_name='Buffer',
+        last_name='Student',
+        role='student',
+    )
+
+
+@pytest.fixture
+def solo_session(db, student_user):
+    return SoloSession.objects.create(
+        user=student_user,
+        name='Buffer Session',
+        state={'pages': [{'id': 'p1', 'strokes': [], 'assets': []}], 'activePageId': 'p1'},
+        page_count=1,
+    )
+
+
+def _add_stroke(api_client, session, rev, stroke_id):
+    return api_client.patch(
+        reverse('solo-api:session-diff', args=[session.id]),
+        {'rev': rev, 'ops': [{'op': 'add', 'kind': 'stroke', 'value': {'id': stroke_id}}]},
+        format='json',
+        HTTP_IF_MATCH=f'W/"rev:{rev}"',
+    )
+
+
+@pytest.mark.django_db
+class TestWriteBuffer:
+    def test_diff_saves_are_buffered_and_flushed_once(self, api_client, student_user, solo_session, write_behind):
+        api_client.force_authenticate(user=student_user)
+
+        assert _add_stroke(api_client, solo_session, 0, 's1').data['next_rev'] == 1
+        assert _add_stroke(api_client, solo_session, 1, 's2').data['next_rev'] == 2
+
+        solo_session.refresh_from_db()
+        assert solo_session.rev == 0
+        assert write_behind == [str(solo_session.id)]
+
+        flush_write_buffer_task(str(solo_session.id))
+
+        solo_session.refresh_from_db()
+        assert (solo_session.rev, solo_session.state_rev) == (2, 2)
+        assert [s['id'] for s in solo_session.state['pages'][0]['strokes']] == ['s1', 's2']
+        assert list(SoloOpLog.objects.filter(session=solo_session).values_list('rev', flat=True)) == [1, 2]
+        assert cache.get(SoloWriteBuffer.key(solo_session.id)) is None
+
+    def test_detail_reads_see_buffered_saves(self, api_client, student_user, solo_session):
+        api_client.force_authenticate(user=student_user)
+        _add_stroke(api_client, solo_session, 0, 's1')
+
+        response = api_client.get(reverse('solo-api:session-detail', args=[solo_session.id]))
+
+        assert response.data['rev'] == 1
+        assert [s['id'] for s in response.data['state']['pages'][0]['strokes']] == ['s1']
+
+    def test_stream_save_is_buffered(self, api_client, student_user, solo_session):
+        api_client.force_authenticate(user=student_user)
+        url = reverse('solo-api:session-stream-save', args=[solo_session.id])
+        state = {'pages': [{'id': 'p1', 'strokes': [{'id': 'x'}], 'assets': []}], 'activePageId': 'p1'}
+
+        first = api_client.post(url, {'state': state}, format='json', HTTP_X_REV='0')
+        again = api_client.post(url, {'state': state}, format='json', HTTP_X_REV='1')
+        stale = api_client.post(url, {'state': state}, format='json', HTTP_X_REV='0')
+
+        assert (first.status_code, first.data['rev']) == (status.HTTP_202_ACCEPTED, 1)
+        assert again.status_code == status.HTTP_204_NO_CONTENT
+        assert stale.data == {'error': 'rev_mismatch', 'server_rev': 1}
+        solo_session.refresh_from_db()
+        assert solo_session.rev == 0
+
+    def test_beacon_queues_a_flush(self, api_client, student_user, solo_session, monkeypatch):
+        api_client.force_authenticate(user=student_user)
+        _add_stroke(api_client, solo_session, 0, 's1')
+        queued = []
+        monkeypatch.setattr(flush_write_buffer_task, 'delay', queued.append, raising=False)
+
+        response = api_client.post(
+            reverse('solo-api:session-beacon', args=[solo_session.id]),
+            {'client_ts': 1},
+            format='json',
+        )
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert queued == [str(solo_session.id)]
+        solo_session.refresh_from_db()
+        assert solo_session.rev == 0
+
+        flush_write_buffer_task(queued[0])
+
+        solo_session.refresh_from_db()
+        assert solo_session.rev == 1
+
+    def test_detail_patch_persists_buffer_first(self, api_client, student_user, solo_session):
+        api_client.force_authenticate(user=student_user)
+        _add_stroke(api_client, solo_session, 0, 's1')
+
+        response = api_client.patch(
+            reverse('solo-api:session-detail', args=[solo_session.id]),
+            {'name': 'Renamed'},
+            format='json',
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        solo_session.refresh_from_db()
+        assert (solo_session.name, solo_session.rev) == ('Renamed', 1)
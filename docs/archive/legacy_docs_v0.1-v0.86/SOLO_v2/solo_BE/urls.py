@@ -5,6 +5,7 @@ from django.urls import path
 from apps.solo.api.views import (
     SoloSessionListView,
     SoloSessionDetailView,
+    SoloSessionPageView,
     SoloSessionExportView,
     SoloSessionDuplicateView,
     SoloSessionDiffSaveView,
@@ -18,6 +19,10 @@ from apps.solo.api.views import (
     # v0.29
     SoloSessionStreamSaveView,
     SoloSessionBeaconSaveView,
+    SoloSessionUploadView,
+    SoloSessionUploadDetailView,
+    SoloSessionUploadChunkView,
+    SoloSessionUploadCommitView,
     # v0.30 (stretch)
     SoloSessionSnapshotCreateView,
     SoloSessionSnapshotLatestView,
@@ -29,12 +34,25 @@ urlpatterns = [
     # Sessions (v0.26)
     path('solo/sessions/', SoloSessionListView.as_view(), name='session-list'),
     path('solo/sessions/<uuid:pk>/', SoloSessionDetailView.as_view(), name='session-detail'),
+    path('solo/sessions/<uuid:pk>/pages/<str:page_id>/', SoloSessionPageView.as_view(), name='session-page'),
     path('solo/sessions/<uuid:pk>/export/', SoloSessionExportView.as_view(), name='session-export'),
     path('solo/sessions/<uuid:pk>/exports/', SessionExportsListView.as_view(), name='session-exports-list'),
     path('solo/sessions/<uuid:pk>/duplicate/', SoloSessionDuplicateView.as_view(), name='session-duplicate'),
     path('solo/sessions/<uuid:pk>/diff/', SoloSessionDiffSaveView.as_view(), name='session-diff'),
     path('solo/sessions/<uuid:pk>/save-stream/', SoloSessionStreamSaveView.as_view(), name='session-stream-save'),
     path('solo/sessions/<uuid:pk>/beacon/', SoloSessionBeaconSaveView.as_view(), name='session-beacon'),
+    path('solo/sessions/<uuid:pk>/uploads/', SoloSessionUploadView.as_view(), name='session-upload-create'),
+    path('solo/sessions/<uuid:pk>/uploads/<str:upload_id>/', SoloSessionUploadDetailView.as_view(), name='session-upload'),
+    path(
+        'solo/sessions/<uuid:pk>/uploads/<str:upload_id>/chunks/<int:index>/',
+        SoloSessionUploadChunkView.as_view(),
+        name='session-upload-chunk',
+    ),
+    path(
+        'solo/sessions/<uuid:pk>/uploads/<str:upload_id>/commit/',
+        SoloSessionUploadCommitView.as_view(),
+        name='session-upload-commit',
+    ),
     path('solo/sessions/<uuid:pk>/snapshot/', SoloSessionSnapshotCreateView.as_view(), name='session-snapshot-create'),
     path('solo/sessions/<uuid:pk>/snapshot/latest/', SoloSessionSnapshotLatestView.as_view(), name='session-snapshot-latest'),
     